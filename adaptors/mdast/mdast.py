@@ -1,96 +1,179 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from typing import IO, TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple, Union
 
-from ast_parser import Document, Heading, Paragraph, ParagraphLine, Comment, MarkdownBlock, Node
+from ast_parser import (
+    Document,
+    Heading,
+    Paragraph,
+    Comment,
+    JsonArrayWriter,
+    MarkdownBlock,
+    MarkdownInline,
+    Node,
+    SpaceupHandler,
+    parse_spaceup_events,
+)
+
+if TYPE_CHECKING:
+    from markdown_it.token import Token  # type: ignore
+
+
+def _clamp_heading_depth(level: int) -> int:
+    return 6 if level > 6 else 1 if level < 1 else level
+
+
+def _text_node(value: str) -> Dict[str, Any]:
+    return {"type": "text", "value": value}
+
+
+def _html_comment_node(value: str) -> Dict[str, Any]:
+    return {"type": "html", "value": f"<!-- {value} -->"}
+
+
+def _break_node() -> Dict[str, Any]:
+    return {"type": "break"}
+
+
+def _inline_text_to_children(text: str) -> List[Dict[str, Any]]:
+    # Without tokens, inline Markdown is kept as plain text rather than parsed here.
+    if not text:
+        return []
+    return [_text_node(text)]
+
+
+# markdown-it open/close token types -> mdast parent node types
+_PHRASING_PARENTS = {"em_open": "emphasis", "strong_open": "strong", "s_open": "delete", "link_open": "link"}
+_PHRASING_CLOSES = {"em_close", "strong_close", "s_close", "link_close"}
+
+
+def _tokens_to_children(tokens: List[Token]) -> List[Dict[str, Any]]:
+    """Map markdown-it inline tokens to mdast phrasing nodes, in one pass over the tokens."""
+    children: List[Dict[str, Any]] = []
+    stack: List[List[Dict[str, Any]]] = []
+    for token in tokens:
+        kind = token.type
+        if kind == "text" or kind == "text_special" or kind == "softbreak":
+            value = "\n" if kind == "softbreak" else token.content
+            if not value:
+                continue
+            if children and children[-1]["type"] == "text":
+                children[-1]["value"] += value
+            else:
+                children.append(_text_node(value))
+        elif kind in _PHRASING_PARENTS:
+            node: Dict[str, Any] = {"type": _PHRASING_PARENTS[kind], "children": []}
+            if kind == "link_open":
+                node["url"] = token.attrs.get("href", "")
+                node["title"] = token.attrs.get("title")
+            children.append(node)
+            stack.append(children)
+            children = node["children"]
+        elif kind in _PHRASING_CLOSES:
+            if stack:
+                children = stack.pop()
+        elif kind == "code_inline":
+            children.append({"type": "inlineCode", "value": token.content})
+        elif kind == "image":
+            children.append(
+                {"type": "image", "url": token.attrs.get("src", ""), "title": token.attrs.get("title"), "alt": token.content}
+            )
+        elif kind == "hardbreak":
+            children.append(_break_node())
+        elif kind == "html_inline":
+            children.append({"type": "html", "value": token.content})
+        elif token.content:
+            children.append(_text_node(token.content))
+    return stack[0] if stack else children
+
+
+def _content_to_children(content: MarkdownInline) -> List[Dict[str, Any]]:
+    if content.has_tokens:
+        return _tokens_to_children(content.tokens)
+    return _inline_text_to_children(content.text)
+
+
+def _strip_bullet(children: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Drop the leading "- " of a list item line, which inline Markdown keeps as text.
+    if not children or children[0]["type"] != "text":
+        return children
+    value = children[0]["value"].lstrip()[2:].lstrip()
+    if not value:
+        return children[1:]
+    return [_text_node(value), *children[1:]]
+
+
+def _heading_to_mdast(level: int, children: List[Dict[str, Any]]) -> Dict[str, Any]:
+    node: Dict[str, Any] = {
+        "type": "heading",
+        "depth": _clamp_heading_depth(level),
+        "children": children,
+    }
+    if level > 6:
+        node["data"] = {"spaceupHeadingLevel": level}
+    return node
+
+
+# A paragraph line: its text, inline comment and phrasing children.
+_Line = Tuple[str, Optional[str], List[Dict[str, Any]]]
+
+
+def _list_from_bulleted_lines(lines: List[_Line]) -> Dict[str, Any]:
+    items: List[Dict[str, Any]] = []
+    for _text, inline_comment, children in lines:
+        item_children: List[Dict[str, Any]] = []
+        para_children = _strip_bullet(children)
+        if inline_comment:
+            para_children.append(_html_comment_node(inline_comment))
+        item_children.append({"type": "paragraph", "children": para_children})
+        items.append({"type": "listItem", "children": item_children})
+    return {"type": "list", "ordered": False, "spread": False, "children": items}
+
+
+def _paragraph_to_mdast(lines: List[_Line]) -> Dict[str, Any]:
+    """Convert a paragraph given as (text, inline_comment, children) triples, one per line."""
+    # Special-case: simple unordered list using "- " prefix on all lines
+    if lines and all(text.lstrip().startswith("- ") for text, _, _ in lines):
+        return _list_from_bulleted_lines(lines)
+
+    children: List[Dict[str, Any]] = []
+    for idx, (_text, inline_comment, line_children) in enumerate(lines):
+        children.extend(line_children)
+        if inline_comment:
+            children.append(_html_comment_node(inline_comment))
+        # Insert a soft break between lines (not after the last)
+        if idx < len(lines) - 1:
+            children.append(_break_node())
+    return {"type": "paragraph", "children": children}
+
+
+def _node_to_mdast(node: Node) -> Dict[str, Any] | None:
+    if isinstance(node, Heading):
+        return _heading_to_mdast(node.level, _content_to_children(node.content))
+    if isinstance(node, Paragraph):
+        return _paragraph_to_mdast(
+            [(line.content.text, line.inline_comment, _content_to_children(line.content)) for line in node.lines]
+        )
+    if isinstance(node, Comment):
+        if not node.text:
+            return None
+        return _html_comment_node(node.text)
+    if isinstance(node, MarkdownBlock):
+        # Treat as a plain paragraph for now.
+        return {"type": "paragraph", "children": _inline_text_to_children(node.text)}
+    return None
 
 
 def document_to_mdast(document: Document) -> Dict[str, Any]:
-    """Convert a Spaceup Document into an mdast-compatible dict tree."""
-
-    def clamp_heading_depth(level: int) -> int:
-        return 6 if level > 6 else 1 if level < 1 else level
-
-    def text_node(value: str) -> Dict[str, Any]:
-        return {"type": "text", "value": value}
-
-    def html_comment_node(value: str) -> Dict[str, Any]:
-        return {"type": "html", "value": f"<!-- {value} -->"}
-
-    def break_node() -> Dict[str, Any]:
-        return {"type": "break"}
-
-    def inline_text_to_children(text: str) -> List[Dict[str, Any]]:
-        # Minimal mapping: treat entire inline Markdown as plain text.
-        # Future: parse markdown-it tokens and map to mdast phrasing nodes.
-        if not text:
-            return []
-        return [text_node(text)]
-
-    def paragraph_lines_are_bulleted(lines: List[ParagraphLine]) -> bool:
-        if not lines:
-            return False
-        for line in lines:
-            if not line.content.text.lstrip().startswith("- "):
-                return False
-        return True
-
-    def list_from_bulleted_paragraph(paragraph: Paragraph) -> Dict[str, Any]:
-        items: List[Dict[str, Any]] = []
-        for line in paragraph.lines:
-            # Strip a single leading bullet "- "
-            text = line.content.text.lstrip()[2:].strip()
-            item_children: List[Dict[str, Any]] = []
-            para_children = inline_text_to_children(text)
-            if line.inline_comment:
-                para_children.append(html_comment_node(line.inline_comment))
-            item_children.append({"type": "paragraph", "children": para_children})
-            items.append({"type": "listItem", "children": item_children})
-        return {"type": "list", "ordered": False, "spread": False, "children": items}
-
-    def paragraph_to_mdast(paragraph: Paragraph) -> Dict[str, Any]:
-        # Special-case: simple unordered list using "- " prefix on all lines
-        if paragraph_lines_are_bulleted(paragraph.lines):
-            return list_from_bulleted_paragraph(paragraph)
-
-        children: List[Dict[str, Any]] = []
-        for idx, line in enumerate(paragraph.lines):
-            children.extend(inline_text_to_children(line.content.text))
-            if line.inline_comment:
-                children.append(html_comment_node(line.inline_comment))
-            # Insert a soft break between lines (not after the last)
-            if idx < len(paragraph.lines) - 1:
-                children.append(break_node())
-        return {"type": "paragraph", "children": children}
-
-    def heading_to_mdast(heading: Heading) -> Dict[str, Any]:
-        children = inline_text_to_children(heading.content.text)
-        node: Dict[str, Any] = {
-            "type": "heading",
-            "depth": clamp_heading_depth(heading.level),
-            "children": children,
-        }
-        if heading.level > 6:
-            node["data"] = {"spaceupHeadingLevel": heading.level}
-        return node
-
-    def node_to_mdast(node: Node) -> Dict[str, Any] | None:
-        if isinstance(node, Heading):
-            return heading_to_mdast(node)
-        if isinstance(node, Paragraph):
-            return paragraph_to_mdast(node)
-        if isinstance(node, Comment):
-            if not node.text:
-                return None
-            return html_comment_node(node.text)
-        if isinstance(node, MarkdownBlock):
-            # Treat as a plain paragraph for now.
-            return {"type": "paragraph", "children": inline_text_to_children(node.text)}
-        return None
+    """Convert a Spaceup Document into an mdast-compatible dict tree.
 
+    Inline content with tokens (see `ast_parser.tokenize_document`) becomes
+    phrasing nodes such as emphasis, strong, inlineCode and link; without
+    tokens it stays a single text node.
+    """
     children: List[Dict[str, Any]] = []
     for child in document.children:
-        converted = node_to_mdast(child)
+        converted = _node_to_mdast(child)
         if converted is None:
             continue
         children.append(converted)
@@ -98,3 +181,70 @@ def document_to_mdast(document: Document) -> Dict[str, Any]:
     return {"type": "root", "children": children}
 
 
+class MdastBuilder(SpaceupHandler):
+    """Builds the same mdast tree as `document_to_mdast` straight from parse events."""
+
+    def __init__(self) -> None:
+        self.root: Dict[str, Any] = {"type": "root", "children": []}
+        self._lines: List[_Line] = []
+
+    def _add(self, node: Dict[str, Any]) -> None:
+        self.root["children"].append(node)
+
+    def enter_heading(self, level: int, text: str) -> None:
+        self._add(_heading_to_mdast(level, _inline_text_to_children(text)))
+
+    def enter_paragraph(self) -> None:
+        self._lines = []
+
+    def paragraph_line(self, text: str, inline_comment: Optional[str]) -> None:
+        self._lines.append((text, inline_comment, _inline_text_to_children(text)))
+
+    def exit_paragraph(self) -> None:
+        self._add(_paragraph_to_mdast(self._lines))
+
+    def comment(self, text: str) -> None:
+        if text:
+            self._add(_html_comment_node(text))
+
+
+class MdastJsonWriter(MdastBuilder):
+    """Writes the JSON of the mdast tree to `out` node by node as parse events arrive, keeping no tree."""
+
+    def __init__(self, out: IO[str], chunk_size: int = 65536) -> None:
+        super().__init__()
+        self.writer = JsonArrayWriter(out, '{"type": "root", "children": [', "]}", chunk_size)
+
+    def _add(self, node: Dict[str, Any]) -> None:
+        self.writer.write(node)
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def spaceup_to_mdast(source: Union[str, Iterable[str]]) -> Dict[str, Any]:
+    """Parse Spaceup (a string or an iterable of lines) directly into mdast, without building a Document."""
+    builder = MdastBuilder()
+    parse_spaceup_events(source, builder)
+    return builder.root
+
+
+def write_mdast_json(source: Union[Document, str, Iterable[str]], out: IO[str], chunk_size: int = 65536) -> None:
+    """Write `json.dumps` of the mdast tree of `source` to `out` in chunks, without building the tree.
+
+    A `Document` is converted and written node by node. Text (a string or an
+    iterable of lines, such as an open file) is read one line at a time and
+    goes straight from parse events to JSON, so memory beyond the text stays
+    bounded by the longest paragraph, however long the document.
+    """
+    if isinstance(source, Document):
+        writer = JsonArrayWriter(out, '{"type": "root", "children": [', "]}", chunk_size)
+        for child in source.children:
+            converted = _node_to_mdast(child)
+            if converted is not None:
+                writer.write(converted)
+        writer.close()
+        return
+    handler = MdastJsonWriter(out, chunk_size)
+    parse_spaceup_events(source, handler, stream=True)
+    handler.close()
@@ -0,0 +1,336 @@
+"""
+Binary cache of parsed Spaceup documents, for skipping the parse of unchanged files.
+
+`write_ast_cache` stores a `Document` next to its source (`notes.sup` gets
+`notes.sup.astc`), and `load_ast_cache` maps it back in with `mmap`. Loading
+only checks the header: nodes are decoded when first accessed, so a cached
+document is available long before a re-parse would finish.
+
+File layout, little-endian:
+
+    header          magic, format version, source hash, node and string counts, records and string data sizes
+    node offsets    uint32 per top-level node, plus one past the end: where its record starts
+    string offsets  uint32 per string, plus one past the end: character offsets into the string data
+    records         one per top-level node: a kind byte, then varints
+    string data     every distinct comment, and text that is not in the source, concatenated, UTF-8
+
+Records, by kind byte:
+
+    HEADING         level, text
+    PARAGRAPH       line count, then per line: text, inline comment string + 1 (0 for none)
+    COMMENT         string
+    MARKDOWN_BLOCK  text
+
+A text is the start + 1 and the length of its span in the source, so loaded
+nodes have the same spans as freshly parsed ones; or 0 and a string, for
+text that is not a span of the source (e.g. in a document built by hand).
+
+Markdown tokens are not stored; use `ast_parser.tokenize_document` on the
+loaded document if they are needed.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from hashlib import blake2b
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Union, overload
+
+from ast_parser import (
+    Comment,
+    Document,
+    Heading,
+    MarkdownBlock,
+    MarkdownInline,
+    Node,
+    Paragraph,
+    ParagraphLine,
+    _TokenizedText,
+    parse_spaceup_ast,
+)
+
+MAGIC = b"SPACEUP\0"
+# Bump when the layout changes, or when the parser would build a different tree from the same source.
+FORMAT_VERSION = 2
+CACHE_SUFFIX = ".astc"
+
+# Node kind bytes
+HEADING = 0
+PARAGRAPH = 1
+COMMENT = 2
+MARKDOWN_BLOCK = 3
+
+_HEADER = struct.Struct("<8sI16sIIII")
+_OFFSETS_START = (_HEADER.size + 3) & ~3  # Keep the uint32 arrays aligned
+_NO_COMMENT = 0
+_NOT_IN_SOURCE = 0
+
+
+def source_hash(source: str) -> bytes:
+    return blake2b(source.encode("utf-8"), digest_size=16).digest()
+
+
+def cache_path(source_path: Union[str, Path]) -> Path:
+    """Where the cache of the Spaceup file at `source_path` is kept: next to it, with `CACHE_SUFFIX` appended."""
+    source_path = Path(source_path)
+    return source_path.with_name(source_path.name + CACHE_SUFFIX)
+
+
+def _varint(value: int, out: bytearray) -> None:
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _uint32_array(values: List[int]) -> bytes:
+    packed = array("I", values)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def encode_document(document: Document, source: str) -> bytes:
+    """The cache file contents for `document`, parsed from `source`."""
+    strings: Dict[str, int] = {}
+    records = bytearray()
+    node_offsets: List[int] = []
+
+    def string(text: str) -> int:
+        index = strings.get(text)
+        if index is None:
+            index = strings[text] = len(strings)
+        return index
+
+    def text(content: _TokenizedText) -> None:
+        if content.source is source or source[content.start : content.end] == content.text:
+            _varint(content.start + 1, records)
+            _varint(content.end - content.start, records)
+        else:
+            _varint(_NOT_IN_SOURCE, records)
+            _varint(string(content.text), records)
+
+    for node in document.children:
+        node_offsets.append(len(records))
+        if isinstance(node, Heading):
+            records.append(HEADING)
+            _varint(node.level, records)
+            text(node.content)
+        elif isinstance(node, Paragraph):
+            records.append(PARAGRAPH)
+            _varint(len(node.lines), records)
+            for line in node.lines:
+                text(line.content)
+                _varint(_NO_COMMENT if line.inline_comment is None else string(line.inline_comment) + 1, records)
+        elif isinstance(node, Comment):
+            records.append(COMMENT)
+            _varint(string(node.text), records)
+        elif isinstance(node, MarkdownBlock):
+            records.append(MARKDOWN_BLOCK)
+            text(node)
+        else:
+            raise TypeError(f"cannot cache node {node!r}")
+    node_offsets.append(len(records))
+
+    string_offsets = [0]
+    for text in strings:
+        string_offsets.append(string_offsets[-1] + len(text))
+    data = "".join(strings).encode("utf-8")
+    header = _HEADER.pack(
+        MAGIC, FORMAT_VERSION, source_hash(source), len(node_offsets) - 1, len(strings), len(records), len(data)
+    )
+    return b"".join(
+        (header.ljust(_OFFSETS_START, b"\0"), _uint32_array(node_offsets), _uint32_array(string_offsets), records, data)
+    )
+
+
+def write_ast_cache(document: Document, source: str, path: Union[str, Path]) -> None:
+    """Write the cache of `document`, parsed from `source`, to `path`.
+
+    The file is written under a temporary name and then renamed, so readers
+    never see a partly written cache.
+    """
+    path = Path(path)
+    temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        temporary.write_bytes(encode_document(document, source))
+        os.replace(temporary, path)
+    finally:
+        temporary.unlink(missing_ok=True)
+
+
+class CachedChildren(Sequence[Node]):
+    """The top-level nodes of a cached document, decoded from the mapped file on first access.
+
+    Read-only, like `Document.children`. Decoded nodes are kept, so changes
+    to them (e.g. tokens set by `tokenize_document`) stick. Compares equal to
+    a list of the same nodes.
+    """
+
+    def __init__(self, buffer: mmap.mmap, source: str, node_count: int, string_count: int, records_size: int) -> None:
+        self._buffer = buffer
+        self._source = source
+        self._nodes: List[Optional[Node]] = [None] * node_count
+        self._node_offsets = self._uint32_view(_OFFSETS_START, node_count + 1)
+        strings_start = _OFFSETS_START + 4 * (node_count + 1)
+        self._string_offsets = self._uint32_view(strings_start, string_count + 1)
+        self._records_start = strings_start + 4 * (string_count + 1)
+        self._data_start = self._records_start + records_size
+        self._data: Optional[str] = None
+        self._all_decoded = node_count == 0
+
+    def _uint32_view(self, start: int, count: int) -> Sequence[int]:
+        view = memoryview(self._buffer)[start : start + 4 * count]
+        if sys.byteorder == "big":
+            swapped = array("I", view)
+            swapped.byteswap()
+            return swapped
+        return view.cast("I")
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    @overload
+    def __getitem__(self, index: int) -> Node: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Node]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self._nodes)))]
+        node = self._nodes[index]
+        if node is None:
+            index = index if index >= 0 else index + len(self._nodes)
+            node = self._decode_run(index, index + 1)[0]
+        return node
+
+    def __iter__(self) -> Iterator[Node]:
+        nodes = self._nodes
+        if not self._all_decoded:
+            # Decode everything not yet decoded in runs, which is much faster than node by node.
+            index = 0
+            count = len(nodes)
+            while index < count:
+                if nodes[index] is None:
+                    stop = index + 1
+                    while stop < count and nodes[stop] is None:
+                        stop += 1
+                    self._decode_run(index, stop)
+                    index = stop
+                else:
+                    index += 1
+            self._all_decoded = True
+        return iter(nodes)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (list, CachedChildren)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self)!r})"
+
+    def _decode_run(self, first: int, stop: int) -> List[Node]:
+        """Decode nodes `first` to `stop` - 1, which are stored back to back, and keep them."""
+        source = self._source
+        offsets = self._string_offsets
+        from_span = MarkdownInline.from_span
+        start = self._records_start + self._node_offsets[first]
+        records = self._buffer[start : self._records_start + self._node_offsets[stop]]
+        pos = 0
+        decoded: List[Node] = []
+
+        def varint() -> int:
+            nonlocal pos
+            value = records[pos]
+            pos += 1
+            if value < 0x80:
+                return value
+            value &= 0x7F
+            shift = 7
+            while True:
+                byte = records[pos]
+                pos += 1
+                value |= (byte & 0x7F) << shift
+                if byte < 0x80:
+                    return value
+                shift += 7
+
+        def string(index: int) -> str:
+            if self._data is None:
+                # One decode for all strings, on first use: parsed documents only store comments.
+                self._data = str(memoryview(self._buffer)[self._data_start :], "utf-8")
+            return self._data[offsets[index] : offsets[index + 1]]
+
+        def text(cls):
+            span = varint()
+            if span == _NOT_IN_SOURCE:
+                return cls(string(varint()))
+            return cls.from_span(source, span - 1, span - 1 + varint())
+
+        for _ in range(first, stop):
+            kind = records[pos]
+            pos += 1
+            if kind == PARAGRAPH:
+                lines = []
+                for _ in range(varint()):
+                    span = varint()
+                    if span == _NOT_IN_SOURCE:
+                        content = MarkdownInline(string(varint()))
+                    else:
+                        content = from_span(source, span - 1, span - 1 + varint())
+                    comment = varint()
+                    lines.append(ParagraphLine(content, None if comment == _NO_COMMENT else string(comment - 1)))
+                decoded.append(Paragraph(lines))
+            elif kind == HEADING:
+                level = varint()
+                decoded.append(Heading(level, text(MarkdownInline)))
+            elif kind == COMMENT:
+                decoded.append(Comment(string(varint())))
+            elif kind == MARKDOWN_BLOCK:
+                decoded.append(text(MarkdownBlock))
+            else:
+                raise ValueError(f"unknown node kind {kind} in cached document")
+        self._nodes[first:stop] = decoded
+        return decoded
+
+
+def load_ast_cache(path: Union[str, Path], source: str) -> Optional[Document]:
+    """The cached document at `path`, if it exists and was written from `source` in the current format; else None.
+
+    The file stays mapped while the document's nodes are in use.
+    """
+    try:
+        with open(path, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):  # Missing, unreadable or empty
+        return None
+    if len(buffer) < _OFFSETS_START:
+        return None
+    magic, version, digest, node_count, string_count, records_size, data_size = _HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != FORMAT_VERSION or digest != source_hash(source):
+        return None
+    if len(buffer) != _OFFSETS_START + 4 * (node_count + string_count + 2) + records_size + data_size:
+        return None  # Truncated
+    return Document(children=CachedChildren(buffer, source, node_count, string_count, records_size))
+
+
+def parse_spaceup_cached(source_path: Union[str, Path]) -> Document:
+    """Parse the Spaceup file at `source_path`, from its cache when it is up to date; otherwise parse and cache it."""
+    source = Path(source_path).read_text(encoding="utf-8")
+    path = cache_path(source_path)
+    document = load_ast_cache(path, source)
+    if document is None:
+        document = parse_spaceup_ast(source)
+        try:
+            write_ast_cache(document, source, path)
+        except OSError:
+            pass  # A read-only source directory only loses the cache
+    return document
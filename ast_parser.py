@@ -1,40 +1,110 @@
 from __future__ import annotations
 
+import json
 from dataclasses import dataclass, field
-from typing import List, Optional, Union
+from itertools import repeat
+from time import perf_counter
+from typing import IO, TYPE_CHECKING, Any, Iterable, Iterator, List, Optional, Sequence, Union
 
-from markdown_it.token import Token  # type: ignore
+from line_table import BLANK, COMMENT, LineStream, LineTable, build_line_table
 
+if TYPE_CHECKING:
+    from markdown_it.token import Token  # type: ignore
 
-@dataclass
-class MarkdownInline:
-    text: str
-    tokens: List[Token] = field(default_factory=list)
+    from inline_markdown import InlineCache
+    from profiling import ParseProfile
+
+
+class _TokenizedText:
+    """Markdown source text plus its markdown-it tokens.
+
+    The text is the span `source[start:end]`, sliced only when read: nodes from
+    `parse_spaceup_ast` point into the parsed document instead of holding
+    copies, and `start`/`end` are their positions in it. The token list is
+    only allocated when first used, since the parser does not fill it.
+    """
+
+    __slots__ = ("source", "start", "end", "_tokens")
+
+    def __init__(self, text: str, tokens: Optional[List[Token]] = None) -> None:
+        self.source = text
+        self.start = 0
+        self.end = len(text)
+        self._tokens = tokens
+
+    @classmethod
+    def from_span(cls, source: str, start: int, end: int) -> "_TokenizedText":
+        node = cls.__new__(cls)
+        node.source = source
+        node.start = start
+        node.end = end
+        node._tokens = None
+        return node
+
+    @property
+    def text(self) -> str:
+        source = self.source
+        if self.start == 0 and self.end == len(source):
+            return source
+        return source[self.start : self.end]
+
+    @text.setter
+    def text(self, text: str) -> None:
+        self.source = text
+        self.start = 0
+        self.end = len(text)
+
+    @property
+    def tokens(self) -> List[Token]:
+        if self._tokens is None:
+            self._tokens = []
+        return self._tokens
 
+    @tokens.setter
+    def tokens(self, tokens: List[Token]) -> None:
+        self._tokens = tokens
 
-@dataclass
+    @property
+    def has_tokens(self) -> bool:
+        """Whether tokens were filled in (see `tokenize_document`), without allocating an empty list."""
+        return bool(self._tokens)
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.text == other.text and (self._tokens or []) == (other._tokens or [])  # type: ignore[attr-defined]
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(text={self.text!r}, tokens={self._tokens or []!r})"
+
+
+class MarkdownInline(_TokenizedText):
+    __slots__ = ()
+
+
+@dataclass(slots=True)
 class Paragraph:
     lines: List["ParagraphLine"]
 
 
-@dataclass
+@dataclass(slots=True)
 class Heading:
     level: int
     content: MarkdownInline
 
 
-@dataclass
-class MarkdownBlock:
-    text: str
-    tokens: List[Token] = field(default_factory=list)
+class MarkdownBlock(_TokenizedText):
+    __slots__ = ()
 
 
-@dataclass
+@dataclass(slots=True)
 class Comment:
     text: str
 
 
-@dataclass
+@dataclass(slots=True)
 class ParagraphLine:
     content: MarkdownInline
     inline_comment: Optional[str] = None
@@ -43,168 +113,417 @@ class ParagraphLine:
 Node = Union[Heading, Paragraph, MarkdownBlock, Comment]
 
 
-@dataclass
+@dataclass(slots=True)
 class Document:
-    children: List[Node]
-
-
-def parse_spaceup_ast(input_str: str) -> Document:
-    lines = [line.rstrip() for line in input_str.splitlines()]
-
-    def compute_indent(line: str) -> Optional[int]:
-        stripped = line.lstrip()
-        if stripped == "" or stripped.startswith("//"):
-            return None
-        return len(line) - len(stripped)
-
-    def next_non_ws_indent(idx: int) -> int:
-        for i in range(idx + 1, len(lines)):
-            ind = compute_indent(lines[i])
-            if ind is not None:
-                return ind
-        return -1
-
-    def split_content_and_inline_comment(text: str) -> tuple[str, Optional[str]]:
-        stripped = text.lstrip()
-        search_start = 0
-        while True:
-            pos = stripped.find("//", search_start)
-            if pos == -1:
-                break
-            if pos == 0:
-                search_start = pos + 2
-                continue
-            if stripped[pos - 1].isspace():
-                return stripped[:pos].rstrip(), stripped[pos + 2 :].strip()
-            search_start = pos + 2
-        return stripped.strip(), None
-
-    children: List[Node] = []
-    indent_stack: List[int] = [0]
-    pos = 0
-    previous_non_ws_indent = 0
-
-    def parse_block(current_indent: int) -> None:
-        nonlocal pos, previous_non_ws_indent
-        while pos < len(lines):
-            # Skip blanks, but emit comment-only lines as Comment nodes
-            while pos < len(lines):
-                stripped = lines[pos].lstrip()
-                if stripped == "":
-                    pos += 1
-                    continue
-                if stripped.startswith("//"):
-                    comment_text = stripped[2:].strip()
-                    if comment_text:
-                        children.append(Comment(text=comment_text))
-                    pos += 1
-                    continue
-                break
+    # Read-only: a parsed document holds a list, but one loaded by `ast_cache` holds
+    # nodes decoded on access. Build a new `Document` to change the children.
+    children: Sequence[Node]
+    # Source and parser checkpoints kept by `incremental` for re-parsing after edits.
+    incremental_state: Any = field(default=None, compare=False, repr=False)
+
+    def span_shifts(self) -> Iterator[int]:
+        """For each child in order, the characters to add to its spans to get positions in the current source.
+
+        Always 0, except after `incremental.reparse_spaceup_ast`: nodes it keeps
+        from before an edit are shared with the older document, and keep the
+        spans of the source they were parsed from.
+        """
+        segments = self.incremental_state.shifts if self.incremental_state is not None else [(0, 0)]
+        count = len(self.children)
+        for (first, shift), (stop, _) in zip(segments, [*segments[1:], (count, 0)]):
+            yield from repeat(shift, stop - first)
 
-            if pos >= len(lines):
-                return
 
-            line = lines[pos]
-            indent = compute_indent(line)
-            if indent is None:
-                pos += 1
-                continue
-            if indent < current_indent:
-                return
+def split_content_and_inline_comment(text: str) -> tuple[str, Optional[str]]:
+    stripped = text.lstrip()
+    start, end, comment_start, comment_end = _split_bounds(stripped, 0, len(stripped.rstrip()))
+    if comment_start == -1:
+        return stripped[start:end], None
+    return stripped[start:end], stripped[comment_start:comment_end]
 
-            content_text, inline_comment = split_content_and_inline_comment(line)
-            if content_text == "":
-                pos += 1
-                continue
 
-            nxt_indent = next_non_ws_indent(pos)
+def _split_bounds(line: str, start: int, end: int) -> tuple[int, int, int, int]:
+    """Locate the content and the inline comment in `line[start:end]`, which has no surrounding whitespace.
 
-            has_blank_before_next = False
-            for i in range(pos + 1, len(lines)):
-                if compute_indent(lines[i]) is not None:
-                    break
-                if lines[i].strip():
-                    has_blank_before_next = True
-            is_heading = False
-            ambiguous_decrease = (
-                previous_non_ws_indent > indent and nxt_indent == indent and not has_blank_before_next
-            )
-            if nxt_indent > indent or (nxt_indent == indent and has_blank_before_next) or ambiguous_decrease:
-                is_heading = True
-
-            heading_level = len(indent_stack)
-            if is_heading:
-                children.append(
-                    Heading(level=heading_level, content=MarkdownInline(text=content_text, tokens=[]))
-                )
-                previous_non_ws_indent = indent
-                indent_stack.append(indent)
+    Returns (content_start, content_end, comment_start, comment_end); the
+    comment bounds are -1 when there is no inline comment.
+    """
+    search_start = start
+    while True:
+        pos = line.find("//", search_start, end)
+        if pos == -1:
+            break
+        if pos > start and line[pos - 1].isspace():
+            content_end = pos - 1
+            while line[content_end - 1].isspace():
+                content_end -= 1
+            comment_start = pos + 2
+            while comment_start < end and line[comment_start].isspace():
+                comment_start += 1
+            return start, content_end, comment_start, end
+        search_start = pos + 2
+    return start, end, -1, -1
+
+
+class SpaceupHandler:
+    """Receives parse events from `parse_spaceup_events`, SAX-style. Every method is a no-op by default.
+
+    Headings are entered when their line is parsed and exited when the block
+    of deeper-indented content below them ends. Comment-only lines arrive where
+    they appear in the source, so they can fall inside a heading's block.
+
+    The parser calls the `*_span` methods, which pass text as a span of
+    `source` instead of a copy, and by default slice it and forward to the
+    plain methods. For a string document `source` is the whole document; for
+    an iterable of lines it is the current line.
+    """
+
+    def enter_heading_span(self, level: int, source: str, start: int, end: int) -> None:
+        self.enter_heading(level, source[start:end])
+
+    def paragraph_line_span(self, source: str, start: int, end: int, comment_start: int, comment_end: int) -> None:
+        self.paragraph_line(source[start:end], source[comment_start:comment_end] if comment_start != -1 else None)
+
+    def comment_span(self, source: str, start: int, end: int) -> None:
+        self.comment(source[start:end])
+
+    def enter_heading(self, level: int, text: str) -> None:
+        pass
+
+    def exit_heading(self, level: int) -> None:
+        pass
+
+    def enter_paragraph(self) -> None:
+        pass
+
+    def paragraph_line(self, text: str, inline_comment: Optional[str]) -> None:
+        pass
+
+    def exit_paragraph(self) -> None:
+        pass
+
+    def comment(self, text: str) -> None:
+        pass
+
+
+# Event kinds yielded by `iter_spaceup_events`, each as a tuple:
+# (ENTER_HEADING, level, text), (EXIT_HEADING, level), (ENTER_PARAGRAPH,),
+# (PARAGRAPH_LINE, text, inline_comment), (EXIT_PARAGRAPH,), (COMMENT, text)
+ENTER_HEADING = "enter_heading"
+EXIT_HEADING = "exit_heading"
+ENTER_PARAGRAPH = "enter_paragraph"
+PARAGRAPH_LINE = "paragraph_line"
+EXIT_PARAGRAPH = "exit_paragraph"
+COMMENT_EVENT = "comment"
+
+Event = tuple
+
+
+class _EventCollector(SpaceupHandler):
+    def __init__(self, events: List[Event]) -> None:
+        self.events = events
+
+    def enter_heading(self, level: int, text: str) -> None:
+        self.events.append((ENTER_HEADING, level, text))
+
+    def exit_heading(self, level: int) -> None:
+        self.events.append((EXIT_HEADING, level))
+
+    def enter_paragraph(self) -> None:
+        self.events.append((ENTER_PARAGRAPH,))
+
+    def paragraph_line(self, text: str, inline_comment: Optional[str]) -> None:
+        self.events.append((PARAGRAPH_LINE, text, inline_comment))
+
+    def exit_paragraph(self) -> None:
+        self.events.append((EXIT_PARAGRAPH,))
+
+    def comment(self, text: str) -> None:
+        self.events.append((COMMENT_EVENT, text))
+
+
+class TreeBuilder(SpaceupHandler):
+    """Builds the `Document` node list from parse events."""
+
+    def __init__(self, children: Optional[List[Node]] = None) -> None:
+        self.children: List[Node] = [] if children is None else children
+        self._lines: List[ParagraphLine] = []
+
+    def enter_heading_span(self, level: int, source: str, start: int, end: int) -> None:
+        self.children.append(Heading(level=level, content=MarkdownInline.from_span(source, start, end)))
+
+    def enter_heading(self, level: int, text: str) -> None:
+        self.children.append(Heading(level=level, content=MarkdownInline(text)))
+
+    def enter_paragraph(self) -> None:
+        self._lines = []
+
+    def paragraph_line_span(self, source: str, start: int, end: int, comment_start: int, comment_end: int) -> None:
+        inline_comment = source[comment_start:comment_end] if comment_start != -1 else None
+        self._lines.append(ParagraphLine(content=MarkdownInline.from_span(source, start, end), inline_comment=inline_comment))
+
+    def paragraph_line(self, text: str, inline_comment: Optional[str]) -> None:
+        self._lines.append(ParagraphLine(content=MarkdownInline(text), inline_comment=inline_comment))
+
+    def exit_paragraph(self) -> None:
+        self.children.append(Paragraph(lines=self._lines))
+
+    def comment(self, text: str) -> None:
+        self.children.append(Comment(text=text))
+
+
+def _line_source(source: Union[str, Iterable[str]], stream: bool = False) -> Union[LineTable, LineStream]:
+    if isinstance(source, str):
+        return LineStream.from_string(source) if stream else build_line_table(source)
+    return LineStream(source)
+
+
+def parse_spaceup_ast(
+    input_str: str, profile: Optional[ParseProfile] = None, strict: bool = False, tokenize: bool = False
+) -> Document:
+    """Parse Spaceup markup into a `Document`; pass a `profiling.ParseProfile` to record where the time goes.
+
+    With `strict`, raise `indentation.IndentationError` for bad indentation, checked while splitting the lines.
+    With `tokenize`, fill in the markdown-it tokens of every node (see `tokenize_document`).
+    """
+    builder = TreeBuilder()
+    if profile is None:
+        for _ in parse_blocks(build_line_table(input_str, strict), builder):
+            pass
+        document = Document(children=builder.children)
+        return tokenize_document(document) if tokenize else document
+
+    start = perf_counter()
+    table = build_line_table(input_str, strict)
+    split_done = perf_counter()
+    for _ in parse_blocks(table, builder, profile=profile):
+        pass
+    profile.add_time("split", split_done - start)
+    profile.add_time("structure", perf_counter() - split_done)
+    profile.parses += 1
+    profile.lines += len(table)
+    profile.lookahead_lines += len(table)  # The line table links every line in one backward pass
+    document = Document(children=builder.children)
+    if tokenize:
+        start = perf_counter()
+        tokenize_document(document)
+        profile.add_time("inline", perf_counter() - start)
+    return document
+
+
+def tokenize_document(document: Document) -> Document:
+    """Set the `tokens` of every Markdown node in `document` from one shared markdown-it parser; returns `document`.
+
+    Inline content gets the inline tokens (the children of markdown-it's
+    `inline` token), Markdown blocks their block tokens. All inline content of
+    the document is tokenized in one batch, and nodes with the same text
+    share a token list, so treat tokens as read-only.
+    """
+    from inline_markdown import shared_markdown_it, tokenize_inline_batch
+
+    inline: List[MarkdownInline] = []
+    for node in document.children:
+        if isinstance(node, Heading):
+            inline.append(node.content)
+        elif isinstance(node, Paragraph):
+            inline.extend(line.content for line in node.lines)
+        elif isinstance(node, MarkdownBlock):
+            node.tokens = shared_markdown_it().parse(node.text)
+    for content, tokens in zip(inline, tokenize_inline_batch([content.text for content in inline])):
+        content.tokens = tokens
+    return document
+
+
+def parse_spaceup_events(source: Union[str, Iterable[str]], handler: SpaceupHandler, stream: bool = False) -> None:
+    """Push parse events for `source` (a string or an iterable of lines) to `handler`, without building nodes.
+
+    A string is split into a line table up front, which is fastest; with
+    `stream`, it is read one line at a time instead, so memory beyond the
+    string is bounded by the longest paragraph, at about twice the parse time.
+    Spans are positions in the string either way.
+    """
+    lines = _line_source(source, stream)
+    for pos, _ in parse_blocks(lines, handler):
+        if isinstance(lines, LineStream):
+            lines.release(pos)
+
+
+def iter_spaceup_events(source: Union[str, Iterable[str]]) -> Iterator[Event]:
+    """Pull parse events for `source` (a string or an iterable of lines) as tuples, block by block."""
+    lines = _line_source(source)
+    events: List[Event] = []
+    for pos, _ in parse_blocks(lines, _EventCollector(events)):
+        if isinstance(lines, LineStream):
+            lines.release(pos)
+        if events:
+            yield from events
+            events.clear()
+    yield from events
+
+
+def parse_blocks(
+    table: Union[LineTable, LineStream],
+    handler: SpaceupHandler,
+    pos: int = 0,
+    indent_stack: Optional[List[int]] = None,
+    previous_non_ws_indent: int = 0,
+    profile: Optional[ParseProfile] = None,
+) -> Iterator[tuple[int, int]]:
+    """Parse `table` from line `pos` on, sending events to `handler`.
+
+    A generator: yields `(pos, previous_non_ws_indent)` before every block,
+    when `indent_stack` (pass your own list to observe it) holds the indents of
+    the open headings. The parser state can be given to resume a parse midway;
+    closing the generator early stops parsing without exiting open headings.
+    A `profile` gets the nesting depth of every heading.
+    """
+    lines = table.lines
+    kinds = table.kinds
+    indents = table.indents
+    has_line = table.has_line
+    # Text goes to the handler as spans of the source, or of the line itself for streams.
+    source = table.source
+    starts = table.starts
+
+    def paragraph_line(pos: int, line: str, indent: int) -> None:
+        # Content lines have no surrounding whitespace past `indent`, so without "//" the content is all of it.
+        if "//" in line:
+            start, end, comment_start, comment_end = _split_bounds(line, indent, len(line))
+        else:
+            start, end, comment_start, comment_end = indent, len(line), -1, -1
+        if source is None:
+            handler.paragraph_line_span(line, start, end, comment_start, comment_end)
+            return
+        base = starts[pos]
+        if comment_start != -1:
+            comment_start += base
+            comment_end += base
+        handler.paragraph_line_span(source, base + start, base + end, comment_start, comment_end)
+
+    if indent_stack is None:
+        indent_stack = [0]
+    # Minimum indent of each open block, parallel to indent_stack.
+    block_indents: List[int] = [0] + [indent + 1 for indent in indent_stack[1:]]
+    while has_line(pos):
+        yield pos, previous_non_ws_indent
+        # Skip blanks, but emit comment-only lines as Comment nodes
+        while has_line(pos):
+            kind = kinds[pos]
+            if kind == BLANK:
                 pos += 1
-                if ambiguous_decrease:
-                    # Force subsequent same-indented lines as paragraph content
-                    lines_accum: List[ParagraphLine] = []
-                    while pos < len(lines):
-                        nindent = compute_indent(lines[pos])
-                        if nindent is None or nindent != indent:
-                            break
-                        ncontent, ncomment = split_content_and_inline_comment(lines[pos])
-                        if ncontent:
-                            lines_accum.append(ParagraphLine(
-                                content=MarkdownInline(text=ncontent, tokens=[]), inline_comment=ncomment
-                            ))
-                            previous_non_ws_indent = indent
-                        pos += 1
-                    if lines_accum:
-                        children.append(Paragraph(lines=lines_accum))
-                # Recurse into deeper content
-                parse_block(indent + 1)
-                indent_stack.pop()
-            else:
-                # Paragraph block: gather same-indented lines
-                lines_accum: List[ParagraphLine] = [
-                    ParagraphLine(content=MarkdownInline(text=content_text, tokens=[]), inline_comment=inline_comment)
-                ]
+                continue
+            if kind == COMMENT:
+                line = lines[pos]
+                comment_start = line.find("//") + 2
+                comment_end = len(line)
+                while comment_start < comment_end and line[comment_start].isspace():
+                    comment_start += 1
+                if comment_start < comment_end:
+                    if source is None:
+                        handler.comment_span(line, comment_start, comment_end)
+                    else:
+                        base = starts[pos]
+                        handler.comment_span(source, base + comment_start, base + comment_end)
                 pos += 1
-                while pos < len(lines):
-                    nindent = compute_indent(lines[pos])
-                    if nindent != indent:
+                continue
+            break
+
+        if not has_line(pos):
+            break
+
+        line = lines[pos]
+        indent = indents[pos]
+        if indent is None:
+            pos += 1
+            continue
+        if indent < block_indents[-1]:
+            block_indents.pop()
+            indent_stack.pop()
+            handler.exit_heading(len(indent_stack))
+            continue
+
+        nxt_indent = table.next_indent[pos]
+        has_blank_before_next = table.separated[pos]
+        is_heading = False
+        ambiguous_decrease = (
+            previous_non_ws_indent > indent and nxt_indent == indent and not has_blank_before_next
+        )
+        if nxt_indent > indent or (nxt_indent == indent and has_blank_before_next) or ambiguous_decrease:
+            is_heading = True
+
+        heading_level = len(indent_stack)
+        if is_heading:
+            # An inline comment on a heading line is dropped
+            end = _split_bounds(line, indent, len(line))[1] if "//" in line else len(line)
+            if source is None:
+                handler.enter_heading_span(heading_level, line, indent, end)
+            else:
+                base = starts[pos]
+                handler.enter_heading_span(heading_level, source, base + indent, base + end)
+            previous_non_ws_indent = indent
+            indent_stack.append(indent)
+            if profile is not None:
+                profile.nested(len(indent_stack) - 1)
+            pos += 1
+            if ambiguous_decrease:
+                # Force subsequent same-indented lines as paragraph content
+                in_paragraph = False
+                while has_line(pos):
+                    nindent = indents[pos]
+                    if nindent is None or nindent != indent:
                         break
-                    ncontent, ncomment = split_content_and_inline_comment(lines[pos])
-                    if ncontent:
-                        lines_accum.append(
-                            ParagraphLine(content=MarkdownInline(text=ncontent, tokens=[]), inline_comment=ncomment)
-                        )
-                        previous_non_ws_indent = indent
+                    if not in_paragraph:
+                        handler.enter_paragraph()
+                        in_paragraph = True
+                    paragraph_line(pos, lines[pos], indent)
+                    previous_non_ws_indent = indent
                     pos += 1
-                children.append(Paragraph(lines=lines_accum))
+                if in_paragraph:
+                    handler.exit_paragraph()
+            # Descend into deeper content
+            block_indents.append(indent + 1)
+        else:
+            # Paragraph block: gather same-indented lines
+            handler.enter_paragraph()
+            paragraph_line(pos, line, indent)
+            pos += 1
+            while has_line(pos):
+                if indents[pos] != indent:
+                    break
+                paragraph_line(pos, lines[pos], indent)
                 previous_non_ws_indent = indent
+                pos += 1
+            handler.exit_paragraph()
+            previous_non_ws_indent = indent
+
+    # End of input closes every open heading
+    while len(indent_stack) > 1:
+        indent_stack.pop()
+        handler.exit_heading(len(indent_stack))
 
-    parse_block(0)
-    return Document(children=children)
 
+def render_ast_to_html(ast: Document, inline_cache: Optional["InlineCache"] = None) -> str:
+    from inline_markdown import InlineBatch
 
-def render_ast_to_html(ast: Document) -> str:
-    import mistune
+    inline_batch = InlineBatch(inline_cache)
 
-    def render_inline_md(text: str) -> str:
-        html = mistune.html(text).strip()
-        if html.startswith('<p>') and html.endswith('</p>'):
-            html = html[3:-4]
-        return html
+    def render_inline_md(text: str) -> int:
+        # Deferred: all fragments are rendered together when the output is joined
+        return inline_batch.add(text)
 
-    output: List[str] = []
+    output: List[Union[str, tuple]] = []
 
     for node in ast.children:
         if isinstance(node, Heading):
             rendered = render_inline_md(node.content.text)
-            output.append(f"<h{node.level}>{rendered}</h{node.level}>")
+            output.append((f"<h{node.level}>", rendered, f"</h{node.level}>"))
         elif isinstance(node, Paragraph):
             # Detect simple unordered list paragraph (all lines start with '- ')
             if node.lines and all(line.content.text.lstrip().startswith("- ") for line in node.lines):
                 output.append("<ul>")
                 for line in node.lines:
                     item_text = line.content.text.lstrip()[2:].strip()
-                    output.append(f"    <li>{render_inline_md(item_text)}</li>")
+                    output.append(("    <li>", render_inline_md(item_text), "</li>"))
                 output.append("</ul>")
                 continue
 
@@ -212,9 +531,9 @@ def render_ast_to_html(ast: Document) -> str:
             for line in node.lines:
                 rendered = render_inline_md(line.content.text)
                 if line.inline_comment:
-                    output.append(f"    {rendered}  <!-- {line.inline_comment} --><br>")
+                    output.append(("    ", rendered, f"  <!-- {line.inline_comment} --><br>"))
                 else:
-                    output.append(f"    {rendered}<br>")
+                    output.append(("    ", rendered, "<br>"))
             output.append("</p>")
         elif isinstance(node, Comment):
             # Top-level comments (not currently produced) – keep for completeness
@@ -224,6 +543,123 @@ def render_ast_to_html(ast: Document) -> str:
             # MarkdownBlock not used yet; fallback to paragraph rendering
             pass
 
-    return "\n".join(output)
+    return inline_batch.join(output)
+
+
+def _heading_dict(level: int, content: MarkdownInline, shift: int = 0) -> dict:
+    start = content.start + shift
+    return {"type": "heading", "level": level, "text": content.text, "start": start, "end": content.end + shift}
 
 
+def _line_dict(line: ParagraphLine, shift: int = 0) -> dict:
+    content = line.content
+    return {
+        "text": content.text,
+        "start": content.start + shift,
+        "end": content.end + shift,
+        "inlineComment": line.inline_comment,
+    }
+
+
+def _node_to_dict(node: Node, shift: int = 0) -> Optional[dict]:
+    if isinstance(node, Heading):
+        return _heading_dict(node.level, node.content, shift)
+    if isinstance(node, Paragraph):
+        return {"type": "paragraph", "lines": [_line_dict(line, shift) for line in node.lines]}
+    if isinstance(node, Comment):
+        return {"type": "comment", "text": node.text}
+    if isinstance(node, MarkdownBlock):
+        return {"type": "markdownBlock", "text": node.text}
+    return None
+
+
+def document_to_dict(document: Document) -> dict:
+    """A JSON-ready dict of `document`, with the source span of every heading and paragraph line."""
+    converted_children = map(_node_to_dict, document.children, document.span_shifts())
+    children = [converted for converted in converted_children if converted is not None]
+    return {"type": "document", "children": children}
+
+
+class JsonArrayWriter:
+    """Writes a JSON object with one array member, an item at a time, to a text file-like `out`.
+
+    `head` is the JSON before the array's first item and `tail` the JSON after
+    its last. Items are separated as `json.dumps` separates them, so the
+    output equals `json.dumps` of the whole object. Writes go out in chunks
+    of about `chunk_size` characters; call `close` to write the rest.
+    """
+
+    def __init__(self, out: IO[str], head: str, tail: str, chunk_size: int = 65536) -> None:
+        self.out = out
+        self.tail = tail
+        self.chunk_size = chunk_size
+        self._chunk: List[str] = [head]
+        self._size = len(head)
+        self._separator = ""
+
+    def write(self, item: Any) -> None:
+        text = self._separator + json.dumps(item)
+        self._separator = ", "
+        self._chunk.append(text)
+        self._size += len(text)
+        if self._size >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        self.out.write("".join(self._chunk))
+        self._chunk.clear()
+        self._size = 0
+
+    def close(self) -> None:
+        self._chunk.append(self.tail)
+        self.flush()
+
+
+class AstJsonWriter(SpaceupHandler):
+    """Writes the JSON of `document_to_dict` straight from the parse events of a string document."""
+
+    def __init__(self, out: IO[str], chunk_size: int = 65536) -> None:
+        self.writer = JsonArrayWriter(out, '{"type": "document", "children": [', "]}", chunk_size)
+        self._lines: List[dict] = []
+
+    def enter_heading_span(self, level: int, source: str, start: int, end: int) -> None:
+        self.writer.write(_heading_dict(level, MarkdownInline.from_span(source, start, end)))
+
+    def enter_paragraph(self) -> None:
+        self._lines = []
+
+    def paragraph_line_span(self, source: str, start: int, end: int, comment_start: int, comment_end: int) -> None:
+        inline_comment = source[comment_start:comment_end] if comment_start != -1 else None
+        self._lines.append({"text": source[start:end], "start": start, "end": end, "inlineComment": inline_comment})
+
+    def exit_paragraph(self) -> None:
+        self.writer.write({"type": "paragraph", "lines": self._lines})
+
+    def comment(self, text: str) -> None:
+        self.writer.write({"type": "comment", "text": text})
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def write_ast_json(source: Union[Document, str], out: IO[str], chunk_size: int = 65536) -> None:
+    """Write `json.dumps(document_to_dict(...))` of `source` to `out` without building the dict tree.
+
+    A `Document` is written node by node. A string is read one line at a time
+    and parsed straight into JSON, without a line table or a `Document`, so
+    memory beyond the string is bounded by the longest paragraph. Spans are offsets into the whole
+    document, which an iterable of lines cannot give, so lines are not accepted.
+    """
+    if isinstance(source, Document):
+        writer = JsonArrayWriter(out, '{"type": "document", "children": [', "]}", chunk_size)
+        for node, shift in zip(source.children, source.span_shifts()):
+            converted = _node_to_dict(node, shift)
+            if converted is not None:
+                writer.write(converted)
+        writer.close()
+        return
+    if not isinstance(source, str):
+        raise TypeError(f"write_ast_json needs a Document or a string, not {type(source).__name__}")
+    handler = AstJsonWriter(out, chunk_size)
+    parse_spaceup_events(source, handler, stream=True)
+    handler.close()
@@ -0,0 +1,330 @@
+"""
+Render many Spaceup files in parallel, across a pool of worker processes.
+
+Files are handed to the workers in chunks, and each worker builds the
+Markdown renderer and an inline cache once, then reuses them for every file
+it renders. Results come back in input order and are written by the parent
+process, so outputs appear in the same order on every run.
+
+    python -m batch docs/ --out build/ --jobs 8
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from dataclasses import asdict, dataclass, field
+from itertools import repeat
+from pathlib import Path
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from inline_markdown import InlineCache
+
+if TYPE_CHECKING:
+    from render_cache import RenderCache
+
+DEFAULT_PATTERN = "*.sup"
+
+# The parsers, the pool, the render cache and json are imported where they are first needed,
+# so the CLI can start (e.g. for --version or --check) without them.
+
+
+def _render_html(text: str, cache: Optional[InlineCache]) -> str:
+    from parser import parse_spaceup
+
+    return parse_spaceup(text, inline_cache=cache)
+
+
+def _render_ast(text: str, cache: Optional[InlineCache]) -> str:
+    import json
+
+    from ast_parser import document_to_dict, parse_spaceup_ast
+
+    return json.dumps(document_to_dict(parse_spaceup_ast(text)), indent=2)
+
+
+def _render_mdast(text: str, cache: Optional[InlineCache]) -> str:
+    import json
+
+    from adaptors.mdast.mdast import spaceup_to_mdast
+
+    return json.dumps(spaceup_to_mdast(text), indent=2)
+
+
+# Output format: (suffix of the output file, renderer)
+FORMATS: Dict[str, Tuple[str, Callable[[str, Optional[InlineCache]], str]]] = {
+    "html": (".html", _render_html),
+    "ast": (".ast.json", _render_ast),
+    "mdast": (".mdast.json", _render_mdast),
+}
+
+
+def render_source(text: str, output_format: str = "html", cache: Optional[InlineCache] = None) -> str:
+    """Render Spaceup `text` as `output_format`, one of `FORMATS`."""
+    return FORMATS[output_format][1](text, cache)
+
+
+# (path, output or None, seconds, characters read, error or None, served from the render cache or None without one),
+# as returned by the workers
+_Rendered = Tuple[str, Optional[str], float, int, Optional[str], Optional[bool]]
+
+_worker_cache: Optional[InlineCache] = None
+_worker_render_cache: Optional[RenderCache] = None
+
+
+@dataclass
+class FileResult:
+    path: Path
+    output: Optional[Path]  # None if rendering failed
+    seconds: float  # Reading and rendering, in the worker
+    chars: int
+    error: Optional[str] = None
+    cached: Optional[bool] = None  # Whether the output came from the render cache; None without one
+
+
+@dataclass
+class BatchReport:
+    results: List[FileResult] = field(default_factory=list)
+    seconds: float = 0.0  # Wall-clock time of the whole batch
+    jobs: int = 1
+    chunksize: int = 1
+
+    @property
+    def chars(self) -> int:
+        return sum(result.chars for result in self.results)
+
+    @property
+    def failed(self) -> List[FileResult]:
+        return [result for result in self.results if result.error is not None]
+
+    @property
+    def cache_hits(self) -> int:
+        return sum(1 for result in self.results if result.cached)
+
+    @property
+    def cache_misses(self) -> int:
+        return sum(1 for result in self.results if result.cached is False)
+
+    @property
+    def files_per_second(self) -> float:
+        return len(self.results) / self.seconds if self.seconds else 0.0
+
+    @property
+    def chars_per_second(self) -> float:
+        return self.chars / self.seconds if self.seconds else 0.0
+
+    def summary(self) -> str:
+        summary = (
+            f"{len(self.results)} files ({len(self.failed)} failed), {self.chars} chars in {self.seconds:.3f}s "
+            f"with {self.jobs} jobs: {self.files_per_second:.1f} files/s, {self.chars_per_second / 1e6:.2f} M chars/s"
+        )
+        if self.cache_hits or self.cache_misses:
+            summary += f", {self.cache_hits} cached, {self.cache_misses} rendered"
+        return summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "files": [{**asdict(result), "path": str(result.path), "output": result.output and str(result.output)} for result in self.results],
+            "seconds": self.seconds,
+            "jobs": self.jobs,
+            "chunksize": self.chunksize,
+            "chars": self.chars,
+            "failed": len(self.failed),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "files_per_second": self.files_per_second,
+            "chars_per_second": self.chars_per_second,
+        }
+
+
+def collect_sources(target: Union[str, Path], pattern: str = DEFAULT_PATTERN) -> List[Path]:
+    """The files to render for `target`: a directory (searched recursively for `pattern`), a glob, or a file."""
+    from glob import glob
+
+    target = str(target)
+    if os.path.isdir(target):
+        return sorted(path for path in Path(target).rglob(pattern) if path.is_file())
+    if any(char in target for char in "*?["):
+        return sorted(Path(path) for path in glob(target, recursive=True) if os.path.isfile(path))
+    return [Path(target)] if os.path.isfile(target) else []
+
+
+def _render_file(
+    path: str, output_format: str, cache: Optional[InlineCache], render_cache: Optional[RenderCache] = None
+) -> _Rendered:
+    start = perf_counter()
+    cached = None
+    try:
+        text = Path(path).read_text(encoding="utf-8")
+        if render_cache is None:
+            rendered = render_source(text, output_format, cache)
+        else:
+            key = render_cache.key(text, output_format)
+            rendered = render_cache.get(key)
+            cached = rendered is not None
+            if rendered is None:
+                rendered = render_source(text, output_format, cache)
+                render_cache.put(key, rendered)
+    except Exception as error:  # One bad file should not abort the batch
+        return path, None, perf_counter() - start, 0, f"{type(error).__name__}: {error}", cached
+    return path, rendered, perf_counter() - start, len(text), None, cached
+
+
+def _open_render_cache(cache_dir: Optional[str], max_bytes: Optional[int]) -> Optional[RenderCache]:
+    if cache_dir is None:
+        return None
+    from render_cache import DEFAULT_MAX_BYTES, RenderCache
+
+    return RenderCache(cache_dir, DEFAULT_MAX_BYTES if max_bytes is None else max_bytes)
+
+
+def _init_worker(output_format: str, cache_dir: Optional[str] = None, cache_max_bytes: Optional[int] = None) -> None:
+    global _worker_cache, _worker_render_cache
+    # Fragments repeat across the files of a batch, so each worker keeps one cache for all of them.
+    _worker_cache = InlineCache()
+    _worker_render_cache = _open_render_cache(cache_dir, cache_max_bytes)
+    # Import the parser and build the Markdown renderer now, not inside the timing of the worker's first file.
+    render_source("warm\n    *up* // worker", output_format)
+
+
+def _render_in_worker(path: str, output_format: str) -> _Rendered:
+    return _render_file(path, output_format, _worker_cache, _worker_render_cache)
+
+
+def output_path(path: Path, output_dir: Optional[Path], root: Optional[Path], output_format: str = "html") -> Path:
+    """Where the rendering of `path` goes: under `output_dir` at its place below `root`, or next to it."""
+    suffix = FORMATS[output_format][0]
+    if output_dir is None:
+        return path.with_suffix(suffix)
+    relative = path.absolute().relative_to(root) if root is not None else Path(path.name)
+    return output_dir / relative.with_suffix(suffix)
+
+
+def render_batch(
+    paths: Iterable[Union[str, Path]],
+    output_dir: Optional[Union[str, Path]] = None,
+    *,
+    root: Optional[Union[str, Path]] = None,
+    jobs: Optional[int] = None,
+    chunksize: Optional[int] = None,
+    output_format: str = "html",
+    cache_dir: Optional[Union[str, Path]] = None,
+    cache_max_bytes: Optional[int] = None,
+) -> BatchReport:
+    """Render every file in `paths` as `output_format`, `jobs` files at a time (default: one per CPU).
+
+    Outputs go to `output_dir`, mirroring the layout of the sources below
+    `root` (default: their common directory), or next to each source if no
+    `output_dir` is given. Files that fail to render or to be written are
+    reported, not raised; a `root` that does not contain every path raises
+    `ValueError` before anything is rendered.
+    With a `cache_dir`, outputs of unchanged files come from a `RenderCache`
+    there, bounded to `cache_max_bytes` (default: `render_cache.DEFAULT_MAX_BYTES`).
+    """
+    paths = [Path(path) for path in paths]
+    jobs = max(1, jobs or os.cpu_count() or 1)
+    if chunksize is None:
+        # Several chunks per worker, so a slow chunk does not leave the others idle at the end.
+        chunksize = max(1, len(paths) // (jobs * 4))
+    if output_dir is not None:
+        output_dir = Path(output_dir)
+        if root is None and paths:
+            root = os.path.commonpath([path.absolute().parent for path in paths])
+    root = Path(root).absolute() if root is not None else None
+    if output_dir is not None and root is not None:
+        outside = [str(path) for path in paths if not path.absolute().is_relative_to(root)]
+        if outside:
+            raise ValueError(f"Files outside the root {str(root)!r}: {', '.join(outside)}")
+    if output_format not in FORMATS:
+        raise ValueError(f"Unknown output format {output_format!r}; expected one of {', '.join(FORMATS)}")
+
+    report = BatchReport(jobs=jobs, chunksize=chunksize)
+    start = perf_counter()
+    names = [str(path) for path in paths]
+    cache_dir = str(cache_dir) if cache_dir is not None else None
+    if jobs == 1 or len(paths) <= 1:
+        cache = InlineCache()
+        render_cache = _open_render_cache(cache_dir, cache_max_bytes)
+        rendered = (_render_file(name, output_format, cache, render_cache) for name in names)
+        _write_results(report, rendered, output_dir, root, output_format)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_worker, initargs=(output_format, cache_dir, cache_max_bytes)
+        ) as executor:
+            rendered = executor.map(_render_in_worker, names, repeat(output_format), chunksize=chunksize)
+            _write_results(report, rendered, output_dir, root, output_format)
+    report.seconds = perf_counter() - start
+    return report
+
+
+def _write_results(
+    report: BatchReport,
+    rendered: Iterator[_Rendered],
+    output_dir: Optional[Path],
+    root: Optional[Path],
+    output_format: str,
+) -> None:
+    for name, text, seconds, chars, error, cached in rendered:
+        path = Path(name)
+        output = None
+        if text is not None:
+            try:
+                output = output_path(path, output_dir, root, output_format)
+                output.parent.mkdir(parents=True, exist_ok=True)
+                output.write_text(text, encoding="utf-8")
+            except (OSError, ValueError) as write_error:  # Like a render error, it only fails this file
+                output = None
+                error = f"{type(write_error).__name__}: {write_error}"
+        report.results.append(
+            FileResult(path=path, output=output, seconds=seconds, chars=chars, error=error, cached=cached)
+        )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    import argparse
+    import json
+
+    arg_parser = argparse.ArgumentParser(prog="python -m batch", description="Render Spaceup files in parallel.")
+    arg_parser.add_argument("target", help="a directory, a glob (quote it), or a single file")
+    arg_parser.add_argument("--out", help="directory for the output files (default: next to each source)")
+    arg_parser.add_argument("--format", "-f", choices=FORMATS, default="html", help="output format (default: html)")
+    arg_parser.add_argument("--pattern", default=DEFAULT_PATTERN, help=f"file pattern within a directory (default: {DEFAULT_PATTERN})")
+    arg_parser.add_argument("--jobs", "-j", type=int, help="worker processes (default: one per CPU)")
+    arg_parser.add_argument("--chunksize", type=int, help="files handed to a worker at a time")
+    arg_parser.add_argument("--cache", help="directory of a render cache, to skip files rendered before")
+    arg_parser.add_argument("--cache-size", type=int, help="render cache bound, in MiB (default: 256)")
+    arg_parser.add_argument("--json", action="store_true", help="print the report as JSON on stdout")
+    args = arg_parser.parse_args(argv)
+
+    paths = collect_sources(args.target, args.pattern)
+    if not paths:
+        print(f"No files found for {args.target!r}", file=sys.stderr)
+        return 1
+    root = args.target if os.path.isdir(args.target) else None
+    report = render_batch(
+        paths,
+        args.out,
+        root=root,
+        jobs=args.jobs,
+        chunksize=args.chunksize,
+        output_format=args.format,
+        cache_dir=args.cache,
+        cache_max_bytes=args.cache_size * 2**20 if args.cache_size is not None else None,
+    )
+
+    if args.json:
+        json.dump(report.to_dict(), sys.stdout, indent=2)
+        print()
+    else:
+        for result in report.results:
+            status = f"error: {result.error}" if result.error else f"{result.chars} chars"
+            print(f"{result.seconds * 1000:9.2f} ms  {result.path}  ({status})", file=sys.stderr)
+        print(report.summary(), file=sys.stderr)
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,11 @@
+"""
+Speed benchmarks for the Spaceup parsers, over synthetic documents.
+
+    python -m benchmarks --sizes 1000 10000 --output results.json
+    python -m benchmarks --sizes 1000 10000 --compare results.json
+"""
+
+from benchmarks.corpus import CorpusOptions, generate_document
+from benchmarks.run import BENCHMARKS, compare_results, run_benchmarks
+
+__all__ = ["BENCHMARKS", "CorpusOptions", "compare_results", "generate_document", "run_benchmarks"]
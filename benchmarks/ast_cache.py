@@ -0,0 +1,47 @@
+"""Benchmark for loading a document from its binary AST cache against re-parsing it.
+
+    python -m benchmarks.ast_cache --lines 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import timeit
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+from ast_cache import load_ast_cache, write_ast_cache
+from ast_parser import parse_spaceup_ast
+from benchmarks.corpus import CorpusOptions, generate_document
+
+
+def run(lines: int = 50_000, repeat: int = 5) -> Dict[str, float]:
+    """Best times, in seconds, of a parse, of loading the cache, and of loading it and decoding every node."""
+    text = generate_document(lines, CorpusOptions())
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "document.sup.astc"
+        write_ast_cache(parse_spaceup_ast(text), text, path)
+
+        def best(function) -> float:
+            return min(timeit.repeat(function, number=1, repeat=repeat))
+
+        return {
+            "parse": best(lambda: parse_spaceup_ast(text)),
+            "load": best(lambda: load_ast_cache(path, text)),
+            "load all": best(lambda: list(load_ast_cache(path, text).children)),  # type: ignore[union-attr]
+        }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(prog="python -m benchmarks.ast_cache", description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--lines", type=int, default=50_000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args(argv)
+    for name, seconds in run(args.lines, args.repeat).items():
+        print(f"{name:>8}: {seconds * 1000:8.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
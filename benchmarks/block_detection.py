@@ -0,0 +1,53 @@
+"""Microbenchmark for block detection in `parse_spaceup`, on list-heavy and table-heavy documents.
+
+    python -m benchmarks.block_detection --lines 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import timeit
+from typing import Dict, Optional, Sequence
+
+from benchmarks.corpus import CorpusOptions, generate_document
+from parser import parse_spaceup
+from profiling import ParseProfile
+
+SHAPES: Dict[str, CorpusOptions] = {
+    "list-heavy": CorpusOptions(list_ratio=0.8, ordered_ratio=0.5, table_ratio=0.0),
+    "table-heavy": CorpusOptions(list_ratio=0.0, table_ratio=0.8),
+    "quote-heavy": CorpusOptions(list_ratio=0.0, table_ratio=0.0, quote_ratio=0.8),
+}
+
+
+def run(lines: int = 20_000, repeat: int = 5) -> Dict[str, Dict[str, float]]:
+    """Best times of each document shape, in seconds: the whole parse, and its `structure` phase.
+
+    The structure phase is where blocks are detected; it leaves out emitting
+    HTML and inline Markdown, which dominate the whole parse.
+    """
+    timings = {}
+    for shape, options in SHAPES.items():
+        text = generate_document(lines, options)
+        structure = []
+        for _ in range(repeat):
+            profile = ParseProfile()
+            parse_spaceup(text, profile=profile)
+            structure.append(profile.seconds["structure"])
+        parse = min(timeit.repeat(lambda text=text: parse_spaceup(text), number=1, repeat=repeat))
+        timings[shape] = {"parse": parse, "structure": min(structure)}
+    return timings
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(prog="python -m benchmarks.block_detection", description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--lines", type=int, default=20_000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args(argv)
+    for shape, seconds in run(args.lines, args.repeat).items():
+        print(f"{shape:>12}: parse {seconds['parse'] * 1000:8.2f} ms, structure {seconds['structure'] * 1000:8.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,86 @@
+"""Synthetic Spaceup documents with tunable size and shape, for benchmarks."""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from typing import List, Optional
+
+ONE_INDENT = " " * 4
+
+_WORDS = (
+    "spaceup indentation heading paragraph structure outline markdown render parser line block "
+    "nested level comment list table quote example document note idea detail summary"
+).split()
+
+
+@dataclass(frozen=True)
+class CorpusOptions:
+    """Shape of a generated document. Ratios are the chance that a block is of that kind."""
+
+    max_depth: int = 4
+    comment_ratio: float = 0.1  # Comment-only lines, and inline comments on paragraph lines
+    list_ratio: float = 0.15
+    table_ratio: float = 0.05
+    # Share of lists that are numbered, and chance of a blockquote; off by default so
+    # documents generated before these existed stay the same.
+    ordered_ratio: float = 0.0
+    quote_ratio: float = 0.0
+    max_blank_run: int = 2  # Blank lines after a block: 0 to this many
+    markup_ratio: float = 0.2  # Paragraph lines with inline Markdown (bold, code, links)
+    seed: int = 0
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def _paragraph_line(rng: random.Random, options: CorpusOptions) -> str:
+    text = _sentence(rng, rng.randint(4, 12)).capitalize()
+    if rng.random() < options.markup_ratio:
+        word = rng.choice(_WORDS)
+        text += rng.choice([f" **{word}**", f" `{word}`", f" [{word}](https://example.com/{word})", f" *{word}*"])
+    if rng.random() < options.comment_ratio:
+        text += f" // {_sentence(rng, 3)}"
+    return text
+
+
+def generate_document(lines: int, options: Optional[CorpusOptions] = None) -> str:
+    """A valid Spaceup document of about `lines` lines, deterministic for a given `options.seed`."""
+    if options is None:
+        options = CorpusOptions()
+    rng = random.Random(options.seed)
+    out: List[str] = []
+    depth = 0
+    while len(out) < lines:
+        # Headings open the next level; dedent at random to climb back up.
+        if depth and rng.random() < 0.25:
+            depth = rng.randint(0, depth - 1)
+        indent = ONE_INDENT * (depth + 1)
+        out.append(ONE_INDENT * depth + _sentence(rng, rng.randint(1, 4)).capitalize())
+
+        roll = rng.random()
+        if roll < options.comment_ratio:
+            out.append(f"{indent}// {_sentence(rng, 5)}")
+        roll = rng.random()
+        if roll < options.list_ratio:
+            if options.ordered_ratio and rng.random() < options.ordered_ratio:
+                out.extend(f"{indent}{n}. {_sentence(rng, rng.randint(2, 6))}" for n in range(1, rng.randint(3, 7)))
+            else:
+                out.extend(f"{indent}- {_sentence(rng, rng.randint(2, 6))}" for _ in range(rng.randint(2, 6)))
+        elif roll < options.list_ratio + options.table_ratio:
+            columns = rng.randint(2, 4)
+            out.append(indent + "| " + " | ".join(_sentence(rng, 1) for _ in range(columns)) + " |")
+            out.append(indent + "|" + "---|" * columns)
+            for _ in range(rng.randint(2, 6)):
+                out.append(indent + "| " + " | ".join(_sentence(rng, 2) for _ in range(columns)) + " |")
+        elif roll < options.list_ratio + options.table_ratio + options.quote_ratio:
+            out.extend(f"{indent}> {_sentence(rng, rng.randint(3, 8))}" for _ in range(rng.randint(1, 4)))
+        elif depth + 1 < options.max_depth and rng.random() < 0.5:
+            # A subheading instead of content: the next block goes one level deeper.
+            depth += 1
+            continue
+        else:
+            out.extend(indent + _paragraph_line(rng, options) for _ in range(rng.randint(1, 5)))
+        out.extend([""] * rng.randint(0, options.max_blank_run))
+    return "\n".join(out[:lines]) + "\n"
@@ -0,0 +1,69 @@
+"""Benchmark for the list, table and blockquote emitters of `parse_spaceup` on very long blocks.
+
+    python -m benchmarks.emitters --rows 10000 --columns 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import timeit
+from typing import Dict, Optional, Sequence
+
+from parser import parse_spaceup
+from profiling import ParseProfile
+
+ONE_INDENT = " " * 4
+
+
+def long_list(items: int) -> str:
+    return "Inventory\n" + "".join(f"{ONE_INDENT}- item {n} in bin {n % 97}\n" for n in range(items))
+
+
+def long_ordered_list(items: int) -> str:
+    return "Inventory\n" + "".join(f"{ONE_INDENT}{n + 1}. item {n} in bin {n % 97}\n" for n in range(items))
+
+
+def wide_table(rows: int, columns: int) -> str:
+    header = ONE_INDENT + "| " + " | ".join(f"column {c}" for c in range(columns)) + " |\n"
+    separator = ONE_INDENT + "|" + "---|" * columns + "\n"
+    body = "".join(ONE_INDENT + "| " + " | ".join(f"r{r}c{c}" for c in range(columns)) + " |\n" for r in range(rows))
+    return "Inventory\n" + header + separator + body
+
+
+def long_quote(lines: int) -> str:
+    return "Quotes\n" + "".join(f"{ONE_INDENT}> quoted line {n}\n" for n in range(lines))
+
+
+def run(rows: int = 10_000, columns: int = 20, repeat: int = 3) -> Dict[str, Dict[str, float]]:
+    """Best times per document, in seconds: the whole parse, and its `emit` phase."""
+    documents = {
+        "list": long_list(rows),
+        "ordered list": long_ordered_list(rows),
+        "table": wide_table(rows, columns),
+        "blockquote": long_quote(rows),
+    }
+    timings = {}
+    for name, text in documents.items():
+        emit = []
+        for _ in range(repeat):
+            profile = ParseProfile()
+            parse_spaceup(text, profile=profile)
+            emit.append(profile.seconds["emit"])
+        parse = min(timeit.repeat(lambda text=text: parse_spaceup(text), number=1, repeat=repeat))
+        timings[name] = {"parse": parse, "emit": min(emit)}
+    return timings
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(prog="python -m benchmarks.emitters", description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--rows", type=int, default=10_000, help="list items, table rows and quote lines")
+    arg_parser.add_argument("--columns", type=int, default=20, help="table columns")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args(argv)
+    for name, seconds in run(args.rows, args.columns, args.repeat).items():
+        print(f"{name:>12}: parse {seconds['parse'] * 1000:8.2f} ms, emit {seconds['emit'] * 1000:8.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,55 @@
+"""Benchmark for `document_to_mdast` with phrasing nodes from tokens against the text-only conversion.
+
+    python -m benchmarks.mdast_phrasing --headings 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import timeit
+from typing import Dict, Optional, Sequence
+
+from adaptors.mdast.mdast import document_to_mdast
+from ast_parser import parse_spaceup_ast, tokenize_document
+
+ONE_INDENT = " " * 4
+
+_MARKUP = ("plain words", "*emphasis*", "**strong** text", "`code` span", "[a link](https://example.com/{n})")
+
+
+def headings_document(headings: int) -> str:
+    """A document of `headings` headings with a paragraph line each, mixing plain text and inline Markdown."""
+    return "".join(
+        f"Heading {n} {_MARKUP[n % len(_MARKUP)].format(n=n)}\n{ONE_INDENT}Line {n} {_MARKUP[(n + 2) % len(_MARKUP)].format(n=n)}\n"
+        for n in range(headings)
+    )
+
+
+def run(headings: int = 10_000, repeat: int = 3) -> Dict[str, float]:
+    """Best times, in seconds, of the text-only conversion, of tokenizing, and of converting from tokens."""
+    text = headings_document(headings)
+    plain = parse_spaceup_ast(text)
+    tokenized = tokenize_document(parse_spaceup_ast(text))
+
+    def best(function) -> float:
+        return min(timeit.repeat(function, number=1, repeat=repeat))
+
+    return {
+        "text only": best(lambda: document_to_mdast(plain)),
+        "tokenize": best(lambda: tokenize_document(tokenized)),
+        "from tokens": best(lambda: document_to_mdast(tokenized)),
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(prog="python -m benchmarks.mdast_phrasing", description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--headings", type=int, default=10_000)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args(argv)
+    for name, seconds in run(args.headings, args.repeat).items():
+        print(f"{name:>12}: {seconds * 1000:8.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,52 @@
+"""Benchmark for a batch rebuild through the render cache, with a few percent of the files changed.
+
+    python -m benchmarks.render_cache --files 200 --lines 500 --changed 0.03
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+from batch import render_batch
+from benchmarks.corpus import CorpusOptions, generate_document
+
+
+def run(files: int = 200, lines: int = 500, changed: float = 0.03, jobs: int = 1) -> Dict[str, float]:
+    """Wall-clock seconds of a batch without the cache, of filling the cache, and of a rebuild through it."""
+    with tempfile.TemporaryDirectory() as directory:
+        root = Path(directory)
+        paths = []
+        for n in range(files):
+            path = root / "src" / f"{n}.sup"
+            path.parent.mkdir(exist_ok=True)
+            path.write_text(generate_document(lines, CorpusOptions(seed=n)), encoding="utf-8")
+            paths.append(path)
+
+        def build(cache: bool) -> float:
+            cache_dir = root / "cache" if cache else None
+            return render_batch(paths, root / "out", root=root / "src", jobs=jobs, cache_dir=cache_dir).seconds
+
+        timings = {"uncached": build(cache=False), "cold cache": build(cache=True)}
+        for path in paths[: max(1, round(files * changed))]:
+            path.write_text(path.read_text(encoding="utf-8") + "edited\n", encoding="utf-8")
+        timings["rebuild"] = build(cache=True)
+        return timings
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(prog="python -m benchmarks.render_cache", description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--files", type=int, default=200)
+    arg_parser.add_argument("--lines", type=int, default=500, help="lines per file")
+    arg_parser.add_argument("--changed", type=float, default=0.03, help="fraction of files changed before the rebuild")
+    arg_parser.add_argument("--jobs", type=int, default=1)
+    args = arg_parser.parse_args(argv)
+    for name, seconds in run(args.files, args.lines, args.changed, args.jobs).items():
+        print(f"{name:>10}: {seconds * 1000:8.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
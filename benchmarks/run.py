@@ -0,0 +1,165 @@
+"""Time the parsers over generated documents and compare results between runs."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import asdict, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from adaptors.mdast.mdast import document_to_mdast
+from ast_parser import parse_spaceup_ast, render_ast_to_html
+from benchmarks.corpus import CorpusOptions, generate_document
+from indentation import validate_indentation
+from parser import parse_spaceup
+
+
+def _render_html(text: str) -> Callable[[], Any]:
+    document = parse_spaceup_ast(text)
+    return lambda: render_ast_to_html(document)
+
+
+def _to_mdast(text: str) -> Callable[[], Any]:
+    document = parse_spaceup_ast(text)
+    return lambda: document_to_mdast(document)
+
+
+# Benchmark name -> setup. A setup takes the document text and returns the callable to time,
+# so rendering is timed without the parse that produces its input.
+BENCHMARKS: Dict[str, Callable[[str], Callable[[], Any]]] = {
+    "parse_spaceup": lambda text: lambda: parse_spaceup(text),
+    "parse_spaceup_ast": lambda text: lambda: parse_spaceup_ast(text),
+    "render_ast_to_html": _render_html,
+    "document_to_mdast": _to_mdast,
+    "validate_indentation": lambda text: lambda: validate_indentation(text),
+}
+
+DEFAULT_SIZES = (1_000, 10_000)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=Path(__file__).parent, check=False
+        )
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def run_benchmarks(
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    options: Optional[CorpusOptions] = None,
+    repeat: int = 5,
+    names: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """Time every benchmark (or those in `names`) on a generated document of each size, best of `repeat`."""
+    if options is None:
+        options = CorpusOptions()
+    results: List[Dict[str, Any]] = []
+    for lines in sizes:
+        text = generate_document(lines, options)
+        for name in names or BENCHMARKS:
+            run = BENCHMARKS[name](text)
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - start)
+            best = min(timings)
+            results.append(
+                {
+                    "benchmark": name,
+                    "lines": lines,
+                    "chars": len(text),
+                    "best_seconds": best,
+                    "median_seconds": statistics.median(timings),
+                    "lines_per_second": lines / best if best else None,
+                }
+            )
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "repeat": repeat,
+        },
+        "corpus": asdict(options),
+        "results": results,
+    }
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 1.10) -> List[Dict[str, Any]]:
+    """Pair up the results of two runs; an entry is a regression if it got slower by more than `threshold`."""
+    previous = {(entry["benchmark"], entry["lines"]): entry for entry in baseline["results"]}
+    comparison = []
+    for entry in current["results"]:
+        before = previous.get((entry["benchmark"], entry["lines"]))
+        if before is None or not before["best_seconds"]:
+            continue
+        ratio = entry["best_seconds"] / before["best_seconds"]
+        comparison.append(
+            {
+                "benchmark": entry["benchmark"],
+                "lines": entry["lines"],
+                "before_seconds": before["best_seconds"],
+                "after_seconds": entry["best_seconds"],
+                "ratio": ratio,
+                "regression": ratio > threshold,
+            }
+        )
+    return comparison
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    defaults = CorpusOptions()
+    arg_parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark the Spaceup parsers.")
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="document sizes, in lines")
+    arg_parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark; the best one counts")
+    arg_parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="run only these benchmarks")
+    arg_parser.add_argument("--max-depth", type=int, default=defaults.max_depth)
+    arg_parser.add_argument("--comment-ratio", type=float, default=defaults.comment_ratio)
+    arg_parser.add_argument("--list-ratio", type=float, default=defaults.list_ratio)
+    arg_parser.add_argument("--table-ratio", type=float, default=defaults.table_ratio)
+    arg_parser.add_argument("--max-blank-run", type=int, default=defaults.max_blank_run)
+    arg_parser.add_argument("--seed", type=int, default=defaults.seed)
+    arg_parser.add_argument("--output", "-o", help="write the JSON results to this file instead of stdout")
+    arg_parser.add_argument("--compare", metavar="BASELINE", help="JSON results of an earlier run to compare against")
+    arg_parser.add_argument("--threshold", type=float, default=1.10, help="slowdown ratio that counts as a regression")
+    args = arg_parser.parse_args(argv)
+
+    options = replace(
+        defaults,
+        max_depth=args.max_depth,
+        comment_ratio=args.comment_ratio,
+        list_ratio=args.list_ratio,
+        table_ratio=args.table_ratio,
+        max_blank_run=args.max_blank_run,
+        seed=args.seed,
+    )
+    results = run_benchmarks(args.sizes, options, repeat=args.repeat, names=args.only)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        comparison = compare_results(json.loads(Path(args.compare).read_text()), results, args.threshold)
+        for entry in comparison:
+            flag = "  REGRESSION" if entry["regression"] else ""
+            print(
+                f"{entry['benchmark']:>22} {entry['lines']:>8} lines: "
+                f"{entry['before_seconds'] * 1000:9.2f} ms -> {entry['after_seconds'] * 1000:9.2f} ms "
+                f"(x{entry['ratio']:.2f}){flag}",
+                file=sys.stderr,
+            )
+        if any(entry["regression"] for entry in comparison):
+            return 1
+    return 0
@@ -0,0 +1,151 @@
+"""
+Columnar ("flat") Spaceup AST.
+
+Instead of one object per node, a `FlatDocument` keeps parallel arrays, one
+entry per node in document order: node kind, heading level, the node's text
+as (start, end) offsets into the source, and the index of the parent node.
+This takes a fraction of the memory of the `ast_parser` node tree and is
+cheap to scan; `to_document()` converts back when the tree is needed.
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import Iterable, List, Optional, Union
+
+from ast_parser import (
+    Comment,
+    Document,
+    Heading,
+    MarkdownInline,
+    Node,
+    Paragraph,
+    ParagraphLine,
+    SpaceupHandler,
+    parse_spaceup_events,
+)
+
+# Node kinds
+HEADING = 0
+PARAGRAPH = 1
+PARAGRAPH_LINE = 2
+COMMENT = 3
+INLINE_COMMENT = 4
+
+NO_PARENT = -1
+
+
+class FlatDocument:
+    """A parsed document as parallel arrays, indexed by node number.
+
+    Headings are the parents of the nodes in the block below them, paragraphs
+    of their lines, and paragraph lines of their inline comment, if any.
+    Top-level nodes have `NO_PARENT`.
+
+    `text` is the parsed source, so `starts`/`ends` are source positions.
+    Documents parsed from an iterable of lines have no single source; their
+    `text` is the node texts concatenated instead. Paragraph nodes have no
+    text of their own.
+    """
+
+    __slots__ = ("kinds", "levels", "starts", "ends", "parents", "text")
+
+    def __init__(self) -> None:
+        self.kinds = array("B")
+        self.levels = array("i")  # Heading level; 0 for other nodes
+        self.starts = array("q")
+        self.ends = array("q")
+        self.parents = array("i")
+        self.text = ""
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def text_of(self, idx: int) -> str:
+        return self.text[self.starts[idx] : self.ends[idx]]
+
+    def to_document(self) -> Document:
+        children: List[Node] = []
+        kinds = self.kinds
+        idx = 0
+        count = len(kinds)
+        while idx < count:
+            kind = kinds[idx]
+            if kind == HEADING:
+                children.append(Heading(level=self.levels[idx], content=MarkdownInline(self.text_of(idx))))
+            elif kind == COMMENT:
+                children.append(Comment(text=self.text_of(idx)))
+            elif kind == PARAGRAPH:
+                lines: List[ParagraphLine] = []
+                while idx + 1 < count and kinds[idx + 1] in (PARAGRAPH_LINE, INLINE_COMMENT):
+                    idx += 1
+                    if kinds[idx] == PARAGRAPH_LINE:
+                        lines.append(ParagraphLine(content=MarkdownInline(self.text_of(idx))))
+                    else:
+                        lines[-1].inline_comment = self.text_of(idx)
+                children.append(Paragraph(lines=lines))
+            idx += 1
+        return Document(children=children)
+
+
+class FlatBuilder(SpaceupHandler):
+    """Builds a `FlatDocument` from parse events of `source`, or of an iterable of lines if it is None."""
+
+    def __init__(self, source: Optional[str] = None) -> None:
+        self.document = FlatDocument()
+        self._source = source
+        self._buffer: List[str] = []
+        self._offset = 0
+        self._headings: List[int] = []  # Open headings, innermost last
+        self._paragraph = NO_PARENT
+
+    def _add(self, kind: int, source: str, start: int, end: int, parent: int, level: int = 0) -> int:
+        if source is not self._source and start != end:
+            # Spans of a stream are relative to their line; keep a copy of the text instead.
+            text = source[start:end]
+            self._buffer.append(text)
+            start = self._offset
+            end = self._offset = start + len(text)
+        document = self.document
+        document.kinds.append(kind)
+        document.levels.append(level)
+        document.starts.append(start)
+        document.ends.append(end)
+        document.parents.append(parent)
+        return len(document.kinds) - 1
+
+    def _parent(self) -> int:
+        return self._headings[-1] if self._headings else NO_PARENT
+
+    def enter_heading_span(self, level: int, source: str, start: int, end: int) -> None:
+        self._headings.append(self._add(HEADING, source, start, end, self._parent(), level))
+
+    def exit_heading(self, level: int) -> None:
+        if self._headings:
+            self._headings.pop()
+
+    def enter_paragraph(self) -> None:
+        self._paragraph = self._add(PARAGRAPH, "", 0, 0, self._parent())
+
+    def paragraph_line_span(self, source: str, start: int, end: int, comment_start: int, comment_end: int) -> None:
+        line = self._add(PARAGRAPH_LINE, source, start, end, self._paragraph)
+        if comment_start != -1:
+            self._add(INLINE_COMMENT, source, comment_start, comment_end, line)
+
+    def exit_paragraph(self) -> None:
+        self._paragraph = NO_PARENT
+
+    def comment_span(self, source: str, start: int, end: int) -> None:
+        self._add(COMMENT, source, start, end, self._parent())
+
+    def finish(self) -> FlatDocument:
+        self.document.text = self._source if self._source is not None else "".join(self._buffer)
+        self._buffer = []
+        return self.document
+
+
+def parse_spaceup_flat(source: Union[str, Iterable[str]]) -> FlatDocument:
+    """Parse Spaceup (a string or an iterable of lines) into a `FlatDocument`."""
+    builder = FlatBuilder(source if isinstance(source, str) else None)
+    parse_spaceup_events(source, builder)
+    return builder.finish()
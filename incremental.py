@@ -0,0 +1,249 @@
+"""
+Incremental re-parsing of Spaceup documents for editor integrations.
+
+A full parse records a checkpoint (the parser state) before every block.
+After an edit, parsing resumes from the last checkpoint whose lookahead cannot
+reach the edited lines, and stops as soon as it reaches an old checkpoint past
+the edit with the same parser state: from there on the old nodes are reused.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from ast_parser import Document, Node, TreeBuilder, parse_blocks
+from line_table import BLANK, COMMENT, LineTable, build_line_table
+
+# Indent stacks are kept as immutable linked lists, (top, rest), so a checkpoint
+# can share its stack with its neighbours instead of copying it.
+Stack = Optional[Tuple[int, "Stack"]]
+
+
+@dataclass
+class TextEdit:
+    """Replace `source[start:end]` with `replacement`; offsets are characters into the previous source."""
+
+    start: int
+    end: int
+    replacement: str
+
+
+@dataclass
+class Checkpoints:
+    """Parser state before every block, as parallel lists in source order."""
+
+    pos: List[int] = field(default_factory=list)
+    stacks: List[Stack] = field(default_factory=list)
+    depths: List[int] = field(default_factory=list)
+    previous: List[int] = field(default_factory=list)
+    child_counts: List[int] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.pos)
+
+    def head(self, stop: int) -> "Checkpoints":
+        return Checkpoints(
+            pos=self.pos[:stop],
+            stacks=self.stacks[:stop],
+            depths=self.depths[:stop],
+            previous=self.previous[:stop],
+            child_counts=self.child_counts[:stop],
+        )
+
+    def extend(self, other: "Checkpoints", start: int = 0, line_delta: int = 0, child_delta: int = 0) -> None:
+        self.pos.extend(pos + line_delta for pos in other.pos[start:])
+        self.stacks.extend(other.stacks[start:])
+        self.depths.extend(other.depths[start:])
+        self.previous.extend(other.previous[start:])
+        self.child_counts.extend(count + child_delta for count in other.child_counts[start:])
+
+
+# (first child, characters to add to the spans of it and the children after it), in child order;
+# see `Document.span_shifts`.
+Shifts = List[Tuple[int, int]]
+
+
+@dataclass
+class IncrementalState:
+    # The line table keeps the source and the offset of every line in it.
+    table: LineTable
+    checkpoints: Checkpoints
+    shifts: Shifts = field(default_factory=lambda: [(0, 0)])
+
+    @property
+    def source(self) -> str:
+        return self.table.source
+
+
+class _Recorder:
+    """Records a checkpoint for every block `parse_blocks` yields, optionally stopping at a known one."""
+
+    def __init__(self, children: List[Node], stack: Stack, depth: int) -> None:
+        self.children = children
+        self.stack = stack
+        self.depth = depth
+        self.checkpoints = Checkpoints()
+        self.stop_at: Optional[int] = None  # Index of the old checkpoint the parse caught up with
+        self._old: Optional[Checkpoints] = None
+        self._line_delta = 0
+        self._resync_from = 0
+
+    def resync_with(self, old: Checkpoints, line_delta: int, resync_from: int) -> None:
+        """Stop at the first block from line `resync_from` on whose state matches a checkpoint in `old`."""
+        self._old = old
+        self._line_delta = line_delta
+        self._resync_from = resync_from
+
+    def __call__(self, pos: int, indent_stack: List[int], previous_non_ws_indent: int) -> bool:
+        depth = len(indent_stack)
+        # Between two blocks the parser pushes or pops at most one indent level.
+        if depth > self.depth:
+            self.stack = (indent_stack[-1], self.stack)
+        elif depth < self.depth:
+            self.stack = self.stack[1]  # type: ignore[index]
+        self.depth = depth
+
+        old = self._old
+        if old is not None and pos >= self._resync_from:
+            old_pos = pos - self._line_delta
+            j = bisect_left(old.pos, old_pos)
+            while j < len(old) and old.pos[j] == old_pos:
+                if (
+                    old.depths[j] == depth
+                    and old.previous[j] == previous_non_ws_indent
+                    and _same_stack(old.stacks[j], self.stack)
+                ):
+                    self.stop_at = j
+                    return True
+                j += 1
+
+        checkpoints = self.checkpoints
+        checkpoints.pos.append(pos)
+        checkpoints.stacks.append(self.stack)
+        checkpoints.depths.append(depth)
+        checkpoints.previous.append(previous_non_ws_indent)
+        checkpoints.child_counts.append(len(self.children))
+        return False
+
+
+def _same_stack(a: Stack, b: Stack) -> bool:
+    while a is not b:
+        if a is None or b is None or a[0] != b[0]:
+            return False
+        a, b = a[1], b[1]
+    return True
+
+
+def _stack_to_list(stack: Stack) -> List[int]:
+    indents: List[int] = []
+    while stack is not None:
+        indents.append(stack[0])
+        stack = stack[1]
+    indents.reverse()
+    return indents
+
+
+def _shift_at(shifts: Shifts, child: int) -> int:
+    return shifts[bisect_right(shifts, (child, float("inf"))) - 1][1]
+
+
+def _add_shift(shifts: Shifts, first: int, shift: int) -> None:
+    """Append a segment, replacing one that starts at the same child and merging it with an equal predecessor."""
+    if shifts and shifts[-1][0] == first:
+        shifts.pop()
+    if not shifts or shifts[-1][1] != shift:
+        shifts.append((first, shift))
+
+
+def parse_spaceup_ast_incremental(input_str: str) -> Document:
+    """Like `parse_spaceup_ast`, but keeps what `reparse_spaceup_ast` needs to apply edits."""
+    table = build_line_table(input_str)
+    children: List[Node] = []
+    recorder = _Recorder(children, stack=(0, None), depth=1)
+    indent_stack = [0]
+    for pos, previous_non_ws_indent in parse_blocks(table, TreeBuilder(children), indent_stack=indent_stack):
+        recorder(pos, indent_stack, previous_non_ws_indent)
+    state = IncrementalState(table=table, checkpoints=recorder.checkpoints)
+    return Document(children=children, incremental_state=state)
+
+
+def reparse_spaceup_ast(previous: Document, edit: TextEdit) -> Document:
+    """Apply `edit` to the source of `previous` and re-parse only the affected blocks.
+
+    `previous` must come from `parse_spaceup_ast_incremental` or an earlier
+    `reparse_spaceup_ast`. It is left untouched; unchanged nodes are shared
+    between the two documents. A shared node keeps its span of the source it
+    was parsed from (`content.source`); past the edit, add the document's
+    `span_shifts()` to get positions in the edited source.
+    """
+    state: Optional[IncrementalState] = previous.incremental_state
+    if state is None:
+        raise ValueError("Document has no incremental state; parse it with parse_spaceup_ast_incremental()")
+    old_source = state.source
+    if not 0 <= edit.start <= edit.end <= len(old_source):
+        raise ValueError(f"Edit range {edit.start}:{edit.end} is outside the source (length {len(old_source)})")
+    source = old_source[: edit.start] + edit.replacement + old_source[edit.end :]
+    old_table = state.table
+    old = state.checkpoints
+    line_count = len(old_table)
+    if line_count == 0 or len(old) == 0:
+        return parse_spaceup_ast_incremental(source)
+
+    # Old lines touched by the edit, widened by one line on each side so that
+    # line terminators merging across the boundary (e.g. "\r" + "\n") are re-split too.
+    def line_of(offset: int) -> int:
+        return min(bisect_right(old_table.starts, offset) - 1, line_count - 1)
+
+    first = max(line_of(edit.start) - 1, 0)
+    last = min(line_of(edit.end) + 2, line_count)
+
+    # Resume from the last block whose lookahead (up to the next content line) stays before the edit.
+    def first_content_line(pos: int) -> int:
+        if old_table.kinds[pos] == BLANK or old_table.kinds[pos] == COMMENT:
+            nxt = old_table.next_content[pos]
+            return line_count if nxt == -1 else nxt
+        return pos
+
+    k = max(bisect_left(old.pos, first) - 1, 0)
+    while k > 0 and first_content_line(old.pos[k]) >= first:
+        k -= 1
+
+    table = old_table.copy()
+    table.splice(first, last, source)
+    line_delta = len(table) - line_count
+    children: List[Node] = list(previous.children[: old.child_counts[k]])
+    recorder = _Recorder(children, stack=old.stacks[k], depth=old.depths[k])
+    recorder.resync_with(old, line_delta, resync_from=last + line_delta)
+    indent_stack = _stack_to_list(old.stacks[k])
+    blocks = parse_blocks(
+        table,
+        TreeBuilder(children),
+        pos=old.pos[k],
+        indent_stack=indent_stack,
+        previous_non_ws_indent=old.previous[k],
+    )
+    for pos, previous_non_ws_indent in blocks:
+        if recorder(pos, indent_stack, previous_non_ws_indent):
+            blocks.close()
+            break
+
+    checkpoints = old.head(k)
+    checkpoints.extend(recorder.checkpoints)
+    # Kept nodes before the edit are at the same positions; re-parsed nodes are spans of the new source.
+    shifts = [segment for segment in state.shifts if segment[0] < old.child_counts[k]]
+    _add_shift(shifts, old.child_counts[k], 0)
+    if recorder.stop_at is not None:
+        j = recorder.stop_at
+        kept = old.child_counts[j]
+        child_delta = len(children) - kept
+        char_delta = len(edit.replacement) - (edit.end - edit.start)
+        _add_shift(shifts, kept + child_delta, _shift_at(state.shifts, kept) + char_delta)
+        for first, shift in state.shifts:
+            if first > kept:
+                _add_shift(shifts, first + child_delta, shift + char_delta)
+        children.extend(previous.children[kept:])
+        checkpoints.extend(old, start=j, line_delta=line_delta, child_delta=child_delta)
+    state = IncrementalState(table=table, checkpoints=checkpoints, shifts=shifts)
+    return Document(children=children, incremental_state=state)
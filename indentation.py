@@ -1,6 +1,90 @@
+import re
+from dataclasses import dataclass
+from itertools import chain
+from typing import List, Optional
+
+from line_table import OTHER_LINE_BREAKS
+
+TABS = "Tabs are not allowed for indentation."
+WIDTH = "Indentation must be a multiple of 4 spaces."
+
+# A line whose indentation is not a whole number of 4-space steps: every invalid line,
+# plus blank and other-whitespace lines that turn out fine. Searching for the literal
+# "\n" is much faster than trying `^` at every position; the first line is matched on its own.
+# Only valid when "\n" is the only line break in the text, possibly preceded by "\r".
+_CANDIDATE = re.compile(r"\n(?:    )*+[^\S\n]")
+_FIRST_CANDIDATE = re.compile(r"(?:    )*+[^\S\n]")
+_BREAKS_OTHER_THAN_CR = OTHER_LINE_BREAKS.replace("\r", "")
+
+
 class IndentationError(ValueError):
     pass
 
+
+@dataclass(frozen=True)
+class Diagnostic:
+    """An indentation problem. `line` and `column` are 1-based; `column` points at the offending character."""
+
+    line: int
+    column: int
+    message: str
+
+    def __str__(self) -> str:
+        return f"Line {self.line}: {self.message}"
+
+
+def diagnose_line(number: int, line: str) -> Optional[Diagnostic]:
+    """The problem with the indentation of `line`, line `number` of its text, if any."""
+    content = line.lstrip()
+    width = len(line) - len(content)
+    if not content or not width:
+        return None
+    tab = line.find("\t", 0, width)
+    if tab != -1:
+        return Diagnostic(number, tab + 1, TABS)
+    if width % 4:
+        return Diagnostic(number, width + 1, WIDTH)
+    return None
+
+
+def check_indentation(text: str, fail_fast: bool = False) -> List[Diagnostic]:
+    """
+    Finds every indentation problem in a given text, in one pass.
+
+    Args:
+        text: The text to check.
+        fail_fast: Stop at the first problem.
+
+    Returns:
+        The problems in line order; empty if the indentation is valid.
+    """
+    diagnostics: List[Diagnostic] = []
+    lone_cr = text.count("\r") != text.count("\r\n")
+    if lone_cr or any(line_break in text for line_break in _BREAKS_OTHER_THAN_CR):
+        for number, line in enumerate(text.splitlines(), 1):
+            diagnostic = diagnose_line(number, line)
+            if diagnostic is not None:
+                diagnostics.append(diagnostic)
+                if fail_fast:
+                    break
+        return diagnostics
+
+    # Only lines that may be invalid are looked at in Python, so valid text is a single scan in C.
+    starts = [0] if _FIRST_CANDIDATE.match(text) else []
+    number = 1
+    counted = 0
+    for start in chain(starts, (match.start() + 1 for match in _CANDIDATE.finditer(text))):
+        number += text.count("\n", counted, start)
+        counted = start
+        end = text.find("\n", start)
+        diagnostic = diagnose_line(number, text[start:end] if end != -1 else text[start:])  # "\r" is stripped as whitespace
+        if diagnostic is not None:
+            diagnostics.append(diagnostic)
+            if fail_fast:
+                break
+    return diagnostics
+
+
 def validate_indentation(text: str):
     """
     Validates the indentation of a given text.
@@ -9,22 +93,8 @@ def validate_indentation(text: str):
         text: The text to validate.
 
     Raises:
-        IndentationError: If the indentation is invalid.
+        IndentationError: If the indentation is invalid, for the first problem.
     """
-    lines = text.splitlines()
-    for i, line in enumerate(lines):
-        if not line.strip():
-            continue
-
-        indentation_part = ""
-        for char in line:
-            if char.isspace():
-                indentation_part += char
-            else:
-                break
-        
-        if '\t' in indentation_part:
-            raise IndentationError(f"Line {i+1}: Tabs are not allowed for indentation.")
-        
-        if len(indentation_part) % 4 != 0:
-            raise IndentationError(f"Line {i+1}: Indentation must be a multiple of 4 spaces.")
+    diagnostics = check_indentation(text, fail_fast=True)
+    if diagnostics:
+        raise IndentationError(str(diagnostics[0]))
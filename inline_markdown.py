@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Pattern, Sequence, Tuple, Union
+
+if TYPE_CHECKING:
+    from markdown_it import MarkdownIt
+    from markdown_it.token import Token
+
+    from profiling import ParseProfile
+
+# Loaded by `_load` on first render rather than on import, so code paths
+# that never render Markdown do not pay for importing mistune.
+# The shared, pre-configured Markdown instance used for every inline fragment.
+_markdown: Any = None
+_BlockState: Any = None
+# Characters that can start an inline construct or that the renderer escapes.
+# A fragment without any of them renders to itself.
+_MARKUP_RE: Optional[Pattern[str]] = None
+_MARKUP_CHARS = r'[\\`*_\[\]!<>&"~^$=|\t\r\n]'
+# The markdown-it instance shared by everything that tokenizes inline Markdown, also made on first use.
+_markdown_it: Optional[MarkdownIt] = None
+
+
+def _load() -> None:
+    global _markdown, _BlockState, _MARKUP_RE
+    import re
+
+    import mistune
+    from mistune.core import BlockState
+
+    _markdown = mistune.html
+    _BlockState = BlockState
+    _MARKUP_RE = re.compile(_MARKUP_CHARS)
+
+
+def render_inline(text: str) -> str:
+    """Render a single inline fragment, unwrapping the paragraph mistune puts around it."""
+    if _markdown is None:
+        _load()
+    html = _markdown(text).strip()
+    if html.startswith('<p>') and html.endswith('</p>'):
+        html = html[3:-4]
+    return html
+
+
+def _render_paragraph_inline(text: str) -> str:
+    # Same as the inline pass mistune runs on a one-line paragraph, minus the block parse.
+    state = _BlockState()
+    tokens = _markdown.inline(text.strip(" \r\n\t\f"), state.env)
+    return _markdown.renderer.render_tokens(tokens, state)
+
+
+class InlineCache:
+    """Bounded LRU cache of rendered inline fragments, keyed by fragment text.
+
+    Opt-in: pass one to the renderers and keep it alive across documents,
+    e.g. one per worker process.
+    """
+
+    def __init__(self, maxsize: int = 4096) -> None:
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be at least 1, got {maxsize}")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, str] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, text: str) -> Optional[str]:
+        html = self._entries.get(text)
+        if html is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(text)
+        self.hits += 1
+        return html
+
+    def put(self, text: str, html: str) -> None:
+        self._entries[text] = html
+        self._entries.move_to_end(text)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+
+def render_inline_batch(
+    fragments: Iterable[str], cache: Optional[InlineCache] = None, profile: Optional[ParseProfile] = None
+) -> List[str]:
+    """Render many inline fragments at once; output matches `render_inline` per fragment.
+
+    Each distinct fragment is rendered once. Fragments that can only be a
+    one-line paragraph (starting with a letter, no line breaks) skip block
+    parsing, and those without any Markdown syntax are returned unchanged
+    (and never cached, since there is nothing to save).
+    """
+    if _markdown is None:
+        _load()
+    fragments = list(fragments)
+    rendered: Dict[str, str] = {}
+    for text in fragments:
+        if text in rendered:
+            continue
+        if text and text[0].isalpha() and _MARKUP_RE.search(text) is None and not text[-1].isspace():
+            rendered[text] = text
+            continue
+        if cache is not None:
+            html = cache.get(text)
+            if html is not None:
+                rendered[text] = html
+                continue
+        if not text or not text[0].isalpha() or '\n' in text or '\r' in text:
+            html = render_inline(text)
+        else:
+            html = _render_paragraph_inline(text)
+        if profile is not None:
+            profile.markdown_calls += 1
+        rendered[text] = html
+        if cache is not None:
+            cache.put(text, html)
+    return [rendered[text] for text in fragments]
+
+
+Part = Union[str, int]
+
+
+class InlineBatch:
+    """Collects the inline fragments of one document and renders them together.
+
+    Renderers call `add` while emitting, which returns a slot to put in place of
+    the rendered HTML. Output entries are either plain strings or tuples of
+    strings and slots; `join` renders every fragment in one pass and fills them in.
+    """
+
+    def __init__(self, cache: Optional[InlineCache] = None) -> None:
+        self.fragments: List[str] = []
+        self.cache = cache
+
+    def add(self, text: str) -> int:
+        self.fragments.append(text)
+        return len(self.fragments) - 1
+
+    def clear(self) -> None:
+        self.fragments.clear()
+
+    def join(
+        self,
+        output: Sequence[Union[str, Tuple[Part, ...]]],
+        separator: str = '\n',
+        rendered: Optional[List[str]] = None,
+    ) -> str:
+        """Join `output`, rendering the fragments first unless `rendered` already holds them."""
+        if rendered is None:
+            rendered = render_inline_batch(self.fragments, self.cache)
+        return separator.join(
+            entry if isinstance(entry, str)
+            else ''.join(rendered[part] if isinstance(part, int) else part for part in entry)
+            for entry in output
+        )
+
+
+def shared_markdown_it() -> MarkdownIt:
+    """The `markdown_it.MarkdownIt` instance used for tokens, configured like the mistune renderer."""
+    global _markdown_it, _MARKUP_RE
+    if _markdown_it is None:
+        import re
+
+        from markdown_it import MarkdownIt
+
+        _markdown_it = MarkdownIt("commonmark").enable("strikethrough")
+        if _MARKUP_RE is None:
+            _MARKUP_RE = re.compile(_MARKUP_CHARS)
+    return _markdown_it
+
+
+def tokenize_inline_batch(fragments: Iterable[str]) -> List[List[Token]]:
+    """The markdown-it inline tokens of many fragments, like `parseInline(text)[0].children` for each.
+
+    Each distinct fragment is tokenized once, and equal fragments share one
+    token list. Fragments without Markdown syntax become a single text token
+    without going through the parser.
+    """
+    markdown_it = shared_markdown_it()
+    from markdown_it.token import Token
+
+    tokenized: Dict[str, List[Token]] = {}
+    result = []
+    for text in fragments:
+        tokens = tokenized.get(text)
+        if tokens is None:
+            if text and text[0].isalpha() and _MARKUP_RE.search(text) is None and not text[-1].isspace():
+                tokens = [Token("text", "", 0, content=text)]
+            else:
+                tokens = markdown_it.parseInline(text)[0].children or []
+            tokenized[text] = tokens
+        result.append(tokens)
+    return result
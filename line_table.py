@@ -0,0 +1,359 @@
+from __future__ import annotations
+
+from array import array
+from itertools import accumulate, count
+from operator import add
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Line kinds. Blank and comment lines do not take part in structure detection.
+BLANK = 0
+COMMENT = 1
+FENCE = 2
+CONTENT = 3
+
+# Line boundaries `str.splitlines` knows besides "\n"; without any, every line ends in exactly one character.
+OTHER_LINE_BREAKS = "\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+
+
+@dataclass
+class LineTable:
+    """Per-line classification of a Spaceup document, built in a single pass.
+
+    Every lookahead the parsers need is precomputed here, so checking what
+    follows a line is O(1) instead of a forward scan over the rest of the
+    document.
+    """
+
+    lines: List[str]
+    kinds: List[int]
+    # Indentation of content and fence lines; None for blank and comment lines.
+    indents: List[Optional[int]]
+    # Index of the next content or fence line after each line, or -1 at EOF.
+    next_content: List[int]
+    # Indentation of that next line, or -1 at EOF.
+    next_indent: List[int]
+    # Whether a comment line sits between each line and its next content line.
+    separated: List[bool]
+    # The text the table was built from, and the offset of each line in it.
+    source: str = ""
+    starts: "array[int]" = field(default_factory=lambda: array("q"))
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def has_line(self, idx: int) -> bool:
+        return idx < len(self.lines)
+
+    def copy(self) -> "LineTable":
+        return LineTable(
+            lines=list(self.lines),
+            kinds=list(self.kinds),
+            indents=list(self.indents),
+            next_content=list(self.next_content),
+            next_indent=list(self.next_indent),
+            separated=list(self.separated),
+            source=self.source,
+            starts=array("q", self.starts),
+        )
+
+    def followed_by_fence(self, idx: int) -> bool:
+        nxt = self.next_content[idx]
+        return nxt != -1 and self.kinds[nxt] == FENCE
+
+    def link(self, end: int, start: int = 0) -> None:
+        """Fill the lookahead columns of lines before `end`, walking backwards.
+
+        Lines from `end` on must already be linked. The walk stops at the first
+        content line before `start`, the last line whose lookahead can reach `start`.
+        """
+        kinds = self.kinds
+        indents = self.indents
+        next_content = self.next_content
+        next_indent = self.next_indent
+        separated = self.separated
+        if end < len(kinds):
+            if kinds[end] == BLANK or kinds[end] == COMMENT:
+                nxt = next_content[end]
+                nxt_indent = next_indent[end]
+                seen_comment = separated[end] or kinds[end] == COMMENT
+            else:
+                nxt = end
+                nxt_indent = indents[end]
+                seen_comment = False
+        else:
+            nxt = -1
+            nxt_indent = -1
+            seen_comment = False
+        for i in range(end - 1, -1, -1):
+            next_content[i] = nxt
+            next_indent[i] = nxt_indent
+            separated[i] = seen_comment
+            kind = kinds[i]
+            if kind == BLANK:
+                continue
+            if kind == COMMENT:
+                seen_comment = True
+                continue
+            if i < start:
+                break
+            nxt = i
+            nxt_indent = indents[i]
+            seen_comment = False
+
+    def splice(self, start: int, stop: int, source: str) -> None:
+        """Re-read lines `start:stop` from `source`, an edit of `self.source` that changed only those lines.
+
+        Only the rows that depend on the re-read lines are updated.
+        """
+        char_delta = len(source) - len(self.source)
+        segment_start = self.starts[start] if start < len(self.starts) else len(self.source)
+        segment_end = (self.starts[stop] if stop < len(self.starts) else len(self.source)) + char_delta
+        new_lines, new_starts = split_lines(source[segment_start:segment_end], segment_start)
+        classified = [classify_line(line) for line in new_lines]
+        new_stop = start + len(new_lines)
+        delta = new_stop - stop
+        if delta:
+            # Absolute indices after the edit move along with their lines.
+            self.next_content[stop:] = [nxt + delta if nxt != -1 else -1 for nxt in self.next_content[stop:]]
+        if char_delta:
+            self.starts[stop:] = array("q", [offset + char_delta for offset in self.starts[stop:]])
+        self.source = source
+        self.lines[start:stop] = new_lines
+        self.starts[start:stop] = new_starts
+        self.kinds[start:stop] = [kind for kind, _ in classified]
+        self.indents[start:stop] = [indent for _, indent in classified]
+        self.next_content[start:stop] = [-1] * len(new_lines)
+        self.next_indent[start:stop] = [-1] * len(new_lines)
+        self.separated[start:stop] = [False] * len(new_lines)
+        self.link(new_stop, start)
+
+
+def classify_line(line: str) -> tuple[int, Optional[int]]:
+    stripped = line.lstrip()
+    if not stripped:
+        return BLANK, None
+    if stripped.startswith("//"):
+        return COMMENT, None
+    indent = len(line) - len(stripped)
+    if stripped.startswith("```"):
+        return FENCE, indent
+    return CONTENT, indent
+
+
+def split_lines(text: str, offset: int = 0) -> Tuple[List[str], "array[int]"]:
+    """Split `text` like `str.splitlines`, with trailing whitespace stripped, and the offset of each line.
+
+    Offsets count from `offset`, the position of `text` in a larger source.
+    """
+    if not any(line_break in text for line_break in OTHER_LINE_BREAKS):
+        raw_lines = text.split("\n")
+        if raw_lines[-1] == "":
+            raw_lines.pop()
+        # Each line is followed by one "\n": line i starts at the lengths before it, plus i.
+        starts = array("q", map(add, accumulate(map(len, raw_lines), initial=offset), count()))
+    else:
+        raw_lines = text.splitlines(keepends=True)
+        starts = array("q", accumulate(map(len, raw_lines), initial=offset))
+    starts.pop()
+    return [line.rstrip() for line in raw_lines], starts
+
+
+def iter_lines(text: str) -> Iterator[Tuple[int, str]]:
+    """(offset, line) for every line of `text`, split like `split_lines` but one line at a time."""
+    start = 0
+    if not any(line_break in text for line_break in OTHER_LINE_BREAKS):
+        end = len(text)
+        while start < end:
+            stop = text.find("\n", start)
+            if stop == -1:
+                stop = end
+            yield start, text[start:stop].rstrip()
+            start = stop + 1
+        return
+    import re
+
+    for match in re.finditer(f"\r\n|[\n{OTHER_LINE_BREAKS}]", text):
+        yield start, text[start : match.start()].rstrip()
+        start = match.end()
+    if start < len(text):
+        yield start, text[start:].rstrip()
+
+
+def _classify_strict(lines: List[str], kinds: List[int], indents: List[Optional[int]], has_tabs: bool) -> None:
+    # `classify_line` for every line, checking indentation like `indentation.validate_indentation` on the way.
+    for i, line in enumerate(lines):
+        stripped = line.lstrip()
+        if not stripped:
+            continue
+        indent = len(line) - len(stripped)
+        if indent and (indent % 4 or has_tabs and "\t" in line[:indent]):
+            from indentation import IndentationError, diagnose_line
+
+            raise IndentationError(str(diagnose_line(i + 1, line)))
+        if stripped.startswith("//"):
+            kinds[i] = COMMENT
+        else:
+            kinds[i] = FENCE if stripped.startswith("```") else CONTENT
+            indents[i] = indent
+
+
+def build_line_table(input_str: str, strict: bool = False) -> LineTable:
+    """Split and classify `input_str`. With `strict`, raise `indentation.IndentationError` for bad indentation."""
+    lines, starts = split_lines(input_str)  # Clean trailing whitespace
+    count = len(lines)
+    kinds: List[int] = [BLANK] * count
+    indents: List[Optional[int]] = [None] * count
+    if strict:
+        _classify_strict(lines, kinds, indents, "\t" in input_str)
+    else:
+        for i, line in enumerate(lines):
+            kinds[i], indents[i] = classify_line(line)
+
+    table = LineTable(
+        lines=lines,
+        kinds=kinds,
+        indents=indents,
+        next_content=[-1] * count,
+        next_indent=[-1] * count,
+        separated=[False] * count,
+        source=input_str,
+        starts=starts,
+    )
+    table.link(count)
+    return table
+
+
+class _StreamColumn:
+    """One column of a `LineStream`, indexed by absolute line number."""
+
+    __slots__ = ("_stream", "_values", "_needs_lookahead")
+
+    def __init__(self, stream: "LineStream", values: list, needs_lookahead: bool) -> None:
+        self._stream = stream
+        self._values = values
+        self._needs_lookahead = needs_lookahead
+
+    def __getitem__(self, idx: int):
+        stream = self._stream
+        if self._needs_lookahead:
+            stream._link_through(idx)
+        else:
+            stream._read_through(idx)
+        if idx < stream._offset:
+            raise IndexError(f"Line {idx} was already released")
+        return self._values[idx - stream._offset]
+
+
+class LineStream:
+    """A `LineTable` over an iterable of lines, read on demand.
+
+    Lines are classified as they are read, and a line's lookahead columns are
+    filled once the next content line (or EOF) has been read. Lines before the
+    last `release` point are dropped, so memory is bounded by the longest
+    stretch the parser looks at, not by the document.
+
+    There is no single source string behind a stream, so `source` is None and
+    text positions are relative to each line; streams from `from_string` are
+    the exception.
+    """
+
+    source: Optional[str] = None
+    starts: Optional["_StreamColumn"] = None
+
+    def __init__(self, lines: Iterable[str]) -> None:
+        self._source: Iterator[str] = iter(lines)
+        self._starts: Optional[List[int]] = None
+        self._exhausted = False
+        self._offset = 0  # Absolute index of the first line still kept
+        self._linked = 0  # Absolute index of the first line whose lookahead is not filled yet
+        self._lines: List[str] = []
+        self._kinds: List[int] = []
+        self._indents: List[Optional[int]] = []
+        self._next_content: List[int] = []
+        self._next_indent: List[int] = []
+        self._separated: List[bool] = []
+        self.lines = _StreamColumn(self, self._lines, needs_lookahead=False)
+        self.kinds = _StreamColumn(self, self._kinds, needs_lookahead=False)
+        self.indents = _StreamColumn(self, self._indents, needs_lookahead=False)
+        self.next_content = _StreamColumn(self, self._next_content, needs_lookahead=True)
+        self.next_indent = _StreamColumn(self, self._next_indent, needs_lookahead=True)
+        self.separated = _StreamColumn(self, self._separated, needs_lookahead=True)
+
+    def has_line(self, idx: int) -> bool:
+        self._read_through(idx)
+        return idx < self._offset + len(self._lines)
+
+    def followed_by_fence(self, idx: int) -> bool:
+        nxt = self.next_content[idx]
+        return nxt != -1 and self._kinds[nxt - self._offset] == FENCE
+
+    def release(self, idx: int) -> None:
+        """Forget the lines before `idx`; the parser will not look at them again."""
+        drop = min(idx, self._linked) - self._offset
+        # Compact only once the dead prefix dominates, so releasing stays amortized O(1).
+        if drop > 1024 and drop * 2 > len(self._lines):
+            for values in (self._lines, self._kinds, self._indents, self._next_content, self._next_indent, self._separated):
+                del values[:drop]
+            if self._starts is not None:
+                del self._starts[:drop]
+            self._offset += drop
+
+    @classmethod
+    def from_string(cls, text: str) -> "LineStream":
+        """A stream over `text`, split one line at a time, with `source` and `starts` like a `LineTable`.
+
+        Spans are then positions in `text`, as for a line table, while memory
+        beyond `text` stays bounded like for any other stream.
+        """
+        starts: List[int] = []
+
+        def lines() -> Iterator[str]:
+            for start, line in iter_lines(text):
+                starts.append(start)
+                yield line
+
+        stream = cls(lines())
+        stream.source = text
+        stream._starts = starts
+        stream.starts = _StreamColumn(stream, starts, needs_lookahead=False)
+        return stream
+
+    def _read_line(self) -> bool:
+        try:
+            line = next(self._source)
+        except StopIteration:
+            self._exhausted = True
+            self._link_pending(-1, -1)
+            return False
+        line = line.rstrip()
+        kind, indent = classify_line(line)
+        self._lines.append(line)
+        self._kinds.append(kind)
+        self._indents.append(indent)
+        self._next_content.append(-1)
+        self._next_indent.append(-1)
+        self._separated.append(False)
+        if kind != BLANK and kind != COMMENT:
+            self._link_pending(self._offset + len(self._lines) - 1, indent)  # type: ignore[arg-type]
+        return True
+
+    def _read_through(self, idx: int) -> None:
+        while not self._exhausted and idx >= self._offset + len(self._lines):
+            self._read_line()
+
+    def _link_through(self, idx: int) -> None:
+        while not self._exhausted and idx >= self._linked:
+            self._read_line()
+
+    def _link_pending(self, nxt: int, nxt_indent: int) -> None:
+        # Lines from _linked up to the new content line (or EOF) now know what follows them.
+        end = (nxt if nxt != -1 else self._offset + len(self._lines)) - self._offset
+        seen_comment = False
+        for i in range(end - 1, self._linked - self._offset - 1, -1):
+            self._next_content[i] = nxt
+            self._next_indent[i] = nxt_indent
+            self._separated[i] = seen_comment
+            if self._kinds[i] == COMMENT:
+                seen_comment = True
+        self._linked = self._offset + end
@@ -1,6 +1,169 @@
-def main():
-    print("Hello from spaceup!")
+"""
+The `spaceup` command: render Spaceup files, directories or stdin as HTML, AST JSON or mdast JSON.
+
+    spaceup notes.sup                        # HTML on stdout
+    spaceup - --format mdast < notes.sup     # stdin
+    spaceup docs/ --out build/ --jobs 8      # every *.sup below docs/, in parallel
+    spaceup docs/ --out build/ --watch       # then re-render files as they change
+    spaceup docs/ -o build/ --cache .cache/  # skip files rendered in earlier runs
+    spaceup --check docs/                    # only validate indentation
+
+Nothing here imports a Markdown engine until something is rendered, so
+`--version` and `--check` start fast.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from batch import DEFAULT_PATTERN, FORMATS, collect_sources, render_batch, render_source
+
+__version__ = "0.1.0"
+
+
+class Watcher:
+    """Tells which files changed (or appeared) since the previous call, by modification time and size."""
+
+    def __init__(self) -> None:
+        self._stamps: Dict[Path, Tuple[int, int]] = {}
+
+    def changed(self, paths: Iterable[Path]) -> List[Path]:
+        stamps: Dict[Path, Tuple[int, int]] = {}
+        changed: List[Path] = []
+        for path in paths:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            stamps[path] = (stat.st_mtime_ns, stat.st_size)
+            if self._stamps.get(path) != stamps[path]:
+                changed.append(path)
+        self._stamps = stamps
+        return changed
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    arg_parser = argparse.ArgumentParser(prog="spaceup", description="Render Spaceup markup.")
+    arg_parser.add_argument("inputs", nargs="*", help="files, directories or globs; '-' or nothing reads stdin")
+    arg_parser.add_argument("--format", "-f", choices=FORMATS, default="html", help="output format (default: html)")
+    arg_parser.add_argument("--out", "-o", help="output directory (default: stdout for one file, else next to each source)")
+    arg_parser.add_argument("--pattern", default=DEFAULT_PATTERN, help=f"file pattern within directories (default: {DEFAULT_PATTERN})")
+    arg_parser.add_argument("--jobs", "-j", type=int, default=1, help="render in N worker processes (default: 1)")
+    arg_parser.add_argument("--cache", help="render cache directory, reused across runs to skip unchanged files")
+    arg_parser.add_argument("--watch", "-w", action="store_true", help="keep running and re-render files that change")
+    arg_parser.add_argument("--interval", type=float, default=0.5, help="seconds between checks in --watch mode")
+    arg_parser.add_argument("--check", action="store_true", help="only validate indentation; render nothing")
+    arg_parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
+    return arg_parser
+
+
+def _check(name: str, text: str) -> bool:
+    from indentation import check_indentation
+
+    diagnostics = check_indentation(text)
+    for diagnostic in diagnostics:
+        print(f"{name}: {diagnostic}", file=sys.stderr)
+    return not diagnostics
+
+
+def _input_root(inputs: Sequence[str]) -> str:
+    """The directory the outputs mirror: the common directory of the inputs, not of the files found in them.
+
+    A directory counts as itself, a file as its directory, and a glob as the
+    directory before its first wildcard, so files that appear later (e.g.
+    under --watch) are always below it.
+    """
+    bases = []
+    for target in inputs:
+        wildcard = min((target.find(char) for char in "*?[" if char in target), default=-1)
+        if wildcard != -1:
+            target = os.path.dirname(target[:wildcard]) or "."
+        elif not os.path.isdir(target):
+            target = os.path.dirname(target) or "."
+        bases.append(os.path.abspath(target))
+    return os.path.commonpath(bases)
+
+
+def _render_text(text: str, output_format: str, cache_dir: Optional[str]) -> str:
+    """Render one document for stdout, through the render cache in `cache_dir` if given."""
+    if cache_dir is None:
+        return render_source(text, output_format)
+    from render_cache import RenderCache
+
+    # Keyed like `batch.render_batch` entries, so the two share the cache.
+    return RenderCache(cache_dir).render(text, output_format, lambda text: render_source(text, output_format))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    arg_parser = _build_arg_parser()
+    args = arg_parser.parse_args(argv)
+    inputs: List[str] = args.inputs
+
+    if not inputs or inputs == ["-"]:
+        if args.watch:
+            arg_parser.error("--watch needs files or directories, not stdin")
+        if args.check:
+            return 0 if _check("<stdin>", sys.stdin.read()) else 1
+        sys.stdout.write(_render_text(sys.stdin.read(), args.format, args.cache) + "\n")
+        return 0
+    if "-" in inputs:
+        arg_parser.error("stdin ('-') cannot be combined with other inputs")
+
+    def collect() -> List[Path]:
+        paths: Dict[Path, None] = {}  # Ordered and without duplicates
+        for target in inputs:
+            paths.update(dict.fromkeys(collect_sources(target, args.pattern)))
+        return list(paths)
+
+    paths = collect()
+    if not paths:
+        print(f"spaceup: no files found for {' '.join(inputs)}", file=sys.stderr)
+        return 1
+    if args.check:
+        results = [_check(str(path), path.read_text(encoding="utf-8")) for path in paths]
+        return 0 if all(results) else 1
+
+    to_stdout = args.out is None and len(inputs) == 1 and os.path.isfile(inputs[0])
+    # From the inputs, so files re-rendered or added under --watch land next to those of the first run.
+    root = _input_root(inputs)
+
+    def render(paths: List[Path]) -> bool:
+        if to_stdout:
+            try:
+                text = paths[0].read_text(encoding="utf-8")
+            except OSError as error:
+                print(f"spaceup: {error}", file=sys.stderr)
+                return False
+            sys.stdout.write(_render_text(text, args.format, args.cache) + "\n")
+            sys.stdout.flush()
+            return True
+        report = render_batch(paths, args.out, root=root, jobs=args.jobs, output_format=args.format, cache_dir=args.cache)
+        for result in report.failed:
+            print(f"spaceup: {result.path}: {result.error}", file=sys.stderr)
+        return not report.failed
+
+    watcher = Watcher()
+    watcher.changed(paths)
+    ok = render(paths)
+    if not args.watch:
+        return 0 if ok else 1
+
+    print(f"spaceup: watching {len(paths)} files, Ctrl-C to stop", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(args.interval)
+            changed = watcher.changed(collect())
+            if changed:
+                render(changed)
+                print(f"spaceup: re-rendered {', '.join(map(str, changed))}", file=sys.stderr)
+    except KeyboardInterrupt:
+        return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,33 +1,127 @@
-import mistune
-import re
+from time import perf_counter
 
+from inline_markdown import InlineBatch, render_inline_batch
+from line_table import BLANK, COMMENT, FENCE, LineStream, build_line_table
 
-def parse_spaceup(input_str):
-    """Parse Spaceup markup into HTML."""
-    lines = [line.rstrip() for line in input_str.splitlines()]  # Clean trailing whitespace
-    indent_stack = [0]  # Start with root level 0
+# Block kinds a run of same-indented, non-heading lines can form
+PARAGRAPH = 0
+UNORDERED_LIST = 1
+ORDERED_LIST = 2
+BLOCKQUOTE = 3
+TABLE = 4
+
+_PLAIN = (PARAGRAPH, None)
+_ordered_item = None  # `re` pattern for "1. item", compiled on first use to keep `import parser` cheap
+
+
+def _unordered_item(content):
+    return (UNORDERED_LIST, content[2:].strip()) if content.startswith('- ') else _PLAIN
+
+
+def _ordered(content):
+    global _ordered_item
+    if _ordered_item is None:
+        import re
+
+        _ordered_item = re.compile(r'\d+\.\s(.*)')
+    match = _ordered_item.match(content)
+    return (ORDERED_LIST, match.group(1).strip()) if match else _PLAIN
+
+
+def _quote(content):
+    return (BLOCKQUOTE, None) if content.startswith('> ') else _PLAIN
+
+
+def _table_row(content):
+    return (TABLE, None) if '|' in content[1:] else _PLAIN
+
+
+# The first character of a line decides which block kinds it can start
+_BLOCK_STARTS = {'-': _unordered_item, '>': _quote, '|': _table_row, **dict.fromkeys('0123456789', _ordered)}
+
+
+def block_kind(content):
+    """Classify the content of a non-heading line: `(kind, item text)`, where item text is only set for list items."""
+    detect = _BLOCK_STARTS.get(content[0])
+    if detect is None:
+        # `\d` also matches other decimal digits
+        return _ordered(content) if content[0].isdecimal() else _PLAIN
+    return detect(content)
+
+
+def parse_spaceup(input_str, inline_cache=None, profile=None, strict=False):
+    """Parse Spaceup markup into HTML.
+
+    Pass an `inline_markdown.InlineCache` to reuse rendered inline Markdown across calls,
+    and a `profiling.ParseProfile` to record where the time goes. With `strict`,
+    raise `indentation.IndentationError` like `validate_indentation` would, found
+    while splitting the lines rather than in a separate pass.
+    """
+    output = []  # Plain strings, or tuples of strings and inline slots filled in at the end
+    inline_batch = InlineBatch(inline_cache)
+    if profile is None:
+        for _ in emit_blocks(build_line_table(input_str, strict), output, inline_batch):
+            pass
+        return inline_batch.join(output)
+
+    start = perf_counter()
+    table = build_line_table(input_str, strict)
+    split_done = perf_counter()
+    emitted = profile.seconds['emit']
+    for _ in emit_blocks(table, output, inline_batch, profile):
+        pass
+    blocks_done = perf_counter()
+    rendered = render_inline_batch(inline_batch.fragments, inline_cache, profile)
+    inline_done = perf_counter()
+    html = inline_batch.join(output, rendered=rendered)
+    profile.add_time('split', split_done - start)
+    # Emitting happens while walking the blocks; count it once, under `emit`.
+    profile.add_time('structure', blocks_done - split_done - (profile.seconds['emit'] - emitted))
+    profile.add_time('inline', inline_done - blocks_done)
+    profile.add_time('join', perf_counter() - inline_done)
+    profile.parses += 1
+    profile.lines += len(table)
+    profile.lookahead_lines += len(table)  # The line table links every line in one backward pass
+    return html
+
+
+def stream_spaceup(lines, inline_cache=None):
+    """Parse Spaceup markup from an iterable of lines (e.g. an open file), yielding HTML chunks.
+
+    A chunk is yielded as soon as a block is complete, and only the lines the
+    indentation rules still need to look at are kept in memory.
+    Joined with newlines, the chunks equal `parse_spaceup` of the whole text.
+    """
+    stream = LineStream(lines)
     output = []
+    inline_batch = InlineBatch(inline_cache)
+    for pos in emit_blocks(stream, output, inline_batch):
+        stream.release(pos)
+        if output:
+            yield inline_batch.join(output)
+            output.clear()
+            inline_batch.clear()
+    if output:
+        yield inline_batch.join(output)
+
+
+def emit_blocks(table, output, inline_batch, profile=None):
+    """Emit HTML for the lines of `table` (a LineTable or LineStream) into `output`.
+
+    A generator: yields the current line number before every block, at which
+    point everything before that line has been emitted.
+    """
+    lines = table.lines
+    kinds = table.kinds
+    indents = table.indents  # None for blank or pure comment lines, which are ignored for structure
+    has_line = table.has_line
+    indent_stack = [0]  # Start with root level 0
     pos = 0
     previous_non_whitespace_indent = 0
-    
-    def compute_indent(line):
-        stripped = line.lstrip()
-        if not stripped or stripped.startswith('//'):  # Ignore blank or pure comment lines for structure
-            return None
-        return len(line) - len(stripped)
-    
-    def peek_next_indent(current_pos):
-        for i in range(current_pos + 1, len(lines)):
-            indent = compute_indent(lines[i])
-            if indent is not None:
-                return indent
-        return -1  # EOF, use -1 to indicate
-    
-    def render_inline_markdown(text: str) -> str:
-        html = mistune.html(text).strip()
-        if html.startswith('<p>') and html.endswith('</p>'):
-            html = html[3:-4]
-        return html
+
+    def render_inline_markdown(text: str) -> int:
+        # Deferred: all fragments are rendered together when the output is joined
+        return inline_batch.add(text)
 
     def emit_paragraph(text_lines):
         if not text_lines:
@@ -38,34 +132,38 @@ def parse_spaceup(input_str):
                 text, comment = item
                 rendered = render_inline_markdown(text)
                 if comment:
-                    output.append(f'{rendered}  <!-- {comment} --><br>')
+                    output.append((rendered, f'  <!-- {comment} --><br>'))
                 else:
-                    output.append(f'{rendered}<br>')
+                    output.append((rendered, '<br>'))
             else:
-                output.append(f'{render_inline_markdown(str(item))}<br>')
+                output.append((render_inline_markdown(str(item)), '<br>'))
         output.append('</p>')
 
     def emit_list(items):
         if not items:
             return
-        lis = ''
+        lis = []
         for text in items:
             if text.startswith('[ ] '):
-                lis += '<li><input type="checkbox" disabled> ' + render_inline_markdown(text[4:]) + '</li>\n'
+                lis += ('<li><input type="checkbox" disabled> ', render_inline_markdown(text[4:]), '</li>\n')
             elif text.startswith('[x] '):
-                lis += '<li><input type="checkbox" checked disabled> ' + render_inline_markdown(text[4:]) + '</li>\n'
+                lis += ('<li><input type="checkbox" checked disabled> ', render_inline_markdown(text[4:]), '</li>\n')
             else:
-                lis += '<li>' + render_inline_markdown(text) + '</li>\n'
+                lis += ('<li>', render_inline_markdown(text), '</li>\n')
         output.append('<ul>')
-        output.append(lis)
+        output.append(tuple(lis))
         output.append('</ul>')
 
     def emit_ordered_list(items):
         if not items:
             return
-        lis = '\n'.join(f'<li>{render_inline_markdown(text)}</li>' for text in items)
+        lis = []
+        for text in items:
+            if lis:
+                lis.append('\n')
+            lis += ('<li>', render_inline_markdown(text), '</li>')
         output.append('<ol>')
-        output.append(lis)
+        output.append(tuple(lis))
         output.append('</ol>')
 
     def emit_code_block(language, code_lines):
@@ -77,30 +175,34 @@ def parse_spaceup(input_str):
     def emit_blockquote(lines):
         if not lines:
             return
-        combined = '\n'.join(line for line in lines)
-        html = mistune.html(combined)
+        import mistune
+
+        html = mistune.html('\n'.join(lines))
+        if profile is not None:
+            profile.markdown_calls += 1
         output.append(html)
 
     def emit_table(rows):
         if not rows or len(rows) < 3:  # Min header, separator, one row
             return
-        output.append('<table>')
-        # Header
-        output.append('<thead><tr>')
-        for cell in rows[0].split('|')[1:-1]:
-            output.append('<th>' + cell.strip() + '</th>')
-        output.append('</tr></thead>')
-        # Body
-        output.append('<tbody>')
+        # A whole row is one join, and the table one output entry; every tag still gets its own line
+        parts = ['<table>', '<thead><tr>']
+        header = rows[0].split('|')[1:-1]
+        if header:
+            parts.append('<th>' + '</th>\n<th>'.join(map(str.strip, header)) + '</th>')
+        parts += ('</tr></thead>', '<tbody>')
         for row in rows[2:]:
-            output.append('<tr>')
-            for cell in row.split('|')[1:-1]:
-                output.append('<td>' + cell.strip() + '</td>')
-            output.append('</tr>')
-        output.append('</tbody>')
-        output.append('</table>')
+            cells = row.split('|')[1:-1]
+            if cells:
+                parts.append('<tr>\n<td>' + '</td>\n<td>'.join(map(str.strip, cells)) + '</td>\n</tr>')
+            else:
+                parts.append('<tr>\n</tr>')
+        parts += ('</tbody>', '</table>')
+        output.append('\n'.join(parts))
 
     def split_content_and_inline_comment(text):
+        if '//' not in text:
+            return text.strip(), None
         stripped = text.lstrip()
         search_start = 0
         while True:
@@ -116,192 +218,156 @@ def parse_spaceup(input_str):
             search_start = idx + 2
         return stripped.strip(), None
 
+    if profile is not None:
+        emit_paragraph = profile.timed('emit', emit_paragraph)
+        emit_list = profile.timed('emit', emit_list)
+        emit_ordered_list = profile.timed('emit', emit_ordered_list)
+        emit_code_block = profile.timed('emit', emit_code_block)
+        emit_blockquote = profile.timed('emit', emit_blockquote)
+        emit_table = profile.timed('emit', emit_table)
+
+    emit_run = {UNORDERED_LIST: emit_list, ORDERED_LIST: emit_ordered_list, BLOCKQUOTE: emit_blockquote, TABLE: emit_table}
+
+    # The line a run stopped at, already split and classified for the next block
+    pending_pos = -1
+    pending = None
+
+    def collect_run(pos, indent, block, first):
+        # Extend a run of `block` lines at `indent` from `pos`; list runs collect item texts, others whole lines
+        nonlocal pending_pos, pending
+        run = [first]
+        while has_line(pos) and indents[pos] == indent:
+            content, comment = split_content_and_inline_comment(lines[pos])
+            kind, item = block_kind(content)
+            if kind != block:
+                pending_pos = pos
+                pending = (content, comment, kind, item)
+                break
+            run.append(content if item is None else item)
+            pos += 1
+        return run, pos
+
     def extract_comment_only(text):
         stripped = text.lstrip()
         if stripped.startswith('//'):
             return stripped[2:].strip()
         return None
 
-    def parse_element(current_indent):
-        nonlocal pos
-        nonlocal previous_non_whitespace_indent
-        while pos < len(lines):
-            # Skip blanks, but emit comment-only lines as HTML comments
-            while pos < len(lines):
-                stripped = lines[pos].lstrip()
-                if not stripped:
-                    pos += 1
-                    continue
-                if stripped.startswith('//'):
-                    comment_text = stripped[2:].strip()
-                    if comment_text:
-                        output.append(f'<!-- {comment_text} -->')
-                    pos += 1
-                    continue
-                break
-            
-            if pos >= len(lines):
-                return
-            
-            line = lines[pos]
-            indent = compute_indent(line)
-            if indent < current_indent:
-                return  # Dedent
-            
-            # Extract content and inline comment (if present)
-            content, inline_comment = split_content_and_inline_comment(line)
-            if not content:
+    # Minimum indent of each open block, parallel to indent_stack.
+    # An explicit stack instead of recursion, so nesting depth is unbounded.
+    block_indents = [0]
+    while has_line(pos):
+        yield pos
+        # Skip blanks, but emit comment-only lines as HTML comments
+        while has_line(pos):
+            kind = kinds[pos]
+            if kind == BLANK:
                 pos += 1
-                continue  # Skip if no content after stripping
-            
-            # Detect fenced code blocks early, before heading/paragraph logic
-            if content.startswith('```'):
-                # Extract language if present
-                language = content[3:].strip() or None
-                code_lines = []
-                pos += 1
-                while pos < len(lines):
-                    next_line = lines[pos]
-                    if next_line.strip().startswith('```'):
-                        pos += 1
-                        break
-                    code_lines.append(next_line[indent:])  # Trim exactly to the opening indent level
-                    pos += 1
-                # Dedent the code block
-                if code_lines:
-                    min_indent = min(len(l) - len(l.lstrip()) for l in code_lines if l.strip())
-                    code_lines = [l[min_indent:] for l in code_lines]
-                emit_code_block(language, code_lines)
-                previous_non_whitespace_indent = indent
                 continue
-
-            next_indent = peek_next_indent(pos)
-            has_blank_before_next = False
-            is_followed_by_code_block = False
-            for i in range(pos + 1, len(lines)):
-                stripped = lines[i].lstrip()
-                if not stripped or stripped.startswith('//'):
-                    if stripped:  # Non-empty blank or comment counts as separator
-                        has_blank_before_next = True
-                    continue
-                if stripped.startswith('```'):
-                    is_followed_by_code_block = True
-                break
-            ambiguous_decrease = (
-                previous_non_whitespace_indent > indent and next_indent == indent and not has_blank_before_next
-            )
-            is_heading = next_indent > indent or (next_indent == indent and has_blank_before_next) or ambiguous_decrease or is_followed_by_code_block or (next_indent == -1 and pos < len(lines) - 1)
-
-            heading_level = len(indent_stack)
-            if is_heading:
-                rendered_heading = render_inline_markdown(content)
-                output.append(f'<h{heading_level}>{rendered_heading}</h{heading_level}>')
-                previous_non_whitespace_indent = indent
-                indent_stack.append(indent)
+            if kind == COMMENT:
+                comment_text = lines[pos].lstrip()[2:].strip()
+                if comment_text:
+                    output.append(f'<!-- {comment_text} -->')
                 pos += 1
-                # Handle ambiguous decrease: force subsequent same-indented lines as children
-                if ambiguous_decrease:
-                    forced_para_lines = []
-                    while pos < len(lines):
-                        nindent = compute_indent(lines[pos])
-                        if nindent is None or nindent != indent:
-                            break
-                        ncontent, ncomment = split_content_and_inline_comment(lines[pos])
-                        if ncontent:
-                            forced_para_lines.append((ncontent, ncomment))
-                            previous_non_whitespace_indent = indent
-                        pos += 1
-                    emit_paragraph(forced_para_lines)
-                parse_element(indent + 1)  # Recurse for content with greater indent
-                indent_stack.pop()
-            else:
-                # Paragraph: collect consecutive lines at same indent
-                # But first, detect unordered list starting with "- "
-                if content.startswith('- '):
-                    items = [content[2:].strip()]
-                    pos += 1
-                    while pos < len(lines):
-                        next_line_indent = compute_indent(lines[pos])
-                        if next_line_indent != indent:
-                            break
-                        next_content, _next_comment = split_content_and_inline_comment(lines[pos])
-                        if not next_content.startswith('- '):
-                            break
-                        items.append(next_content[2:].strip())
-                        pos += 1
-                    emit_list(items)
-                    previous_non_whitespace_indent = indent
-                    continue
+                continue
+            break
 
-                elif re.match(r'^\d+\.\s', content):
-                    items = []
-                    match = re.match(r'^\d+\.\s(.*)', content)
-                    if match:
-                        items.append(match.group(1).strip())
-                    pos += 1
-                    while pos < len(lines):
-                        next_line_indent = compute_indent(lines[pos])
-                        if next_line_indent != indent:
-                            break
-                        next_content, _next_comment = split_content_and_inline_comment(lines[pos])
-                        match = re.match(r'^\d+\.\s(.*)', next_content)
-                        if not match:
-                            break
-                        items.append(match.group(1).strip())
-                        pos += 1
-                    emit_ordered_list(items)
-                    previous_non_whitespace_indent = indent
-                    continue
+        if not has_line(pos):
+            return
 
-                elif content.startswith('> '):
-                    quote_lines = [content]
+        line = lines[pos]
+        indent = indents[pos]
+        if indent < block_indents[-1]:
+            # Dedent: close the innermost block
+            block_indents.pop()
+            indent_stack.pop()
+            continue
+        
+        # Extract content and inline comment (if present); a run that ended on this line already did
+        if pos == pending_pos:
+            content, inline_comment, block, item = pending
+        else:
+            content, inline_comment = split_content_and_inline_comment(line)
+            block = None
+        if not content:
+            pos += 1
+            continue  # Skip if no content after stripping
+        
+        # Detect fenced code blocks early, before heading/paragraph logic
+        if kinds[pos] == FENCE:
+            # Extract language if present
+            language = content[3:].strip() or None
+            code_lines = []
+            pos += 1
+            while has_line(pos):
+                next_line = lines[pos]
+                if kinds[pos] == FENCE:
                     pos += 1
-                    while pos < len(lines):
-                        next_line_indent = compute_indent(lines[pos])
-                        if next_line_indent != indent:
-                            break
-                        next_content, _ = split_content_and_inline_comment(lines[pos])
-                        if not next_content.startswith('> '):
-                            break
-                        quote_lines.append(next_content)
-                        pos += 1
-                    emit_blockquote(quote_lines)
-                    previous_non_whitespace_indent = indent
-                    continue
+                    break
+                code_lines.append(next_line[indent:])  # Trim exactly to the opening indent level
+                pos += 1
+            # Dedent the code block
+            if code_lines:
+                min_indent = min(len(l) - len(l.lstrip()) for l in code_lines if l.strip())
+                code_lines = [l[min_indent:] for l in code_lines]
+            emit_code_block(language, code_lines)
+            previous_non_whitespace_indent = indent
+            continue
 
-                elif content.startswith('|') and '|' in content[1:]:
-                    table_lines = [content]
-                    pos += 1
-                    while pos < len(lines):
-                        next_line_indent = compute_indent(lines[pos])
-                        if next_line_indent != indent:
-                            break
-                        next_content, _ = split_content_and_inline_comment(lines[pos])
-                        if not next_content.startswith('|') or '|' not in next_content[1:]:
-                            break
-                        table_lines.append(next_content)
-                        pos += 1
-                    emit_table(table_lines)
-                    previous_non_whitespace_indent = indent
-                    continue
+        next_indent = table.next_indent[pos]  # -1 at EOF
+        has_blank_before_next = table.separated[pos]  # Only comment lines count as separator
+        is_followed_by_code_block = table.followed_by_fence(pos)
+        ambiguous_decrease = (
+            previous_non_whitespace_indent > indent and next_indent == indent and not has_blank_before_next
+        )
+        is_heading = next_indent > indent or (next_indent == indent and has_blank_before_next) or ambiguous_decrease or is_followed_by_code_block or (next_indent == -1 and has_line(pos + 1))
 
-                para_lines = [(content, inline_comment)]
-                pos += 1
-                while pos < len(lines):
-                    next_line_indent = compute_indent(lines[pos])
-                    if next_line_indent != indent:
+        heading_level = len(indent_stack)
+        if is_heading:
+            rendered_heading = render_inline_markdown(content)
+            output.append((f'<h{heading_level}>', rendered_heading, f'</h{heading_level}>'))
+            previous_non_whitespace_indent = indent
+            indent_stack.append(indent)
+            if profile is not None:
+                profile.nested(len(indent_stack) - 1)
+            pos += 1
+            # Handle ambiguous decrease: force subsequent same-indented lines as children
+            if ambiguous_decrease:
+                forced_para_lines = []
+                while has_line(pos):
+                    nindent = indents[pos]
+                    if nindent is None or nindent != indent:
                         break
-                    next_content, next_comment = split_content_and_inline_comment(lines[pos])
-                    if not next_content:
-                        pos += 1
-                        continue
-                    para_lines.append((next_content, next_comment))
-                    previous_non_whitespace_indent = indent
+                    ncontent, ncomment = split_content_and_inline_comment(lines[pos])
+                    if ncontent:
+                        forced_para_lines.append((ncontent, ncomment))
+                        previous_non_whitespace_indent = indent
                     pos += 1
-                emit_paragraph(para_lines)
+                emit_paragraph(forced_para_lines)
+            block_indents.append(indent + 1)  # Descend into content with greater indent
+        else:
+            # Paragraph: collect consecutive lines at same indent
+            # But first, detect lists, quotes and tables, which run while their lines start the same way
+            if block is None:
+                block, item = block_kind(content)
+            if block != PARAGRAPH:
+                run, pos = collect_run(pos + 1, indent, block, content if item is None else item)
+                emit_run[block](run)
                 previous_non_whitespace_indent = indent
-    
-    parse_element(0)
-    return '\n'.join(output)
-
+                continue
 
+            para_lines = [(content, inline_comment)]
+            pos += 1
+            while has_line(pos):
+                next_line_indent = indents[pos]
+                if next_line_indent != indent:
+                    break
+                next_content, next_comment = split_content_and_inline_comment(lines[pos])
+                if not next_content:
+                    pos += 1
+                    continue
+                para_lines.append((next_content, next_comment))
+                previous_non_whitespace_indent = indent
+                pos += 1
+            emit_paragraph(para_lines)
+            previous_non_whitespace_indent = indent
@@ -0,0 +1,73 @@
+"""Opt-in per-phase timing and counters for the parsers."""
+
+from __future__ import annotations
+
+from functools import wraps
+from time import perf_counter
+from typing import Any, Callable, Dict, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+PHASES = ("split", "structure", "emit", "inline", "join")
+
+
+class ParseProfile:
+    """Where `parse_spaceup` and `parse_spaceup_ast` spend their time.
+
+    Pass one as `profile=`; the parsers only touch it when given, so an
+    unprofiled parse runs the same code as before. Reuse one across parses to
+    accumulate: times and counts add up, `max_depth` keeps the maximum.
+
+    Phases, in seconds:
+        split      building the line table (splitting, classifying, lookahead)
+        structure  applying the indentation rules; for the AST, building the tree
+        emit       HTML for paragraphs, lists, tables, quotes and code blocks
+        inline     rendering inline Markdown
+        join       filling in the rendered fragments and joining the output
+    """
+
+    def __init__(self) -> None:
+        self.seconds: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.parses = 0
+        self.lines = 0
+        # Lines visited to precompute what follows each line; see `LineTable.link`.
+        self.lookahead_lines = 0
+        # Fragments and blockquotes handed to mistune (cache hits and plain text are not).
+        self.markdown_calls = 0
+        # Deepest heading nesting seen; a top-level heading is depth 1.
+        self.max_depth = 0
+
+    def add_time(self, phase: str, seconds: float) -> None:
+        self.seconds[phase] += seconds
+
+    def timed(self, phase: str, function: F) -> F:
+        """Wrap `function` so the time spent in it counts towards `phase`."""
+
+        @wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.seconds[phase] += perf_counter() - start
+
+        return wrapper  # type: ignore[return-value]
+
+    def nested(self, depth: int) -> None:
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(self.seconds.values())
+
+    def report(self) -> Dict[str, Any]:
+        """A JSON-ready dict of everything recorded, e.g. for a metrics pipeline."""
+        return {
+            "parses": self.parses,
+            "lines": self.lines,
+            "seconds": {**self.seconds, "total": self.total_seconds},
+            "markdown_calls": self.markdown_calls,
+            "lookahead_lines": self.lookahead_lines,
+            "max_depth": self.max_depth,
+        }
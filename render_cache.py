@@ -0,0 +1,200 @@
+"""
+Persistent cache of rendered Spaceup files, for rebuilds where most files did not change.
+
+Entries are keyed by a hash of the source text, the renderer version and the
+render options (e.g. the output format), and hold the rendered output. They
+live in a directory shared by every process that renders:
+
+    <directory>/<first two hex digits of the key>/<rest of the key>
+
+Writes go to a temporary file that is then renamed, so concurrent workers
+never read a partial entry; two workers rendering the same file both write
+the same contents. Reading an entry marks it as recently used, and when the
+directory grows past `max_bytes`, the least recently used entries are
+removed until it is back under 90% of it.
+
+    cache = RenderCache(".spaceup-cache")
+    html = cache.render(text, "html", parse_spaceup)
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from hashlib import blake2b
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Eviction trims the cache to this fraction of `max_bytes`, so it does not run again on the next write.
+_LOW_WATER = 0.9
+
+# Modules whose code decides the rendered output.
+_RENDERER_MODULES = (
+    "parser.py",
+    "ast_parser.py",
+    "line_table.py",
+    "inline_markdown.py",
+    "batch.py",
+    "adaptors/mdast/mdast.py",
+)
+_MARKDOWN_ENGINES = ("mistune", "markdown_it")
+
+
+@lru_cache(maxsize=None)
+def renderer_version() -> str:
+    """A hash of the renderer code and of the Markdown engines' versions; any change invalidates the cache.
+
+    The engines are located, not imported, so a rebuild served from the cache
+    never loads them.
+    """
+    from importlib.util import find_spec
+
+    digest = blake2b(digest_size=16)
+    here = Path(__file__).parent
+    for name in _RENDERER_MODULES:
+        digest.update(name.encode())
+        digest.update((here / name).read_bytes())
+    for engine in _MARKDOWN_ENGINES:
+        spec = find_spec(engine)
+        digest.update(engine.encode())
+        if spec is not None and spec.origin is not None:
+            digest.update(Path(spec.origin).read_bytes())  # The package `__init__`, which holds its version
+    return digest.hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0  # Entries removed to stay under the size bound
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        return {**asdict(self), "hit_rate": self.hit_rate}
+
+
+class RenderCache:
+    """Rendered outputs on disk, keyed by source text, renderer version and options; see the module docstring.
+
+    Each process keeps its own `stats`. Failing to read or write an entry
+    (e.g. a full disk, or a worker evicting it at the same time) counts as a
+    miss or is skipped; it never fails the render.
+    """
+
+    def __init__(self, directory: Union[str, Path], max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._size: Optional[int] = None  # Bytes in the cache as far as this process knows; scanned on first write
+
+    def key(self, text: str, *options: str) -> str:
+        digest = blake2b(digest_size=20)
+        for part in (renderer_version(), *options):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / key[2:]
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            rendered = path.read_text(encoding="utf-8")
+            os.utime(path)  # Recently used
+        except OSError:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return rendered
+
+    def put(self, key: str, rendered: str) -> None:
+        import tempfile
+
+        path = self._path(key)
+        data = rendered.encode("utf-8")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            descriptor, temporary = tempfile.mkstemp(dir=path.parent, prefix=".", suffix=".tmp")
+            try:
+                with os.fdopen(descriptor, "wb") as file:
+                    file.write(data)
+                try:
+                    replaced = path.stat().st_size  # Overwriting an entry does not grow the cache by all of it
+                except FileNotFoundError:
+                    replaced = 0
+                os.replace(temporary, path)
+            except BaseException:
+                os.unlink(temporary)
+                raise
+        except OSError:
+            return
+        self.stats.writes += 1
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        else:
+            self._size += len(data) - replaced
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def render(self, text: str, name: str, render: Callable[[str], str], *options: str) -> str:
+        """`render(text)`, from the cache if it holds the output of renderer `name` with `options` for `text`."""
+        key = self.key(text, name, *options)
+        rendered = self.get(key)
+        if rendered is None:
+            rendered = render(text)
+            self.put(key, rendered)
+        return rendered
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """(last used, size, path) of every entry."""
+        entries = []
+        try:
+            buckets = list(os.scandir(self.directory))
+        except OSError:
+            return entries
+        for bucket in buckets:
+            if not bucket.is_dir():
+                continue
+            try:
+                for entry in os.scandir(bucket.path):
+                    if not entry.name.startswith("."):  # Temporary files of writes in progress
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+            except OSError:
+                continue  # Removed by another process
+        return entries
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the cache is under 90% of `max_bytes`."""
+        entries = self._entries()
+        size = sum(entry_size for _, entry_size, _ in entries)
+        if size > self.max_bytes:
+            entries.sort()
+            target = self.max_bytes * _LOW_WATER
+            for _, entry_size, path in entries:
+                if size <= target:
+                    break
+                try:
+                    os.unlink(path)
+                    self.stats.evictions += 1
+                except OSError:
+                    pass  # Already evicted by another process
+                size -= entry_size
+        self._size = size
+
+    def clear(self) -> None:
+        for _, _, path in self._entries():
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        self._size = 0
@@ -0,0 +1,300 @@
+"""
+A long-lived HTTP render server, so rendering does not pay for a new Python process each time.
+
+Renders run in a pool of worker processes that import the parsers and build
+the Markdown renderer once, at startup; if a worker dies, the pool is
+replaced and the request it was rendering fails. The asyncio front end accepts
+concurrent connections, keeps them alive, and supports pipelining: requests
+sent back to back on one connection are rendered concurrently and answered
+in order. At most `MAX_PIPELINED` of them are outstanding per connection;
+further requests are not read until earlier ones are answered.
+
+    python -m server --port 8080 --jobs 4
+    curl --data-binary @notes.sup 'localhost:8080/render?format=html'
+    curl localhost:8080/health
+
+Endpoints:
+    POST /render[?format=html|ast|mdast]   body: Spaceup text (UTF-8)
+    GET  /health                          JSON status of the server and its pool
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sys
+from typing import Any, Dict, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from batch import FORMATS, render_source
+from inline_markdown import InlineCache
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+MAX_PIPELINED = 32  # Requests read but not yet answered, per connection
+
+_CONTENT_TYPES = {"html": "text/html; charset=utf-8", "ast": "application/json", "mdast": "application/json"}
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+_worker_cache: Optional[InlineCache] = None
+
+
+def _init_worker() -> None:
+    global _worker_cache
+    _worker_cache = InlineCache()
+    # Import the parsers and build the Markdown renderer now, not on the first request.
+    for output_format in FORMATS:
+        render_source("warm\n    *up* // worker", output_format)
+
+
+def _render_in_worker(text: str, output_format: str) -> str:
+    return render_source(text, output_format, _worker_cache)
+
+
+def _ready() -> int:
+    return os.getpid()
+
+
+class _BadRequest(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+# (method, target, headers with lower-cased names, body, keep_alive)
+_Request = Tuple[str, str, Dict[str, str], bytes, bool]
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[_Request]:
+    """Read one HTTP/1.x request, or return None if the client closed the connection first."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as error:
+        if error.partial.strip():
+            raise _BadRequest(400, "Incomplete request head") from None
+        return None
+    except asyncio.LimitOverrunError:
+        raise _BadRequest(400, "Request head too large") from None
+    request_line, *header_lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = request_line.split(" ")
+    except ValueError:
+        raise _BadRequest(400, f"Malformed request line: {request_line!r}") from None
+    headers: Dict[str, str] = {}
+    for line in header_lines:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise _BadRequest(400, "Chunked request bodies are not supported; send Content-Length")
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError:
+        raise _BadRequest(400, "Invalid Content-Length") from None
+    if length < 0:
+        raise _BadRequest(400, "Invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise _BadRequest(413, f"Body larger than {MAX_BODY_BYTES} bytes")
+    try:
+        body = await reader.readexactly(length) if length else b""
+    except asyncio.IncompleteReadError:
+        raise _BadRequest(400, "Incomplete request body") from None
+    return method, target, headers, body, keep_alive
+
+
+def _response(status: int, body: bytes, content_type: str, keep_alive: bool) -> bytes:
+    head = (
+        f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+def _error(status: int, message: str, keep_alive: bool) -> bytes:
+    return _response(status, json.dumps({"error": message}).encode(), "application/json", keep_alive)
+
+
+class RenderServer:
+    """Serves renders from a pool of `jobs` warm worker processes (default: one per CPU)."""
+
+    def __init__(self, jobs: Optional[int] = None) -> None:
+        self.jobs = max(1, jobs or os.cpu_count() or 1)
+        self.served = 0  # Requests answered
+        self.in_flight = 0  # Renders submitted to the pool and not finished yet
+        self.restarts = 0  # Pools replaced after a worker died
+        self._pool: Any = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0, unix_path: Optional[str] = None) -> None:
+        """Start the worker pool and wait until every worker is warm, then start listening."""
+        loop = asyncio.get_running_loop()
+        self._pool = self._new_pool()
+        # The pool starts its processes lazily; one task per worker brings them all up front.
+        await asyncio.gather(*(loop.run_in_executor(self._pool, _ready) for _ in range(self.jobs)))
+        if unix_path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path=unix_path)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+
+    def _new_pool(self) -> Any:
+        from concurrent.futures import ProcessPoolExecutor
+
+        return ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_worker)
+
+    def _replace_pool(self, broken: Any) -> None:
+        """Replace `broken`, a pool that lost a worker and cannot run anything any more, unless already done."""
+        if self._pool is broken:
+            self._pool = self._new_pool()
+            self.restarts += 1
+            broken.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def address(self) -> Any:
+        """The bound (host, port), or the socket path of a Unix-socket server."""
+        assert self._server is not None, "server is not started"
+        return self._server.sockets[0].getsockname()
+
+    async def serve_forever(self) -> None:
+        assert self._server is not None, "server is not started"
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._pool is not None:
+            # Waiting for the workers to exit blocks, so it happens off the event loop.
+            await asyncio.to_thread(self._pool.shutdown, wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # Responses are queued in request order; the writer sends each once it is ready and frees its slot.
+        responses: asyncio.Queue = asyncio.Queue()
+        slots = asyncio.Semaphore(MAX_PIPELINED)
+        writer_task = asyncio.create_task(self._write_responses(responses, slots, writer))
+        try:
+            while True:
+                await slots.acquire()
+                try:
+                    request = await _read_request(reader)
+                except _BadRequest as error:
+                    responses.put_nowait((_done(_error(error.status, str(error), False)), False))
+                    break
+                if request is None:
+                    break
+                keep_alive = request[4]
+                responses.put_nowait((asyncio.create_task(self._respond(request)), keep_alive))
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            responses.put_nowait(None)
+            await writer_task
+            writer.close()
+
+    async def _write_responses(
+        self, responses: asyncio.Queue, slots: asyncio.Semaphore, writer: asyncio.StreamWriter
+    ) -> None:
+        # Keeps taking responses after the client disconnects, so the reader never waits on a slot forever.
+        connected = True
+        while True:
+            item = await responses.get()
+            if item is None:
+                return
+            pending, keep_alive = item
+            response = await pending
+            if connected:
+                try:
+                    writer.write(response)
+                    await writer.drain()
+                    self.served += 1
+                except ConnectionError:
+                    connected = False
+            slots.release()
+            if not keep_alive:
+                return
+
+    async def _respond(self, request: _Request) -> bytes:
+        method, target, _, body, keep_alive = request
+        url = urlsplit(target)
+        if url.path == "/health":
+            if method != "GET":
+                return _error(405, "Use GET", keep_alive)
+            return _response(200, json.dumps(self.health()).encode(), "application/json", keep_alive)
+        if url.path != "/render":
+            return _error(404, f"No such endpoint: {url.path}", keep_alive)
+        if method != "POST":
+            return _error(405, "Use POST with the Spaceup text as the body", keep_alive)
+        output_format = parse_qs(url.query).get("format", ["html"])[0]
+        if output_format not in FORMATS:
+            return _error(400, f"Unknown format {output_format!r}; expected one of {', '.join(FORMATS)}", keep_alive)
+        try:
+            text = body.decode("utf-8")
+        except UnicodeDecodeError:
+            return _error(400, "Body is not valid UTF-8", keep_alive)
+
+        loop = asyncio.get_running_loop()
+        pool = self._pool
+        self.in_flight += 1
+        try:
+            rendered = await loop.run_in_executor(pool, _render_in_worker, text, output_format)
+        except Exception as error:
+            from concurrent.futures.process import BrokenProcessPool
+
+            if isinstance(error, BrokenProcessPool):
+                self._replace_pool(pool)
+            return _error(500, f"{type(error).__name__}: {error}", keep_alive)
+        finally:
+            self.in_flight -= 1
+        return _response(200, rendered.encode("utf-8"), _CONTENT_TYPES[output_format], keep_alive)
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            "workers": self.jobs,
+            "in_flight": self.in_flight,
+            "served": self.served,
+            "restarts": self.restarts,
+        }
+
+
+def _done(response: bytes) -> asyncio.Future:
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(response)
+    return future
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(prog="python -m server", description="Serve Spaceup renders over HTTP.")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8080)
+    arg_parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    arg_parser.add_argument("--jobs", "-j", type=int, help="worker processes (default: one per CPU)")
+    args = arg_parser.parse_args(argv)
+
+    async def serve() -> None:
+        server = RenderServer(jobs=args.jobs)
+        await server.start(args.host, args.port, unix_path=args.unix)
+        print(f"Serving on {server.address} with {server.jobs} workers", file=sys.stderr)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+import timeit
+from pathlib import Path
+
+import ast_cache
+from ast_cache import cache_path, encode_document, load_ast_cache, parse_spaceup_cached, write_ast_cache
+from ast_parser import Comment, Document, Heading, MarkdownBlock, MarkdownInline, Paragraph, ParagraphLine
+from ast_parser import document_to_dict, parse_spaceup_ast, render_ast_to_html, tokenize_document
+from benchmarks.corpus import CorpusOptions, generate_document
+
+
+def test_cache_round_trips_documents(tmp_path):
+    path = tmp_path / "document.astc"
+    for source_path in sorted(Path("tests/data").glob("*.txt")):
+        text = source_path.read_text()
+        document = parse_spaceup_ast(text)
+        write_ast_cache(document, text, path)
+        loaded = load_ast_cache(path, text)
+        assert loaded == document, source_path.name
+        assert render_ast_to_html(loaded) == render_ast_to_html(document), source_path.name
+        assert document_to_dict(loaded) == document_to_dict(document), source_path.name  # Same source spans
+
+
+def test_cache_stores_every_node_kind(tmp_path):
+    long_text = "é" * 300  # Multi-byte characters, and string indices and lengths past one varint byte
+    document = Document(
+        children=[
+            Heading(level=200, content=MarkdownInline(long_text)),
+            Paragraph(lines=[ParagraphLine(MarkdownInline("a")), ParagraphLine(MarkdownInline("a"), inline_comment="")]),
+            Comment(text="note"),
+            MarkdownBlock("> quote"),
+        ]
+        + [Comment(text=str(n)) for n in range(200)]
+    )
+    write_ast_cache(document, "source", tmp_path / "document.astc")
+    loaded = load_ast_cache(tmp_path / "document.astc", "source")
+    assert loaded is not None
+    assert loaded.children[-1] == Comment(text="199") and loaded.children[1].lines[1].inline_comment == ""
+    assert loaded == document
+    assert loaded.children[0] is loaded.children[0]
+
+
+def test_cache_deduplicates_strings():
+    line = "the same line over and over"
+    repeated = encode_document(parse_spaceup_ast(f"{line}\n" * 1000), "")
+    assert len(repeated) < 1000 * 4  # A few bytes of record and node offset per paragraph, and the text once
+    assert repeated.count(line.encode()) == 1
+
+
+def test_cache_is_invalidated_by_source_and_version(tmp_path, monkeypatch):
+    text = "heading\n    line\n"
+    path = tmp_path / "document.astc"
+    write_ast_cache(parse_spaceup_ast(text), text, path)
+    assert load_ast_cache(path, text) is not None
+    assert load_ast_cache(path, text + "    more\n") is None
+    assert load_ast_cache(tmp_path / "missing.astc", text) is None
+
+    monkeypatch.setattr(ast_cache, "FORMAT_VERSION", ast_cache.FORMAT_VERSION + 1)
+    assert load_ast_cache(path, text) is None
+
+    for broken in (b"", b"garbage", path.read_bytes()[:-1]):
+        path.write_bytes(broken)
+        assert load_ast_cache(path, text) is None
+
+
+def test_loaded_nodes_keep_tokens(tmp_path):
+    text = "*heading*\n    line\n"
+    write_ast_cache(parse_spaceup_ast(text), text, tmp_path / "document.astc")
+    loaded = tokenize_document(load_ast_cache(tmp_path / "document.astc", text))
+    assert loaded.children[0].content.has_tokens
+    assert loaded == parse_spaceup_ast(text, tokenize=True)
+
+
+def test_parse_spaceup_cached_writes_and_reuses_cache(tmp_path):
+    source_path = tmp_path / "notes.sup"
+    source_path.write_text("heading\n    line\n")
+    assert parse_spaceup_cached(source_path) == parse_spaceup_ast(source_path.read_text())
+    assert cache_path(source_path) == tmp_path / "notes.sup.astc"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["notes.sup", "notes.sup.astc"]
+
+    source_path.write_text("changed\n    line\n")
+    assert parse_spaceup_cached(source_path).children[0].content.text == "changed"
+    assert load_ast_cache(cache_path(source_path), "changed\n    line\n") is not None
+
+
+def test_loading_is_much_faster_than_parsing(tmp_path):
+    text = generate_document(20_000, CorpusOptions())
+    path = tmp_path / "document.astc"
+    write_ast_cache(parse_spaceup_ast(text), text, path)
+    parse = min(timeit.repeat(lambda: parse_spaceup_ast(text), number=1, repeat=5))
+    load = min(timeit.repeat(lambda: load_ast_cache(path, text), number=1, repeat=5))
+    load_all = min(timeit.repeat(lambda: list(load_ast_cache(path, text).children), number=1, repeat=5))
+    # About 35x and 2x on an idle machine; the bounds leave room for a loaded one.
+    assert load * 5 < parse, f"parse: {parse:.4f}s, load: {load:.4f}s"
+    assert load_all < parse, f"parse: {parse:.4f}s, load and decode all: {load_all:.4f}s"
@@ -5,15 +5,30 @@ Note that when comparing HTML, whitespace does NOT matter.
 Hence it is normalized before comparison.
 """
 
+import io
+import json
 import textwrap
+import tracemalloc
 from pathlib import Path
 
+import pytest
 from bs4 import BeautifulSoup
 from bs4.element import Tag, NavigableString, Comment
 
 from ast_parser import (
+    COMMENT_EVENT,
+    ENTER_HEADING,
+    ENTER_PARAGRAPH,
+    EXIT_HEADING,
+    EXIT_PARAGRAPH,
+    PARAGRAPH_LINE,
+    SpaceupHandler,
+    iter_spaceup_events,
+    parse_spaceup_events,
     parse_spaceup_ast,
     render_ast_to_html,
+    document_to_dict,
+    write_ast_json,
     Document,
     Heading,
     Paragraph,
@@ -497,3 +512,116 @@ def test_ast_parser_with_full_example_and_markdown_in_paragraphs():
     spaceup_html = render_ast_to_html(parsed_spaceup_ast)
     actual_structured_html = BeautifulSoup(spaceup_html, "html.parser")
     assert _soup_ast(expected_structured_html) == _soup_ast(actual_structured_html)
+
+
+def test_ast_parser_with_deeply_nested_headings():
+    depth = 10_000
+    deep_input = "\n".join(" " * level + f"level {level}" for level in range(depth))
+    parsed_spaceup_ast = parse_spaceup_ast(deep_input)
+    headings = parsed_spaceup_ast.children[:-1]
+    assert [heading.level for heading in headings] == list(range(1, depth))
+    assert parsed_spaceup_ast.children[-1] == Paragraph(
+        lines=[ParagraphLine(content=MarkdownInline(text=f"level {depth - 1}", tokens=[]), inline_comment=None)]
+    )
+
+
+def test_ast_parser_events():
+    events = list(
+        iter_spaceup_events("heading\n    paragraph // note\n    // comment\n    - item\nnext heading\n    child")
+    )
+    assert events == [
+        (ENTER_HEADING, 1, "heading"),
+        # The comment line separates "paragraph" from the next line, so it is a heading
+        (ENTER_HEADING, 2, "paragraph"),
+        (COMMENT_EVENT, "comment"),
+        (EXIT_HEADING, 2),
+        (ENTER_PARAGRAPH,),
+        (PARAGRAPH_LINE, "- item", None),
+        (EXIT_PARAGRAPH,),
+        (EXIT_HEADING, 1),
+        (ENTER_HEADING, 1, "next heading"),
+        (ENTER_PARAGRAPH,),
+        (PARAGRAPH_LINE, "child", None),
+        (EXIT_PARAGRAPH,),
+        (EXIT_HEADING, 1),
+    ]
+
+
+def test_ast_parser_events_push_to_handler():
+    class HeadingIndex(SpaceupHandler):
+        def __init__(self):
+            self.headings = []
+
+        def enter_heading(self, level, text):
+            self.headings.append((level, text))
+
+    full_input = Path("tests/data/full_example.txt").read_text()
+    index = HeadingIndex()
+    parse_spaceup_events(full_input.splitlines(keepends=True), index)
+    expected = [(node.level, node.content.text) for node in parse_spaceup_ast(full_input).children if isinstance(node, Heading)]
+    assert index.headings == expected
+
+
+def test_ast_parser_nodes_are_spans_of_the_source():
+    text = "heading // note\r\n    line one // c\r\n    line two\n// top\n"
+    document = parse_spaceup_ast(text)
+    heading, paragraph, comment = document.children
+    assert (heading.content.start, heading.content.end) == (0, 7)
+    first, second = paragraph.lines
+    assert text[first.content.start : first.content.end] == "line one"
+    assert first.inline_comment == "c"
+    assert second.content.start == text.index("line two")
+    assert comment == Comment(text="top")
+
+    full_input = Path("tests/data/full_example_and_markdown_in_paragraphs.txt").read_text()
+    for node in parse_spaceup_ast(full_input).children:
+        contents = [node.content] if isinstance(node, Heading) else [line.content for line in getattr(node, "lines", [])]
+        for content in contents:
+            assert content.source is full_input
+            assert full_input[content.start : content.end] == content.text
+
+
+def test_ast_parser_tokenize_fills_tokens_from_one_parser():
+    from markdown_it import MarkdownIt
+
+    from inline_markdown import shared_markdown_it
+
+    source = Path("tests/data/full_example_and_markdown_in_paragraphs.txt").read_text() + "Again\n    plain\n    plain\n"
+    document = parse_spaceup_ast(source, tokenize=True)
+    reference = MarkdownIt("commonmark").enable("strikethrough")
+    contents = [node.content for node in document.children if isinstance(node, Heading)]
+    contents += [line.content for node in document.children if isinstance(node, Paragraph) for line in node.lines]
+    for content in contents:
+        assert content.tokens == (reference.parseInline(content.text)[0].children or []), content.text
+    assert any(token.type == "strong_open" for content in contents for token in content.tokens)
+    plain = [content for content in contents if content.text == "plain"]
+    assert plain[0].tokens is plain[1].tokens
+    assert shared_markdown_it() is shared_markdown_it()
+    assert parse_spaceup_ast(source).children[0].content.tokens == []
+
+
+def test_write_ast_json_matches_document_to_dict():
+    for path in sorted(Path("tests/data").glob("*.txt")):
+        full_input = path.read_text()
+        expected = json.dumps(document_to_dict(parse_spaceup_ast(full_input)))
+        for source in (full_input, parse_spaceup_ast(full_input)):
+            out = io.StringIO()
+            write_ast_json(source, out, chunk_size=64)
+            assert out.getvalue() == expected, path.name
+    with pytest.raises(TypeError):
+        write_ast_json(iter(["heading\n"]), io.StringIO())
+
+
+def test_write_ast_json_memory_does_not_grow_with_string():
+    class Discard:
+        def write(self, text):
+            pass
+
+    peaks = []
+    for count in (500, 5_000):
+        text = "".join(f"heading {i}\n    paragraph *{i}* // note\n" for i in range(count))
+        tracemalloc.start()  # After building the string, so only memory beyond it is traced
+        write_ast_json(text, Discard())
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    assert peaks[1] < peaks[0] * 1.5
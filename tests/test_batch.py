@@ -0,0 +1,113 @@
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from batch import collect_sources, main, render_batch
+from parser import parse_spaceup
+
+
+def _copy_fixtures(tmp_path: Path) -> Path:
+    source_dir = tmp_path / "src"
+    for idx, path in enumerate(sorted(Path("tests/data").glob("*.txt"))):
+        target = source_dir / ("nested" if idx % 2 else "") / path.with_suffix(".sup").name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(path, target)
+    return source_dir
+
+
+def test_collect_sources_from_directory_glob_and_file(tmp_path):
+    source_dir = _copy_fixtures(tmp_path)
+    from_dir = collect_sources(source_dir)
+    assert from_dir == sorted(from_dir)
+    assert len(from_dir) == len(list(Path("tests/data").glob("*.txt")))
+    assert collect_sources(f"{source_dir}/nested/*.sup") == [path for path in from_dir if path.parent.name == "nested"]
+    assert collect_sources(from_dir[0]) == [from_dir[0]]
+    assert collect_sources(tmp_path / "missing.sup") == []
+
+
+def test_render_batch_matches_parse_spaceup(tmp_path):
+    source_dir = _copy_fixtures(tmp_path)
+    paths = collect_sources(source_dir)
+    report = render_batch(paths, tmp_path / "out", root=source_dir, jobs=2, chunksize=3)
+    assert [result.path for result in report.results] == paths
+    assert not report.failed
+    for result in report.results:
+        assert result.output == tmp_path / "out" / result.path.relative_to(source_dir).with_suffix(".html")
+        assert result.output.read_text() == parse_spaceup(result.path.read_text())
+        assert result.chars == len(result.path.read_text())
+    assert report.chars == sum(result.chars for result in report.results)
+    assert report.files_per_second > 0
+
+
+def test_render_batch_reports_failures_and_continues(tmp_path):
+    good = tmp_path / "good.sup"
+    good.write_text("heading\n    paragraph\n")
+    missing = tmp_path / "missing.sup"
+    report = render_batch([missing, good], jobs=1)
+    assert [result.error is not None for result in report.results] == [True, False]
+    assert report.results[0].output is None
+    assert good.with_suffix(".html").read_text() == parse_spaceup(good.read_text())
+
+
+def test_render_batch_reports_write_failures_and_continues(tmp_path):
+    for name in ("a.sup", "b.sup"):
+        (tmp_path / "src" / name).parent.mkdir(exist_ok=True)
+        (tmp_path / "src" / name).write_text("heading\n    paragraph\n")
+    (tmp_path / "out").mkdir()
+    (tmp_path / "out" / "a.html").mkdir()  # Not writable as a file
+    report = render_batch([tmp_path / "src" / "a.sup", tmp_path / "src" / "b.sup"], tmp_path / "out", jobs=1)
+    assert [result.error is not None for result in report.results] == [True, False]
+    assert report.results[0].output is None and report.results[0].error.startswith("IsADirectoryError")
+    assert (tmp_path / "out" / "b.html").is_file()
+
+
+def test_render_batch_rejects_root_that_does_not_contain_the_files(tmp_path):
+    source = tmp_path / "a" / "x.sup"
+    source.parent.mkdir()
+    source.write_text("heading\n")
+    with pytest.raises(ValueError, match="outside the root"):
+        render_batch([source], tmp_path / "out", root=tmp_path / "b", jobs=1)
+    assert not (tmp_path / "out").exists()
+
+
+def test_batch_cli_json_report(tmp_path, capsys):
+    source_dir = _copy_fixtures(tmp_path)
+    assert main([str(source_dir), "--out", str(tmp_path / "out"), "--jobs", "2", "--json"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["jobs"] == 2
+    assert report["failed"] == 0
+    assert len(report["files"]) == len(collect_sources(source_dir))
+    assert all(Path(entry["output"]).is_file() for entry in report["files"])
+
+
+def test_render_batch_with_cache_renders_only_changed_files(tmp_path):
+    source_dir = _copy_fixtures(tmp_path)
+    paths = collect_sources(source_dir)
+    cache_dir = tmp_path / "cache"
+    first = render_batch(paths, tmp_path / "out", root=source_dir, jobs=2, cache_dir=cache_dir)
+    # Some fixtures have the same text, and share an entry.
+    assert first.cache_misses == len({path.read_text() for path in paths})
+    assert first.cache_hits == len(paths) - first.cache_misses
+
+    paths[0].write_text("changed\n    paragraph\n")
+    second = render_batch(paths, tmp_path / "out", root=source_dir, jobs=1, cache_dir=cache_dir)
+    assert [result.cached for result in second.results] == [False] + [True] * (len(paths) - 1)  # Only the changed file
+    for result in second.results:
+        assert result.output.read_text() == parse_spaceup(result.path.read_text())
+    assert "1 rendered" in second.summary()
+    assert second.to_dict()["cache_hits"] == len(paths) - 1
+
+    other_format = render_batch(paths, tmp_path / "out", root=source_dir, jobs=1, output_format="ast", cache_dir=cache_dir)
+    assert other_format.cache_misses == len({path.read_text() for path in paths})
+    assert render_batch(paths, tmp_path / "out", root=source_dir, jobs=1).cache_misses == 0
+
+
+def test_worker_initializer_builds_the_renderer():
+    import batch
+    import inline_markdown
+
+    batch._init_worker("html")
+    assert inline_markdown._markdown is not None
+    assert batch._worker_cache is not None and batch._worker_render_cache is None
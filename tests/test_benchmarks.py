@@ -0,0 +1,72 @@
+import json
+
+from ast_parser import parse_spaceup_ast, render_ast_to_html
+from benchmarks import BENCHMARKS, CorpusOptions, compare_results, generate_document, run_benchmarks
+from indentation import validate_indentation
+from parser import parse_spaceup
+
+
+def test_generated_document_is_valid_and_deterministic():
+    options = CorpusOptions(max_depth=3, seed=7)
+    text = generate_document(500, options)
+    assert text == generate_document(500, options)
+    assert text != generate_document(500, CorpusOptions(max_depth=3, seed=8))
+    assert len(text.splitlines()) == 500
+    validate_indentation(text)
+    assert max(len(line) - len(line.lstrip(" ")) for line in text.splitlines()) <= 4 * options.max_depth
+    assert parse_spaceup(text) and render_ast_to_html(parse_spaceup_ast(text))
+
+
+def test_generated_document_follows_ratios():
+    plain = generate_document(
+        300, CorpusOptions(comment_ratio=0, list_ratio=0, table_ratio=0, max_blank_run=0, markup_ratio=0)
+    )
+    assert "//" not in plain and "\n\n" not in plain and "|---|" not in plain
+    busy = generate_document(300, CorpusOptions(comment_ratio=0.5, list_ratio=0.5, table_ratio=0.5))
+    assert "//" in busy and "- " in busy and "|---|" in busy
+
+
+def test_run_benchmarks_produces_comparable_json():
+    results = json.loads(json.dumps(run_benchmarks(sizes=(50,), repeat=1)))
+    assert [entry["benchmark"] for entry in results["results"]] == list(BENCHMARKS)
+    assert all(entry["lines"] == 50 and entry["best_seconds"] > 0 for entry in results["results"])
+
+    slower = json.loads(json.dumps(results))
+    slower["results"][0]["best_seconds"] *= 2
+    comparison = compare_results(results, slower)
+    assert [entry["regression"] for entry in comparison] == [True] + [False] * (len(BENCHMARKS) - 1)
+
+
+def test_block_detection_microbenchmark_runs():
+    from benchmarks.block_detection import SHAPES, run
+
+    timings = run(lines=100, repeat=1)
+    assert set(timings) == set(SHAPES)
+    assert all(seconds["parse"] > 0 and seconds["structure"] > 0 for seconds in timings.values())
+
+
+def test_emitter_benchmark_documents_render():
+    from benchmarks.emitters import long_list, run, wide_table
+
+    assert parse_spaceup(long_list(3)).count("<li>") == 3
+    html = parse_spaceup(wide_table(rows=4, columns=3))
+    assert html.count("<tr>") == 1 + 4 and html.count("<td>") == 12 and html.count("<th>") == 3
+    assert set(run(rows=20, columns=2, repeat=1)) == {"list", "ordered list", "table", "blockquote"}
+
+
+def test_mdast_phrasing_benchmark_runs():
+    from benchmarks.mdast_phrasing import run
+
+    assert set(run(headings=20, repeat=1)) == {"text only", "tokenize", "from tokens"}
+
+
+def test_ast_cache_benchmark_runs():
+    from benchmarks.ast_cache import run
+
+    assert set(run(lines=50, repeat=1)) == {"parse", "load", "load all"}
+
+
+def test_render_cache_benchmark_runs():
+    from benchmarks.render_cache import run
+
+    assert set(run(files=4, lines=20)) == {"uncached", "cold cache", "rebuild"}
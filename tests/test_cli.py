@@ -0,0 +1,125 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+import main as cli
+from adaptors.mdast.mdast import spaceup_to_mdast
+from parser import parse_spaceup
+
+EXAMPLE = Path("tests/data/full_example.txt")
+
+
+def test_cli_renders_stdin(monkeypatch, capsys):
+    monkeypatch.setattr("sys.stdin", io.StringIO(EXAMPLE.read_text()))
+    assert cli.main(["--format", "mdast"]) == 0
+    assert json.loads(capsys.readouterr().out) == spaceup_to_mdast(EXAMPLE.read_text())
+
+
+def test_cli_renders_single_file_to_stdout(capsys):
+    assert cli.main([str(EXAMPLE)]) == 0
+    assert capsys.readouterr().out == parse_spaceup(EXAMPLE.read_text()) + "\n"
+
+
+def test_cli_renders_directory_to_out(tmp_path):
+    source_dir = tmp_path / "src"
+    (source_dir / "nested").mkdir(parents=True)
+    (source_dir / "a.sup").write_text("heading\n    paragraph\n")
+    (source_dir / "nested" / "b.sup").write_text(EXAMPLE.read_text())
+    assert cli.main([str(source_dir), "--out", str(tmp_path / "out"), "--format", "ast", "--jobs", "2"]) == 0
+    document = json.loads((tmp_path / "out" / "a.ast.json").read_text())
+    assert document["children"][0] == {"type": "heading", "level": 1, "text": "heading", "start": 0, "end": 7}
+    assert (tmp_path / "out" / "nested" / "b.ast.json").is_file()
+
+
+def test_cli_reports_missing_inputs(tmp_path, capsys):
+    assert cli.main([str(tmp_path / "missing.sup")]) == 1
+    assert "no files found" in capsys.readouterr().err
+
+
+def test_cli_watch_rerenders_only_changed_files(tmp_path, monkeypatch):
+    source_dir = tmp_path / "src"
+    source_dir.mkdir()
+    for name in ("a", "b"):
+        (source_dir / f"{name}.sup").write_text(f"{name}\n    paragraph\n")
+    rendered = []
+    real_render_batch = cli.render_batch
+
+    def render_batch(paths, *args, **kwargs):
+        rendered.append(sorted(path.name for path in paths))
+        return real_render_batch(paths, *args, **kwargs)
+
+    sleeps = iter([lambda: (source_dir / "b.sup").write_text("b\n    changed paragraph\n"), lambda: None])
+
+    def sleep(_seconds):
+        action = next(sleeps, None)
+        if action is None:
+            raise KeyboardInterrupt
+        action()
+
+    monkeypatch.setattr(cli, "render_batch", render_batch)
+    monkeypatch.setattr(cli.time, "sleep", sleep)
+    assert cli.main([str(source_dir), "--out", str(tmp_path / "out"), "--watch"]) == 0
+    assert rendered == [["a.sup", "b.sup"], ["b.sup"]]
+    assert "changed paragraph" in (tmp_path / "out" / "b.html").read_text()
+
+
+def test_cli_watch_renders_files_added_to_another_input(tmp_path, monkeypatch):
+    first, second = tmp_path / "a", tmp_path / "b"
+    first.mkdir()
+    second.mkdir()
+    (first / "x.sup").write_text("x\n    paragraph\n")
+    sleeps = iter([lambda: (second / "nested").mkdir(), lambda: (second / "nested" / "y.sup").write_text("y\n    added\n")])
+
+    def sleep(_seconds):
+        action = next(sleeps, None)
+        if action is None:
+            raise KeyboardInterrupt
+        action()
+
+    monkeypatch.setattr(cli.time, "sleep", sleep)
+    assert cli.main([str(first), str(second), "--out", str(tmp_path / "out"), "--watch"]) == 0
+    assert (tmp_path / "out" / "a" / "x.html").is_file()
+    assert "added" in (tmp_path / "out" / "b" / "nested" / "y.html").read_text()
+
+
+def test_cli_watch_rejects_stdin():
+    with pytest.raises(SystemExit):
+        cli.main(["--watch"])
+
+
+def test_cli_check_validates_without_rendering(tmp_path, capsys):
+    (tmp_path / "good.sup").write_text("heading\n    paragraph\n")
+    (tmp_path / "bad.sup").write_text("heading\n  paragraph\n\tmore\n")
+    assert cli.main(["--check", str(tmp_path / "good.sup")]) == 0
+    assert cli.main(["--check", str(tmp_path)]) == 1
+    errors = capsys.readouterr().err
+    assert "bad.sup: Line 2: Indentation must be a multiple of 4 spaces." in errors
+    assert "bad.sup: Line 3: Tabs are not allowed for indentation." in errors
+    assert not list(tmp_path.glob("*.html"))
+
+
+def test_cli_cache_skips_unchanged_files(tmp_path, monkeypatch):
+    source = tmp_path / "src" / "a.sup"
+    source.parent.mkdir()
+    source.write_text(EXAMPLE.read_text())
+    args = [str(source.parent), "--out", str(tmp_path / "out"), "--cache", str(tmp_path / "cache")]
+    assert cli.main(args) == 0
+    assert any((tmp_path / "cache").iterdir())
+
+    monkeypatch.setattr("batch.render_source", lambda *args: pytest.fail("rendered an unchanged file"))
+    (tmp_path / "out" / "a.html").unlink()
+    assert cli.main(args) == 0
+    assert (tmp_path / "out" / "a.html").read_text() == parse_spaceup(EXAMPLE.read_text())
+
+
+def test_cli_cache_applies_to_stdout(tmp_path, monkeypatch, capsys):
+    args = [str(EXAMPLE), "--cache", str(tmp_path / "cache")]
+    assert cli.main(args) == 0
+    expected = capsys.readouterr().out
+    assert any((tmp_path / "cache").iterdir())
+
+    monkeypatch.setattr(cli, "render_source", lambda *args: pytest.fail("rendered an unchanged file"))
+    assert cli.main(args) == 0
+    assert capsys.readouterr().out == expected == parse_spaceup(EXAMPLE.read_text()) + "\n"
@@ -0,0 +1,110 @@
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, List, Optional
+
+from ast_parser import MarkdownInline, parse_spaceup_ast
+from flat_ast import COMMENT, HEADING, INLINE_COMMENT, NO_PARENT, PARAGRAPH, PARAGRAPH_LINE, parse_spaceup_flat
+
+ONE_INDENT = " " * 4
+
+
+def test_flat_ast_round_trips_to_document():
+    for path in sorted(Path("tests/data").glob("*.txt")):
+        text = path.read_text()
+        assert parse_spaceup_flat(text).to_document() == parse_spaceup_ast(text), path.name
+        assert parse_spaceup_flat(text.splitlines()).to_document() == parse_spaceup_ast(text), path.name
+
+
+def test_flat_ast_columns():
+    text = f"heading\n{ONE_INDENT}line one // note\n{ONE_INDENT}line two\n// trailing comment\n"
+    flat = parse_spaceup_flat(text)
+    assert list(flat.kinds) == [HEADING, PARAGRAPH, PARAGRAPH_LINE, INLINE_COMMENT, PARAGRAPH_LINE, COMMENT]
+    assert list(flat.levels) == [1, 0, 0, 0, 0, 0]
+    # Comment lines belong to the heading block they appear in, even when dedented.
+    assert list(flat.parents) == [NO_PARENT, 0, 1, 2, 1, 0]
+    assert [flat.text_of(i) for i in range(len(flat))] == ["heading", "", "line one", "note", "line two", "trailing comment"]
+
+
+def test_markdown_inline_allocates_tokens_lazily():
+    inline = MarkdownInline("text")
+    assert inline._tokens is None
+    assert inline == MarkdownInline(text="text", tokens=[])
+    inline.tokens.append("token")
+    assert inline._tokens == ["token"]
+
+
+# The node classes as they were before slots, kept here as the memory baseline.
+@dataclass
+class _LegacyMarkdownInline:
+    text: str
+    tokens: List[Any] = field(default_factory=list)
+
+
+@dataclass
+class _LegacyParagraphLine:
+    content: _LegacyMarkdownInline
+    inline_comment: Optional[str] = None
+
+
+@dataclass
+class _LegacyParagraph:
+    lines: List[_LegacyParagraphLine]
+
+
+@dataclass
+class _LegacyHeading:
+    level: int
+    content: _LegacyMarkdownInline
+
+
+@dataclass
+class _LegacyComment:
+    text: str
+
+
+def _to_legacy(document):
+    children = []
+    for node in document.children:
+        if hasattr(node, "level"):
+            children.append(_LegacyHeading(node.level, _LegacyMarkdownInline(node.content.text)))
+        elif hasattr(node, "lines"):
+            lines = [_LegacyParagraphLine(_LegacyMarkdownInline(line.content.text), line.inline_comment) for line in node.lines]
+            children.append(_LegacyParagraph(lines))
+        else:
+            children.append(_LegacyComment(node.text))
+    return children
+
+
+def _allocated(build):
+    tracemalloc.start()
+    try:
+        result = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def test_memory_flat_below_slotted_below_legacy():
+    block = [
+        "section heading",
+        f"{ONE_INDENT}subsection",
+        f"{ONE_INDENT * 2}paragraph text with a few words // and a note",
+        f"{ONE_INDENT * 2}second paragraph line",
+        "",
+        f"{ONE_INDENT}// a comment",
+        f"{ONE_INDENT}another subsection",
+        f"{ONE_INDENT * 2}- item",
+        f"{ONE_INDENT * 2}- another item",
+        "",
+    ]
+    text = "\n".join(block * 1_000)
+
+    # Only what each representation retains counts, not the parser's temporaries.
+    legacy = _allocated(lambda: _to_legacy(parse_spaceup_ast(text)))
+    slotted = _allocated(lambda: parse_spaceup_ast(text))
+    flat = _allocated(lambda: parse_spaceup_flat(text))
+
+    assert flat < slotted < legacy, f"legacy: {legacy}, slotted: {slotted}, flat: {flat}"
@@ -0,0 +1,59 @@
+import subprocess
+import sys
+import tomllib
+from pathlib import Path
+
+import main
+
+HEAVY_MODULES = ("mistune", "markdown_it", "concurrent.futures", "multiprocessing")
+
+# Cumulative `import main` time allowed, as a fraction of the time it takes to
+# import the Markdown engines and the process pool on the same machine. It is
+# about 0.5 on an idle machine; the bound leaves room for a loaded one. The
+# heavy modules themselves are kept out by the tests above, not by this budget.
+IMPORT_BUDGET_RATIO = 1.0
+
+
+def _imported_modules(*args: str, stdin: str = "") -> dict:
+    """Run Python with `-X importtime`, returning the cumulative import time of each module, in microseconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args], input=stdin, capture_output=True, text=True, cwd=Path(__file__).parent.parent
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def _heavy(modules: dict) -> list:
+    return [name for name in modules if name.startswith(HEAVY_MODULES)]
+
+
+def test_importing_parsers_does_not_load_markdown_engines():
+    for module in ("parser", "ast_parser", "incremental", "flat_ast", "ast_cache", "adaptors.mdast.mdast", "batch", "main"):
+        assert _heavy(_imported_modules("-c", f"import {module}")) == [], module
+
+
+def test_cli_version_and_check_do_not_load_markdown_engines():
+    assert _heavy(_imported_modules("main.py", "--version")) == []
+    assert _heavy(_imported_modules("main.py", "--check", stdin="heading\n    paragraph\n")) == []
+
+
+def test_rendering_loads_markdown_engine_on_demand():
+    modules = _imported_modules("-c", "import parser; parser.parse_spaceup('*text*')")
+    assert "mistune" in modules
+
+
+def test_cli_import_time_budget():
+    best = min(_imported_modules("-c", "import main")["main"] for _ in range(5))
+    eager = f"import {', '.join(HEAVY_MODULES)}"
+    heavy = min(sum(_imported_modules("-c", eager)[name] for name in HEAVY_MODULES) for _ in range(5))
+    assert best < heavy * IMPORT_BUDGET_RATIO, f"import main: {best / 1000:.1f} ms, heavy modules: {heavy / 1000:.1f} ms"
+
+
+def test_version_matches_pyproject():
+    pyproject = tomllib.loads((Path(__file__).parent.parent / "pyproject.toml").read_text())
+    assert main.__version__ == pyproject["project"]["version"]
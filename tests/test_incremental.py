@@ -0,0 +1,134 @@
+import io
+import json
+import random
+import timeit
+from pathlib import Path
+
+import pytest
+
+from ast_parser import Document, document_to_dict, parse_spaceup_ast, write_ast_json
+from incremental import TextEdit, parse_spaceup_ast_incremental, reparse_spaceup_ast
+
+ONE_INDENT = " " * 4
+
+
+def _apply(text: str, edit: TextEdit) -> str:
+    return text[: edit.start] + edit.replacement + text[edit.end :]
+
+
+def _assert_matches_full_parse(text: str, edits):
+    document = parse_spaceup_ast_incremental(text)
+    for edit in edits:
+        document = reparse_spaceup_ast(document, edit)
+        text = _apply(text, edit)
+        assert document == parse_spaceup_ast(text)
+        assert document_to_dict(document) == document_to_dict(parse_spaceup_ast(text))
+    return document
+
+
+def test_reparse_typing_inside_a_paragraph():
+    text = Path("tests/data/full_example.txt").read_text()
+    offset = text.index("\n", len(text) // 2)
+    _assert_matches_full_parse(text, [TextEdit(offset + i, offset + i, char) for i, char in enumerate(" more")])
+
+
+def test_reparse_edit_that_changes_later_structure():
+    text = f"heading\n{ONE_INDENT}paragraph\n{ONE_INDENT}more\nnext heading\n{ONE_INDENT}child\n"
+    offset = text.index("more")
+    # Indenting "more" turns "paragraph" into a heading, which shifts every level after it.
+    _assert_matches_full_parse(text, [TextEdit(offset, offset, ONE_INDENT), TextEdit(offset, offset + 4, "")])
+
+
+def test_reparse_inserting_and_deleting_lines():
+    text = Path("tests/data/comments_sanity.txt").read_text()
+    middle = text.index("\n", len(text) // 3)
+    _assert_matches_full_parse(
+        text,
+        [
+            TextEdit(middle, middle, "\n// new comment\n\ninserted line"),
+            TextEdit(0, middle // 2, ""),
+            TextEdit(len(text) // 2, len(text) // 2, "\r\n"),
+        ],
+    )
+
+
+def test_reparse_random_edits_match_full_parse():
+    rng = random.Random(0)
+    pieces = ["heading", "text", "- item", "// comment", "", "para // inline"]
+    replacements = ["\n", " ", ONE_INDENT, "x", "// ", "\r", "\r\n"]
+    for _ in range(200):
+        lines = [rng.choice(["", ONE_INDENT, ONE_INDENT * 2]) + rng.choice(pieces) for _ in range(rng.randint(0, 30))]
+        text = "\n".join(lines)
+        edits = []
+        for _ in range(5):
+            start = rng.randint(0, len(text))
+            end = min(len(text), start + rng.choice([0, 1, 5]))
+            edit = TextEdit(start, end, rng.choice(replacements) * rng.randint(0, 2))
+            edits.append(edit)
+            text = _apply(text, edit)
+        text = "\n".join(lines)
+        _assert_matches_full_parse(text, edits)
+
+
+def test_reparse_reuses_unchanged_nodes():
+    text = "\n".join(f"heading {i}\n{ONE_INDENT}paragraph {i}" for i in range(50))
+    document = parse_spaceup_ast_incremental(text)
+    offset = text.index("paragraph 25") + len("paragraph 25")
+    edited = reparse_spaceup_ast(document, TextEdit(offset, offset, "!"))
+    changed = [i for i, (old, new) in enumerate(zip(document.children, edited.children)) if old is not new]
+    # Only the edited paragraph and the blocks right around it are rebuilt.
+    assert 51 in changed
+    assert len(changed) <= 4
+
+
+def test_reparse_shifts_positions_of_reused_nodes():
+    text = "\n".join(f"heading {i}\n{ONE_INDENT}paragraph {i}" for i in range(50))
+    document = parse_spaceup_ast_incremental(text)
+    edited = reparse_spaceup_ast(document, TextEdit(0, 0, "added\n"))
+    offset = len("added\n") + text.index("paragraph 25")
+    edited = reparse_spaceup_ast(edited, TextEdit(offset, offset + 1, ""))  # Delete a character further down
+    edited_text = "added\n" + text.replace("paragraph 25", "aragraph 25")
+    last = document_to_dict(edited)["children"][-1]["lines"][0]
+    assert edited_text[last["start"] : last["end"]] == "paragraph 49"
+    out = io.StringIO()
+    write_ast_json(edited, out)
+    assert json.loads(out.getvalue()) == document_to_dict(parse_spaceup_ast(edited_text))
+    assert list(document.span_shifts()) == [0] * len(document.children)
+
+
+def test_reparse_requires_incremental_state():
+    with pytest.raises(ValueError, match="no incremental state"):
+        reparse_spaceup_ast(parse_spaceup_ast("heading"), TextEdit(0, 0, "x"))
+    with pytest.raises(ValueError, match="outside the source"):
+        reparse_spaceup_ast(parse_spaceup_ast_incremental("heading"), TextEdit(0, 100, "x"))
+
+
+def test_reparse_empty_document():
+    document = reparse_spaceup_ast(parse_spaceup_ast_incremental(""), TextEdit(0, 0, "heading"))
+    assert document == Document(children=parse_spaceup_ast("heading").children)
+
+
+def test_keystroke_latency_beats_full_reparse():
+    block = [
+        "section heading",
+        f"{ONE_INDENT}subsection",
+        f"{ONE_INDENT * 2}paragraph text with a few words",
+        f"{ONE_INDENT * 2}second paragraph line",
+        "",
+        f"{ONE_INDENT}// a comment",
+        f"{ONE_INDENT}another subsection",
+        f"{ONE_INDENT * 2}- item",
+        f"{ONE_INDENT * 2}- another item",
+        "",
+    ]
+    text = "\n".join(block * 2_000)  # 20k lines
+    full_parse = min(timeit.repeat(lambda: parse_spaceup_ast(text), number=1, repeat=3))
+
+    document = parse_spaceup_ast_incremental(text)
+    offset = text.index("paragraph text", len(text) // 2)
+    edit = TextEdit(offset, offset, "x")
+    keystrokes = 10
+    keystroke = min(timeit.repeat(lambda: reparse_spaceup_ast(document, edit), number=keystrokes, repeat=5)) / keystrokes
+
+    # About 12x on an idle machine; 3x leaves room for a loaded one.
+    assert keystroke * 3 < full_parse, f"full re-parse: {full_parse:.4f}s, keystroke: {keystroke:.4f}s"
@@ -1,5 +1,5 @@
 import pytest
-from indentation import validate_indentation, IndentationError
+from indentation import Diagnostic, check_indentation, validate_indentation, IndentationError
 
 ONE_INDENT = " " * 4
 TWO_INDENTS = ONE_INDENT * 2
@@ -29,4 +29,22 @@ def test_valid_indentation_with_blank_lines():
 def test_invalid_indentation_on_specific_line():
     text = f"line1\n{ONE_INDENT}line2\n{ONE_INDENT}  line3\n{ONE_INDENT}line4"
     with pytest.raises(IndentationError, match="Line 3: Indentation must be a multiple of 4 spaces."):
-        validate_indentation(text)
\ No newline at end of file
+        validate_indentation(text)
+
+
+def test_check_indentation_reports_every_problem():
+    text = f"line1\n  line2\n{ONE_INDENT}line3\n{ONE_INDENT}\tline4\n   \n{TWO_INDENTS} line6"
+    assert check_indentation(text) == [
+        Diagnostic(2, 3, "Indentation must be a multiple of 4 spaces."),
+        Diagnostic(4, 5, "Tabs are not allowed for indentation."),
+        Diagnostic(6, 10, "Indentation must be a multiple of 4 spaces."),
+    ]
+    assert check_indentation(text, fail_fast=True) == check_indentation(text)[:1]
+    assert check_indentation(text.replace("\n", "\r\n")) == check_indentation(text)
+    assert check_indentation(text.replace("\n", "\r")) == check_indentation(text)
+
+
+def test_check_indentation_of_first_line_and_valid_text():
+    assert check_indentation("\tline1\nline2") == [Diagnostic(1, 1, "Tabs are not allowed for indentation.")]
+    assert check_indentation(f"line1\n{ONE_INDENT}line2\n\n{TWO_INDENTS}line3\n") == []
+    assert check_indentation("") == []
@@ -0,0 +1,80 @@
+from pathlib import Path
+
+import pytest
+
+from ast_parser import parse_spaceup_ast, render_ast_to_html
+from inline_markdown import InlineBatch, InlineCache, render_inline, render_inline_batch
+from parser import parse_spaceup
+
+TRICKY_FRAGMENTS = [
+    "",
+    "plain prose without markup",
+    "trailing spaces  ",
+    "**bold** and *italic* and `code`",
+    "a [link](https://example.com) and <b>html</b>",
+    "ampersand & \"quotes\" and ~~strike~~",
+    "footnote reference[^1]",
+    "escaped \\*star\\*",
+    "- looks like a list",
+    "1. looks like an ordered list",
+    "> looks like a quote",
+    "| looks | like a table |",
+    "```",
+    "[ref]: https://example.com",
+    "# not a heading in Spaceup",
+    "<div>block html</div>",
+    "éclair **crème**",
+]
+
+
+def test_batch_matches_per_fragment_rendering():
+    fragments = list(TRICKY_FRAGMENTS)
+    for path in Path("tests/data").glob("*.txt"):
+        for line in path.read_text().splitlines():
+            fragments.append(line.strip())
+    assert render_inline_batch(fragments) == [render_inline(text) for text in fragments]
+
+
+def test_batch_preserves_order_and_duplicates():
+    fragments = ["*a*", "b", "*a*"]
+    assert render_inline_batch(fragments) == ["<em>a</em>", "b", "<em>a</em>"]
+
+
+def test_inline_batch_fills_slots_on_join():
+    batch = InlineBatch()
+    output = ["<p>", (batch.add("**x**"), "<br>"), ("<li>", batch.add("y"), "</li>"), "</p>"]
+    assert batch.join(output) == "<p>\n<strong>x</strong><br>\n<li>y</li>\n</p>"
+
+
+def test_cache_counts_hits_misses_and_evictions():
+    cache = InlineCache(maxsize=2)
+    assert render_inline_batch(["*a*", "*b*", "*a*"], cache) == ["<em>a</em>", "<em>b</em>", "<em>a</em>"]
+    assert (cache.hits, cache.misses, cache.evictions) == (0, 2, 0)
+    render_inline_batch(["*a*", "*c*"], cache)
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 3, 1)
+    assert len(cache) == 2
+    # "*b*" was least recently used, so it was evicted
+    render_inline_batch(["*b*"], cache)
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 4, 2)
+
+
+def test_cache_skips_fragments_without_markup():
+    cache = InlineCache()
+    render_inline_batch(["plain prose"], cache)
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_cache_rejects_non_positive_size():
+    with pytest.raises(ValueError):
+        InlineCache(maxsize=0)
+
+
+def test_cached_render_matches_uncached():
+    full_input = Path("tests/data/full_example_and_markdown_in_paragraphs.txt").read_text()
+    cache = InlineCache()
+    for _ in range(2):
+        assert parse_spaceup(full_input, inline_cache=cache) == parse_spaceup(full_input)
+        ast = parse_spaceup_ast(full_input)
+        assert render_ast_to_html(ast, inline_cache=cache) == render_ast_to_html(ast)
+    assert cache.hits > 0
@@ -0,0 +1,95 @@
+from pathlib import Path
+
+import pytest
+
+from line_table import BLANK, COMMENT, CONTENT, FENCE, LineStream, build_line_table
+
+ONE_INDENT = " " * 4
+
+
+def test_line_kinds_and_indents():
+    text = f"heading\n\n{ONE_INDENT}// comment\n{ONE_INDENT}```python\n{ONE_INDENT}code  \n"
+    table = build_line_table(text)
+    assert table.lines == ["heading", "", f"{ONE_INDENT}// comment", f"{ONE_INDENT}```python", f"{ONE_INDENT}code"]
+    assert table.kinds == [CONTENT, BLANK, COMMENT, FENCE, CONTENT]
+    assert table.indents == [0, None, None, 4, 4]
+
+
+def test_next_content_skips_blank_and_comment_lines():
+    text = f"first\n\n// comment\n\n{ONE_INDENT}second\nthird"
+    table = build_line_table(text)
+    assert table.next_content == [4, 4, 4, 4, 5, -1]
+    assert table.next_indent == [4, 4, 4, 4, 0, -1]
+
+
+def test_only_comment_lines_count_as_separator():
+    text = "first\n\n\nsecond\n// comment\nthird\n\n"
+    table = build_line_table(text)
+    assert table.separated[0] is False
+    assert table.separated[3] is True
+    assert table.separated[5] is False
+
+
+def test_followed_by_fence():
+    text = "heading\n// comment\n```\ncode\n```\nlast"
+    table = build_line_table(text)
+    assert table.followed_by_fence(0)
+    assert table.followed_by_fence(3)
+    assert not table.followed_by_fence(4)
+    assert not table.followed_by_fence(5)
+
+
+def test_line_stream_matches_line_table():
+    text = f"first\n\n// comment\n\n{ONE_INDENT}second\n{ONE_INDENT}```\n// trailing\n\n"
+    table = build_line_table(text)
+    stream = LineStream(iter(text.splitlines(keepends=True)))
+    for idx in range(len(table)):
+        assert stream.has_line(idx)
+        assert stream.lines[idx] == table.lines[idx]
+        assert stream.kinds[idx] == table.kinds[idx]
+        assert stream.indents[idx] == table.indents[idx]
+        assert stream.next_content[idx] == table.next_content[idx]
+        assert stream.next_indent[idx] == table.next_indent[idx]
+        assert stream.separated[idx] == table.separated[idx]
+        assert stream.followed_by_fence(idx) == table.followed_by_fence(idx)
+    assert not stream.has_line(len(table))
+
+
+def test_line_stream_release_drops_consumed_lines():
+    line_count = 10_000
+    stream = LineStream(f"line {i}\n" for i in range(line_count))
+    for idx in range(line_count):
+        assert stream.next_indent[idx] == (0 if idx < line_count - 1 else -1)
+        stream.release(idx)
+    with pytest.raises(IndexError):
+        stream.lines[0]
+
+
+def test_line_starts_are_source_offsets():
+    for text in ["a\n  b  \n\nc", "a\r\nb\rc\n", "a b\n\n", ""]:
+        table = build_line_table(text)
+        starts = list(table.starts)
+        raw_lines = text.splitlines(keepends=True)
+        assert starts == [sum(map(len, raw_lines[:idx])) for idx in range(len(raw_lines))]
+        for idx, line in enumerate(table.lines):
+            assert text.startswith(line, starts[idx])
+
+
+def test_strict_line_table_matches_and_validates():
+    from indentation import IndentationError, validate_indentation
+
+    for path in sorted(Path("tests/data").glob("*.txt")):
+        text = path.read_text()
+        try:
+            validate_indentation(text)
+        except IndentationError as error:
+            with pytest.raises(IndentationError, match=f"^{error}$"):
+                build_line_table(text, strict=True)
+        else:
+            assert build_line_table(text, strict=True) == build_line_table(text), path.name
+    for text in ["a\n  b", f"a\n{ONE_INDENT}\tb", "\tx", f"a\n{ONE_INDENT}  // comment", "a\n\tb\n  c"]:
+        with pytest.raises(IndentationError) as strict_error:
+            build_line_table(text, strict=True)
+        with pytest.raises(IndentationError) as error:
+            validate_indentation(text)
+        assert str(strict_error.value) == str(error.value)
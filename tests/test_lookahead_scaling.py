@@ -0,0 +1,51 @@
+"""
+Regression benchmark for the lookahead table shared by both parsers.
+
+Documents whose content lines are separated by long blank and comment runs
+used to be rescanned on every lookahead. Parse time must grow linearly with
+document size: quadrupling the line count should not cost much more than 4x.
+"""
+
+import time
+
+from ast_parser import parse_spaceup_ast
+from parser import parse_spaceup
+
+ONE_INDENT = " " * 4
+RUN_LENGTH = 40
+
+
+def _document(line_count: int) -> str:
+    block = [
+        "heading",
+        *[f"{ONE_INDENT}// comment" for _ in range(RUN_LENGTH // 2)],
+        *["" for _ in range(RUN_LENGTH // 2)],
+        f"{ONE_INDENT}paragraph line",
+        f"{ONE_INDENT}another paragraph line",
+        *["" for _ in range(RUN_LENGTH)],
+    ]
+    return "\n".join(block * (line_count // len(block)))
+
+
+def _best_time(parse, text: str, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _assert_linear(parse):
+    small = _best_time(parse, _document(25_000))
+    large = _best_time(parse, _document(100_000))
+    # Linear growth gives a ratio near 4; quadratic growth gives 16.
+    assert large / small < 8, f"25k lines: {small:.3f}s, 100k lines: {large:.3f}s"
+
+
+def test_parse_spaceup_scales_linearly():
+    _assert_linear(parse_spaceup)
+
+
+def test_parse_spaceup_ast_scales_linearly():
+    _assert_linear(parse_spaceup_ast)
@@ -0,0 +1,136 @@
+from pathlib import Path
+
+from adaptors.mdast.mdast import document_to_mdast, spaceup_to_mdast
+from ast_parser import (
+    Comment,
+    Document,
+    Heading,
+    MarkdownInline,
+    Paragraph,
+    ParagraphLine,
+    parse_spaceup_ast,
+)
+
+
+def test_mdast_heading_and_paragraph():
+    doc = Document(
+        children=[
+            Heading(level=1, content=MarkdownInline(text="Hello", tokens=[])),
+            Paragraph(
+                lines=[
+                    ParagraphLine(content=MarkdownInline(text="This is a line.", tokens=[])),
+                    ParagraphLine(content=MarkdownInline(text="Another line.", tokens=[]), inline_comment="note"),
+                ]
+            ),
+            Comment(text="standalone"),
+        ]
+    )
+    assert document_to_mdast(doc) == {
+        "type": "root",
+        "children": [
+            {"type": "heading", "depth": 1, "children": [{"type": "text", "value": "Hello"}]},
+            {
+                "type": "paragraph",
+                "children": [
+                    {"type": "text", "value": "This is a line."},
+                    {"type": "break"},
+                    {"type": "text", "value": "Another line."},
+                    {"type": "html", "value": "<!-- note -->"},
+                ],
+            },
+            {"type": "html", "value": "<!-- standalone -->"},
+        ],
+    }
+
+
+def test_mdast_from_events_matches_document_to_mdast():
+    for path in sorted(Path("tests/data").glob("*.txt")):
+        full_input = path.read_text()
+        expected = document_to_mdast(parse_spaceup_ast(full_input))
+        assert spaceup_to_mdast(full_input) == expected, path.name
+        assert spaceup_to_mdast(full_input.splitlines(keepends=True)) == expected, path.name
+
+
+def test_mdast_phrasing_nodes_from_tokens():
+    source = 'Title *x* and [a **b**](https://example.com "t")\n    - item `code` // note\n    - ~~gone~~ ![alt](i.png)\n'
+    untokenized = document_to_mdast(parse_spaceup_ast(source))
+    assert untokenized["children"][0]["children"] == [
+        {"type": "text", "value": 'Title *x* and [a **b**](https://example.com "t")'}
+    ]
+    heading, bullets = document_to_mdast(parse_spaceup_ast(source, tokenize=True))["children"]
+    assert heading["children"] == [
+        {"type": "text", "value": "Title "},
+        {"type": "emphasis", "children": [{"type": "text", "value": "x"}]},
+        {"type": "text", "value": " and "},
+        {
+            "type": "link",
+            "url": "https://example.com",
+            "title": "t",
+            "children": [
+                {"type": "text", "value": "a "},
+                {"type": "strong", "children": [{"type": "text", "value": "b"}]},
+            ],
+        },
+    ]
+    first, second = (item["children"][0]["children"] for item in bullets["children"])
+    assert first == [
+        {"type": "text", "value": "item "},
+        {"type": "inlineCode", "value": "code"},
+        {"type": "html", "value": "<!-- note -->"},
+    ]
+    assert second == [
+        {"type": "delete", "children": [{"type": "text", "value": "gone"}]},
+        {"type": "text", "value": " "},
+        {"type": "image", "url": "i.png", "title": None, "alt": "alt"},
+    ]
+
+
+def test_mdast_from_tokens_keeps_plain_text_unchanged():
+    for path in sorted(Path("tests/data").glob("*.txt")):
+        full_input = path.read_text()
+        if not any(mark in full_input for mark in "*_`[]!<>&\\~"):
+            assert document_to_mdast(parse_spaceup_ast(full_input, tokenize=True)) == spaceup_to_mdast(full_input), path.name
+
+
+def test_write_mdast_json_matches_json_dumps():
+    import io
+    import json
+
+    from adaptors.mdast.mdast import write_mdast_json
+
+    for path in sorted(Path("tests/data").glob("*.txt")):
+        full_input = path.read_text()
+        document = parse_spaceup_ast(full_input, tokenize=True)
+        for source, expected in [
+            (full_input, spaceup_to_mdast(full_input)),
+            (full_input.splitlines(keepends=True), spaceup_to_mdast(full_input)),
+            (document, document_to_mdast(document)),
+        ]:
+            out = io.StringIO()
+            write_mdast_json(source, out, chunk_size=64)
+            assert out.getvalue() == json.dumps(expected), path.name
+
+
+def test_write_mdast_json_memory_does_not_grow_with_document():
+    import tracemalloc
+
+    from adaptors.mdast.mdast import write_mdast_json
+
+    class Discard:
+        def write(self, text):
+            pass
+
+    def lines(count):
+        for i in range(count):
+            yield f"heading {i}\n"
+            yield f"    paragraph *{i}* // note\n"
+
+    for source in (lines, lambda count: "".join(lines(count))):
+        peaks = []
+        for count in (500, 5_000):
+            text = source(count)
+            tracemalloc.start()
+            write_mdast_json(text, Discard())
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        assert peaks[1] < peaks[0] * 1.5
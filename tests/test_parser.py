@@ -8,10 +8,11 @@ Hence it is normalized before comparison.
 from pathlib import Path
 import textwrap
 
+import pytest
 from bs4 import BeautifulSoup
 from bs4.element import Tag, NavigableString, Comment
 
-from parser import parse_spaceup
+from parser import parse_spaceup, stream_spaceup
 
 
 def _normalize_node(node):
@@ -135,3 +136,57 @@ def test_parser_with_full_example_and_markdown_in_paragraphs():
     parsed_spaceup = parse_spaceup(full_input)
     actual_structured_html = BeautifulSoup(parsed_spaceup, "html.parser")
     assert _soup_ast(expected_structured_html) == _soup_ast(actual_structured_html)
+
+
+def test_parser_with_deeply_nested_headings():
+    depth = 10_000
+    deep_input = "\n".join(" " * level + f"level {level}" for level in range(depth))
+    parsed_spaceup = parse_spaceup(deep_input)
+    assert parsed_spaceup.startswith("<h1>level 0</h1>")
+    assert f"<h{depth - 1}>level {depth - 2}</h{depth - 1}>" in parsed_spaceup
+    assert parsed_spaceup.endswith(f"<p>\nlevel {depth - 1}<br>\n</p>")
+
+
+def test_stream_parser_matches_parser():
+    for path in sorted(Path("tests/data").glob("*.txt")):
+        full_input = path.read_text()
+        chunks = list(stream_spaceup(full_input.splitlines(keepends=True)))
+        assert "\n".join(chunks) == parse_spaceup(full_input), path.name
+
+
+def test_stream_parser_yields_before_input_is_exhausted():
+    consumed = []
+
+    def lines():
+        for i in range(1_000):
+            consumed.append(i)
+            yield f"heading {i}\n"
+            yield f"    paragraph {i}\n"
+
+    chunks = stream_spaceup(lines())
+    assert next(chunks) == "<h1>heading 0</h1>"
+    assert len(consumed) < 5
+
+
+def test_strict_parsers_reject_bad_indentation():
+    from ast_parser import parse_spaceup_ast
+    from indentation import IndentationError
+
+    text = "heading\n    paragraph\n"
+    assert parse_spaceup(text, strict=True) == parse_spaceup(text)
+    assert parse_spaceup_ast(text, strict=True) == parse_spaceup_ast(text)
+    for parse in (parse_spaceup, parse_spaceup_ast):
+        with pytest.raises(IndentationError, match="Line 2: Indentation must be a multiple of 4 spaces."):
+            parse("heading\n   paragraph\n", strict=True)
+
+
+def test_block_kind_dispatches_on_first_character():
+    from parser import BLOCKQUOTE, ORDERED_LIST, PARAGRAPH, TABLE, UNORDERED_LIST, block_kind
+
+    assert block_kind("- item ") == (UNORDERED_LIST, "item")
+    assert block_kind("12. item") == (ORDERED_LIST, "item")
+    assert block_kind("١. item") == (ORDERED_LIST, "item")  # `\d` matches any decimal digit
+    assert block_kind("> quote") == (BLOCKQUOTE, None)
+    assert block_kind("| a | b |") == (TABLE, None)
+    for content in ["-item", "12.item", ">quote", "|a", "plain", "```"]:
+        assert block_kind(content) == (PARAGRAPH, None), content
@@ -0,0 +1,57 @@
+import json
+from pathlib import Path
+
+from ast_parser import parse_spaceup_ast
+from inline_markdown import InlineCache
+from parser import parse_spaceup
+from profiling import PHASES, ParseProfile
+
+EXAMPLE = Path("tests/data/full_example.txt").read_text()
+
+NESTED = """Top
+    - item *one*
+    - item two
+    > quoted
+    Middle
+        Bottom
+            **bold** text // note
+            plain text
+"""
+
+
+def test_profiled_parse_matches_unprofiled():
+    profile = ParseProfile()
+    assert parse_spaceup(EXAMPLE, profile=profile) == parse_spaceup(EXAMPLE)
+    assert parse_spaceup_ast(EXAMPLE, profile=profile) == parse_spaceup_ast(EXAMPLE)
+    assert profile.parses == 2
+
+
+def test_profile_records_phases_and_counters():
+    profile = ParseProfile()
+    parse_spaceup(NESTED, profile=profile)
+    report = json.loads(json.dumps(profile.report()))
+    assert set(report["seconds"]) == {*PHASES, "total"}
+    assert all(seconds >= 0 for seconds in report["seconds"].values())
+    assert report["seconds"]["emit"] > 0 and report["seconds"]["inline"] > 0
+    assert report["lines"] == report["lookahead_lines"] == 8
+    assert report["max_depth"] == 3
+    # "**bold** text" and "item *one*" go to mistune, as does the blockquote; plain text does not.
+    assert report["markdown_calls"] == 3
+
+
+def test_profile_skips_cached_fragments():
+    cache = InlineCache()
+    parse_spaceup(NESTED, inline_cache=cache)
+    profile = ParseProfile()
+    parse_spaceup(NESTED, inline_cache=cache, profile=profile)
+    assert profile.markdown_calls == 1  # Only the blockquote
+
+
+def test_profile_accumulates_across_parses():
+    profile = ParseProfile()
+    parse_spaceup_ast("a\n    b\n        c\n            d\n", profile=profile)
+    parse_spaceup_ast("a\n    b\n", profile=profile)
+    assert profile.parses == 2
+    assert profile.lines == 6
+    assert profile.max_depth == 3
+    assert profile.seconds["structure"] > 0 and profile.seconds["inline"] == 0
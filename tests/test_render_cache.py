@@ -0,0 +1,83 @@
+import os
+from pathlib import Path
+
+import render_cache
+from ast_parser import parse_spaceup_ast, render_ast_to_html
+from parser import parse_spaceup
+from render_cache import RenderCache
+
+
+def _render_calls(render):
+    calls = []
+
+    def counted(text):
+        calls.append(text)
+        return render(text)
+
+    return counted, calls
+
+
+def test_render_cache_hits_on_unchanged_text(tmp_path):
+    cache = RenderCache(tmp_path / "cache")
+    render, calls = _render_calls(parse_spaceup)
+    text = Path("tests/data/full_example.txt").read_text()
+    assert cache.render(text, "html", render) == parse_spaceup(text)
+    assert cache.render(text, "html", render) == parse_spaceup(text)
+    assert len(calls) == 1
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.writes) == (1, 1, 1)
+    assert cache.stats.hit_rate == 0.5
+
+    # Another process sees the entry too.
+    assert RenderCache(tmp_path / "cache").render(text, "html", render) == parse_spaceup(text)
+    assert len(calls) == 1
+
+
+def test_render_cache_keys_on_text_renderer_and_options(tmp_path, monkeypatch):
+    cache = RenderCache(tmp_path)
+    text = "heading\n    paragraph\n"
+    keys = {cache.key(text, "html"), cache.key(text + " ", "html"), cache.key(text, "ast-html"), cache.key(text, "html", "strict")}
+    assert len(keys) == 4
+
+    def ast_html(text):
+        return render_ast_to_html(parse_spaceup_ast(text))
+
+    assert cache.render(text, "ast-html", ast_html) == ast_html(text)
+    assert cache.render(text, "html", parse_spaceup) == parse_spaceup(text)
+    assert cache.stats.hits == 0
+
+    monkeypatch.setattr(render_cache, "renderer_version", lambda: "a newer parser")
+    assert cache.key(text, "html") not in keys
+
+
+def test_render_cache_evicts_least_recently_used(tmp_path):
+    cache = RenderCache(tmp_path, max_bytes=1000)
+    keys = [cache.key(str(n)) for n in range(5)]
+    for age, key in enumerate(keys[:4]):
+        cache.put(key, "x" * 200)
+        os.utime(cache._path(key), (age, age))  # Oldest first
+    assert cache.get(keys[0]) is not None  # Now the most recently used
+
+    cache.put(keys[4], "x" * 200)  # 1000 bytes: at the bound, nothing evicted
+    assert cache.stats.evictions == 0
+    cache.put(cache.key("5"), "x" * 200)  # Over the bound: trimmed to 900 bytes or less
+    assert cache.stats.evictions == 2
+    assert [cache.get(key) is not None for key in keys] == [True, False, False, True, True]
+
+
+def test_render_cache_writes_are_atomic_and_failures_are_misses(tmp_path):
+    cache = RenderCache(tmp_path / "cache")
+    key = cache.key("text")
+    cache.put(key, "rendered")
+    cache.put(key, "rendered")
+    assert cache._size == len("rendered")  # The second write replaced the first
+    assert cache.get(key) == "rendered"
+    assert [path.name for path in cache._path(key).parent.iterdir()] == [key[2:]]  # No temporary files left
+
+    blocked = RenderCache(tmp_path / "file")
+    (tmp_path / "file").write_text("not a directory")
+    blocked.put(key, "rendered")
+    assert blocked.get(key) is None
+    assert (blocked.stats.writes, blocked.stats.misses) == (0, 1)
+
+    cache.clear()
+    assert cache.get(key) is None
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import os
+import signal
+from pathlib import Path
+
+from adaptors.mdast.mdast import spaceup_to_mdast
+from parser import parse_spaceup
+import server as server_module
+from server import RenderServer
+
+EXAMPLE = Path("tests/data/full_example_and_markdown_in_paragraphs.txt").read_text()
+
+
+def _request(method: str, target: str, body: bytes = b"", close: bool = False) -> bytes:
+    head = f"{method} {target} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n"
+    if close:
+        head += "Connection: close\r\n"
+    return (head + "\r\n").encode() + body
+
+
+async def _read_response(reader: asyncio.StreamReader):
+    head = (await reader.readuntil(b"\r\n\r\n")).decode()
+    status = int(head.split(" ")[1])
+    headers = dict(line.split(": ", 1) for line in head.split("\r\n")[1:] if line)
+    body = await reader.readexactly(int(headers["Content-Length"]))
+    return status, headers, body
+
+
+def _run(scenario):
+    async def main():
+        server = RenderServer(jobs=2)
+        await server.start()
+        try:
+            return await scenario(server, *server.address)
+        finally:
+            await server.close()
+
+    return asyncio.run(main())
+
+
+def test_server_renders_every_format_and_reports_health():
+    async def scenario(server, host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        results = {}
+        for output_format in ("html", "ast", "mdast"):
+            writer.write(_request("POST", f"/render?format={output_format}", EXAMPLE.encode()))
+            results[output_format] = await _read_response(reader)
+        writer.write(_request("GET", "/health", close=True))
+        results["health"] = await _read_response(reader)
+        writer.close()
+        return results
+
+    results = _run(scenario)
+    status, headers, body = results["html"]
+    assert status == 200
+    assert headers["Content-Type"].startswith("text/html")
+    assert body.decode() == parse_spaceup(EXAMPLE)
+    assert json.loads(results["mdast"][2]) == spaceup_to_mdast(EXAMPLE)
+    assert json.loads(results["ast"][2])["type"] == "document"
+    status, headers, body = results["health"]
+    assert status == 200
+    assert headers["Connection"] == "close"
+    assert json.loads(body) == {"status": "ok", "workers": 2, "in_flight": 0, "served": 3, "restarts": 0}
+
+
+def test_server_answers_pipelined_requests_in_order():
+    documents = [f"heading {i}\n    paragraph *{i}*\n" * (50 - i) for i in range(10)]
+
+    async def scenario(server, host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(b"".join(_request("POST", "/render", document.encode()) for document in documents))
+        bodies = [(await _read_response(reader))[2].decode() for _ in documents]
+        writer.close()
+        return bodies
+
+    assert _run(scenario) == [parse_spaceup(document) for document in documents]
+
+
+def test_server_handles_concurrent_connections():
+    documents = [f"item {i}\n    - *bullet* {i}\n" for i in range(20)]
+
+    async def scenario(server, host, port):
+        async def render(document):
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(_request("POST", "/render", document.encode(), close=True))
+            response = await _read_response(reader)
+            writer.close()
+            return response[2].decode()
+
+        return await asyncio.gather(*(render(document) for document in documents))
+
+    assert _run(scenario) == [parse_spaceup(document) for document in documents]
+
+
+def test_server_rejects_bad_requests():
+    async def scenario(server, host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        statuses = []
+        for request in (
+            _request("GET", "/render"),
+            _request("POST", "/render?format=pdf", b"text"),
+            _request("GET", "/missing"),
+            _request("POST", "/render", b"\xff\xfe"),
+        ):
+            writer.write(request)
+            statuses.append((await _read_response(reader))[0])
+        writer.write(b"NONSENSE\r\n\r\n")
+        statuses.append((await _read_response(reader))[0])
+        writer.close()
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(b"POST /render HTTP/1.1\r\nContent-Length: -1\r\n\r\n")
+        statuses.append((await _read_response(reader))[0])
+        writer.close()
+        return statuses
+
+    assert _run(scenario) == [405, 400, 404, 400, 400, 400]
+
+
+def test_server_bounds_pipelined_requests(monkeypatch):
+    monkeypatch.setattr(server_module, "MAX_PIPELINED", 2)
+    documents = [f"heading {i}\n    paragraph *{i}*\n" for i in range(12)]
+    outstanding = []
+
+    async def scenario(server, host, port):
+        respond = server._respond
+        current = 0
+
+        async def counted(request):
+            nonlocal current
+            current += 1
+            outstanding.append(current)
+            try:
+                return await respond(request)
+            finally:
+                current -= 1
+
+        server._respond = counted
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(b"".join(_request("POST", "/render", document.encode()) for document in documents))
+        bodies = [(await _read_response(reader))[2].decode() for _ in documents]
+        writer.close()
+        return bodies
+
+    assert _run(scenario) == [parse_spaceup(document) for document in documents]
+    assert max(outstanding) <= 2
+
+
+def test_server_on_unix_socket(tmp_path):
+    socket_path = str(tmp_path / "render.sock")
+
+    async def main():
+        server = RenderServer(jobs=1)
+        await server.start(unix_path=socket_path)
+        try:
+            reader, writer = await asyncio.open_unix_connection(socket_path)
+            writer.write(_request("POST", "/render", b"heading\n    *text*\n", close=True))
+            response = await _read_response(reader)
+            writer.close()
+            return response
+        finally:
+            await server.close()
+
+    status, _, body = asyncio.run(main())
+    assert status == 200
+    assert body.decode() == parse_spaceup("heading\n    *text*\n")
+
+
+def test_server_replaces_pool_after_a_worker_dies():
+    async def scenario(server, host, port):
+        for pid in list(server._pool._processes):
+            os.kill(pid, signal.SIGKILL)
+        statuses = []
+        for _ in range(2):
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(_request("POST", "/render", b"heading\n    paragraph\n", close=True))
+            statuses.append((await _read_response(reader))[0])
+            writer.close()
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(_request("GET", "/health", close=True))
+        health = json.loads((await _read_response(reader))[2])
+        writer.close()
+        return statuses, health
+
+    statuses, health = _run(scenario)
+    assert statuses == [500, 200]  # Only the render on the broken pool fails
+    assert health["status"] == "ok" and health["restarts"] == 1